@@ -0,0 +1,226 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Eine Zeile pro Lauf, damit Läufe verschiedener Commits auf derselben Maschine verglichen werden können
+HISTORY_PATH = os.path.join(ROOT, 'benchmarks', 'history.jsonl')
+
+PROCESSES = ('Otto', 'Diesel', 'Stirling', 'Joule')
+
+# Eingaben wie in der GUI mit Luft; für Diesel ist q das Einspritzverhältnis
+INPUTS = {'Otto': (8, 1500), 'Diesel': (18, 2), 'Stirling': (3, 1500), 'Joule': (10, 1000)}
+AIR = (1005, 718, 1.4)
+T1, P1 = 300, 1
+
+BATCH_SIZES = (10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7)
+
+# Ab dieser Abweichung gilt eine Messung beim Vergleich als Regression
+REGRESSION_THRESHOLD = 0.2
+
+
+def timed(function, repeat, number=1):
+    # Bester von repeat Läufen, jeweils gemittelt über number Aufrufe; das Minimum schwankt am wenigsten
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        timings.append((time.perf_counter() - start) / number)
+    return min(timings)
+
+
+def bench_single(repeat):
+    from cycle_solver import solve_cycle
+
+    results = {}
+    cp, cv, k = AIR
+    v1 = (cp - cv) * T1 / (P1 * 1e5)
+    for process in PROCESSES:
+        z, q = INPUTS[process]
+        # Ungecacht, damit jede Wiederholung wirklich rechnet
+        seconds = timed(lambda: solve_cycle(process, T1, P1, v1, cp, cv, k, z, q), repeat, number=200)
+        results[f"single.{process}.us"] = seconds * 1e6
+    return results
+
+
+def bench_batch(repeat, max_size):
+    import numpy as np
+    from cycle_batch import solve_batch
+
+    results = {}
+    cp, cv, k = AIR
+    rng = np.random.default_rng(0)
+    for size in BATCH_SIZES:
+        if size > max_size:
+            break
+        t1 = rng.uniform(280, 320, size)
+        v1 = (cp - cv) * t1 / (P1 * 1e5)
+        for process in PROCESSES:
+            z, q = INPUTS[process]
+            seconds = timed(lambda: solve_batch(process, t1, P1, v1, cp, cv, k, z, q), max(1, repeat // 2))
+            results[f"batch.{process}.{size}.cycles_per_s"] = size / seconds
+    return results
+
+
+def bench_render(repeat):
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from cycle_curves import cycle_curves
+    from cycle_plot import create_pv_diagram, create_ts_diagram
+
+    results = {}
+    cp, cv, k = AIR
+    v1 = (cp - cv) * T1 / (P1 * 1e5)
+    for process in PROCESSES:
+        z, q = INPUTS[process]
+        curves = cycle_curves(process, T1, P1, v1, cp, cv, k, z, q)
+        for name, create in (('pv', create_pv_diagram), ('ts', create_ts_diagram)):
+            def render():
+                # Wie im Diagrammfenster: 6x10 in Figur, Diagramm aufbauen und einmal zeichnen
+                fig = Figure(figsize=(6, 10), dpi=100)
+                canvas = FigureCanvasAgg(fig)
+                create(fig.add_subplot(2, 1, 1), curves)
+                canvas.draw()
+            results[f"render.{process}.{name}.ms"] = timed(render, repeat) * 1e3
+    return results
+
+
+def bench_animation(repeat):
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from cycle_animation import EXPORT_FIGSIZE, setup_animation
+
+    results = {}
+    for process in PROCESSES:
+        fig = Figure(figsize=EXPORT_FIGSIZE, dpi=100)
+        canvas = FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        artists, update, frames = setup_animation(ax, process)
+        for artist in artists:
+            artist.set_animated(True)
+        canvas.draw()
+        background = canvas.copy_from_bbox(fig.bbox)
+
+        def update_only():
+            for frame in range(frames):
+                update(frame)
+
+        def update_and_blit():
+            # Ein Bild wie beim Blitting: Hintergrund zurück, bewegliche Artists neu zeichnen
+            for frame in range(frames):
+                canvas.restore_region(background)
+                for artist in update(frame):
+                    ax.draw_artist(artist)
+
+        results[f"animation.{process}.update.us"] = timed(update_only, repeat) / frames * 1e6
+        results[f"animation.{process}.frame.us"] = timed(update_and_blit, max(1, repeat // 2)) / frames * 1e6
+    return results
+
+
+SUITES = {'single': bench_single, 'batch': bench_batch, 'render': bench_render, 'animation': bench_animation}
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+def machine_info():
+    import numpy as np
+    import matplotlib
+
+    return {'node': platform.node(), 'machine': platform.machine(), 'system': platform.system(),
+            'cpus': os.cpu_count(), 'python': platform.python_version(), 'numpy': np.__version__,
+            'matplotlib': matplotlib.__version__}
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def higher_is_better(name):
+    return name.endswith('per_s')
+
+
+def compare(results, previous, threshold):
+    # Vergleich mit dem letzten Lauf auf derselben Maschine; liefert die Namen der Regressionen
+    regressions = []
+    for name, value in results.items():
+        old = previous['results'].get(name)
+        if not old:
+            continue
+        change = value / old - 1
+        worse = -change if higher_is_better(name) else change
+        flag = ''
+        if worse > threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print(f"{name:<42} {old:14.2f} -> {value:14.2f}  {change * 100:+7.1f} %{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark solver, plotting and animation hot paths.")
+    parser.add_argument('--suite', choices=list(SUITES), nargs='+', default=list(SUITES))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--max-batch', type=int, default=10 ** 6,
+                        help="Largest batch size, 10000000 for the full range")
+    parser.add_argument('--history', default=HISTORY_PATH, help="JSON lines file the results are appended to")
+    parser.add_argument('--no-save', action='store_true', help="Only print, do not append to the history")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help="Relative change that counts as a regression")
+    args = parser.parse_args(argv)
+
+    # Ohne Display, das Diagramm- und Animationsbenchmarking zeichnet nur auf den Agg-Canvas
+    os.environ.setdefault('MPLBACKEND', 'Agg')
+
+    results = {}
+    for suite in args.suite:
+        if suite == 'batch':
+            part = bench_batch(args.repeat, args.max_batch)
+        else:
+            part = SUITES[suite](args.repeat)
+        for name, value in part.items():
+            print(f"{name:<42} {value:14.2f}")
+        results.update(part)
+
+    commit, dirty = git_revision()
+    entry = {'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+             'commit': commit, 'dirty': dirty, 'machine': machine_info(), 'repeat': args.repeat,
+             'results': results}
+
+    same_machine = [run for run in load_history(args.history) if run['machine'] == entry['machine']]
+    failed = False
+    if same_machine:
+        previous = same_machine[-1]
+        print(f"\nCompared with {(previous['commit'] or 'unknown')[:10]} from {previous['timestamp']}:")
+        failed = bool(compare(results, previous, args.threshold))
+
+    if not args.no_save:
+        with open(args.history, 'a') as file:
+            file.write(json.dumps(entry) + '\n')
+
+    print("REGRESSION" if failed else "OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
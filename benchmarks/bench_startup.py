@@ -0,0 +1,78 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Startbudget für das Rechenfenster in Sekunden, gemessen ohne die Instruktionen und ohne mainloop
+STARTUP_BUDGET = 1.0
+
+# Import aller Module, die das Rechenfenster braucht. Läuft auch ohne Display.
+IMPORT_SNIPPET = """
+import sys, time
+start = time.perf_counter()
+import tkinter, tkinter.ttk, tkinter.messagebox, tkinter.font
+import cycle_solver
+print(time.perf_counter() - start)
+print(','.join(name for name in ('numpy', 'matplotlib') if name in sys.modules))
+"""
+
+# Aufbau des kompletten Rechenfensters inklusive erstem Zeichnen
+WINDOW_SNIPPET = """
+import sys, time
+start = time.perf_counter()
+import main
+main.root.update()
+print(time.perf_counter() - start)
+print(','.join(name for name in ('numpy', 'matplotlib') if name in sys.modules))
+main.root.destroy()
+"""
+
+
+def measure(snippet, repeat):
+    timings, eager = [], set()
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', snippet], cwd=ROOT, capture_output=True, text=True,
+                                check=True).stdout.split('\n')
+        timings.append(float(output[0]))
+        eager.update(name for name in output[1].split(',') if name)
+    return statistics.median(timings), sorted(eager)
+
+
+def has_display():
+    return sys.platform in ('win32', 'darwin') or bool(os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the start-up time of the calculation window.")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget', type=float, default=STARTUP_BUDGET, help="Startup budget in seconds")
+    args = parser.parse_args(argv)
+
+    failed = False
+    import_time, eager = measure(IMPORT_SNIPPET, args.repeat)
+    print(f"imports:        {import_time * 1000:8.1f} ms")
+
+    if has_display():
+        window_time, window_eager = measure(WINDOW_SNIPPET, args.repeat)
+        eager = sorted(set(eager) | set(window_eager))
+        print(f"window startup: {window_time * 1000:8.1f} ms (budget {args.budget * 1000:.0f} ms)")
+        failed = window_time > args.budget
+    else:
+        print("window startup: skipped, no display available")
+        failed = import_time > args.budget
+
+    # Plotting darf erst mit dem ersten Diagramm geladen werden
+    if eager:
+        print(f"eagerly imported: {', '.join(eager)}")
+        failed = True
+
+    print("FAILED" if failed else "OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,418 @@
+import functools
+import os
+import shutil
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from matplotlib.colors import to_hex, to_rgb
+from matplotlib.lines import Line2D
+from matplotlib.patches import Circle, Polygon, Rectangle
+
+from cycle_curves import cursor_path
+
+
+# Abmessungen der Kolbenanimationen (Otto, Diesel, Stirling)
+kolben_breite = 0.7
+kolben_hoehe = 0.2
+zylinder_breite = 0.7
+zylinder_hoehe = 2.0
+
+# Bildabstand in ms, ergibt 50 Bilder pro Sekunde
+FRAME_INTERVAL = 20
+
+start_color = to_rgb('blue')
+combustion_color = to_rgb('red')
+orange = to_rgb('orange')
+
+
+def _blend(von, nach, progress):
+    # Farbübergang für alle Bilder einer Phase auf einmal, begrenzt auf 0..1 wie früher clamp_color
+    von, nach = np.asarray(von), np.asarray(nach)
+    return np.clip(von + progress[:, None] * (nach - von), 0, 1)
+
+
+def _piston_positions(winkel, kolben_min, kolben_max):
+    # Kurbeltrieb: Kolbenposition aus dem Kurbelwinkel
+    return kolben_min + (kolben_max - kolben_min) * (0.5 * (1 - np.cos(winkel)))
+
+
+def _piston_table(phases, phase_lengths, kolben_y, colors=None, **extra):
+    table = {
+        'phases': phases,
+        'phase': np.repeat(np.arange(len(phases)), phase_lengths),
+        'kolben_y': kolben_y,
+        'stiel_y': np.column_stack([kolben_y + kolben_hoehe / 2, np.zeros(len(kolben_y))]),
+        'frames': len(kolben_y),
+        **extra,
+    }
+    if colors is not None:
+        table['raum_y'] = kolben_y + kolben_hoehe
+        table['raum_hoehe'] = zylinder_hoehe - kolben_y - kolben_hoehe
+        # Einmalige Umrechnung nach Hex, damit matplotlib pro Bild nur noch den Farbcache trifft
+        table['colors'] = [to_hex(color) for color in colors]
+    return table
+
+
+def otto_frames():
+    kolben_min, kolben_max = 0.3, 1.5
+    auf_bewegung_frames = np.linspace(0, np.pi, 50)  # Isentropische Kompression
+    pause_oben_frames = np.ones(40) * np.pi  # Isochore Wärmezufuhr
+    ab_bewegung_frames = np.linspace(np.pi, 2 * np.pi, 40)  # Isentropische Expansion
+    pause_unten_frames = np.ones(40) * 0  # Isochore Wärmeabfuhr
+
+    # Die Wärmeabfuhr läuft doppelt so lang, die Farbe erreicht dabei schon nach der Hälfte wieder Blau
+    winkel = np.concatenate([auf_bewegung_frames, pause_oben_frames, ab_bewegung_frames, pause_unten_frames,
+                             pause_unten_frames])
+    colors = np.concatenate([
+        _blend(start_color, orange, np.arange(50) / 50),
+        _blend(orange, combustion_color, np.arange(40) / 40),
+        _blend(combustion_color, orange, np.arange(40) / 40),
+        _blend(orange, start_color, np.arange(80) / 40),
+    ])
+    phases = ['Isentropic Compression 1 → 2', 'Isochoric Heat Input 2 → 3', 'Isentropic Expansion 3 → 4',
+              'Isochoric Heat Output 4 → 1']
+    return _piston_table(phases, [50, 40, 40, 80], _piston_positions(winkel, kolben_min, kolben_max),
+                         colors)
+
+
+def diesel_frames():
+    kolben_min, kolben_max = 0.3, 1.5
+    auf_bewegung_frames = np.linspace(0, np.pi, 50)
+    isobar_frames = np.linspace(np.pi, 1.5 * np.pi, 50)
+    ab_bewegung_frames = np.linspace(1.5 * np.pi, 2 * np.pi, 60)
+    pause_unten_frames = np.ones(50) * 0
+
+    winkel = np.concatenate([auf_bewegung_frames, isobar_frames, ab_bewegung_frames, pause_unten_frames])
+    colors = np.concatenate([
+        _blend(start_color, combustion_color, np.arange(50) / 50),
+        _blend(combustion_color, orange, np.arange(50) / 50),
+        _blend(orange, orange, np.zeros(60)),
+        _blend(orange, start_color, np.arange(50) / 50),
+    ])
+    phases = ['Isentropic Compression 1 → 2', 'Isobaric Heat Input 2 → 3', 'Isentropic Expansion 3 → 4',
+              'Isochoric Heat Output 4 → 1']
+    return _piston_table(phases, [50, 50, 60, 50], _piston_positions(winkel, kolben_min, kolben_max),
+                         colors)
+
+
+def stirling_frames():
+    kolben_min, kolben_max = 0.3, 0.7
+    verdr_kolben_start = 1.4  # Startposition des Verdrängerkolbens
+    verdr_kolben_end = 1.0    # Endposition des Verdrängerkolbens während der isochoren Phase
+
+    kompression_frames = np.linspace(0, np.pi, 50)
+    heat_input_frames = np.linspace(0, np.pi, 50)
+    expansion_frames = np.linspace(np.pi, 2 * np.pi, 50)
+    heat_output_frames = np.linspace(0, np.pi, 80)
+    winkel = np.concatenate([kompression_frames, heat_input_frames, expansion_frames, heat_output_frames])
+    hub = 0.5 * (1 - np.cos(winkel))
+
+    # Isotherme Kompression, danach bleibt der Arbeitskolben oben stehen
+    kolben_y = np.empty(len(winkel))
+    kolben_y[:50] = kolben_min + (kolben_max - kolben_min) * hub[:50]
+    kolben_y[50:100] = kolben_y[49]
+    # Isotherme Expansion
+    kolben_y[100:150] = kolben_max - (kolben_max - kolben_min) * (0.5 * (1 + np.cos(winkel[100:150])))
+    kolben_y[150:] = kolben_y[149]
+
+    verdr_y = np.empty(len(winkel))
+    verdr_y[:50] = verdr_kolben_start
+    verdr_y[50:100] = verdr_kolben_start - (verdr_kolben_start - verdr_kolben_end) * hub[50:100]
+    verdr_y[100:150] = kolben_y[100:150] + kolben_hoehe + 0.1
+    # Wärmeabfuhr: der Verdrängerkolben nähert sich schrittweise der Startposition, jedes Bild setzt auf dem
+    # vorherigen auf. Die Rekursion läuft nur einmal hier statt in jedem Bild der Animation.
+    annaeherung = hub[:80]
+    position = verdr_y[149]
+    for i, faktor in enumerate(annaeherung):
+        position = position - (position - verdr_kolben_start) * faktor
+        verdr_y[150 + i] = position
+
+    phases = ['Isothermal Compression 1 → 2', 'Isochoric Heat Input 2 → 3', 'Isothermal Expansion 3 → 4',
+              'Isochoric Heat Output 4 → 1']
+    return _piston_table(phases, [50, 50, 50, 80], kolben_y, verdr_y=verdr_y)
+
+
+def joule_frames():
+    left, right = 1, 4.5
+    bottom, top = 1, 3
+    diagonal_point = 1.75
+    x = [left, left, right - 0.5, right - 0.5, right, right]
+    y = [bottom, top, top, diagonal_point + 0.5, diagonal_point, bottom]
+    num_points = 100  # Anzahl der Zwischenpunkte zwischen den Eckpunkten
+
+    # Pfad entlang der Kanten des Rechtecks im Uhrzeigersinn, am Ende ein Stück nach rechts hinaus
+    path_x = [np.linspace(x[i], x[i + 1], num_points, endpoint=False) for i in range(len(x) - 1)]
+    path_y = [np.linspace(y[i], y[i + 1], num_points, endpoint=False) for i in range(len(y) - 1)]
+    path_x.append(np.linspace(right, right + 0.5, num_points))
+    path_y.append(np.full(num_points, bottom))
+    path = np.column_stack([np.concatenate(path_x), np.concatenate(path_y)])
+    # Zustandsänderung je Kante: Verdichter, Brennkammer, zwei Kanten Turbine, zwei Kanten Abgas
+    phase = np.repeat([0, 1, 2, 2, 3, 3], num_points)
+    return {'path': path[:, None, :], 'frames': len(path), 'outline': (x, y), 'phase': phase}
+
+
+FRAME_TABLES = {
+    'Otto': otto_frames,
+    'Diesel': diesel_frames,
+    'Stirling': stirling_frames,
+    'Joule': joule_frames,
+}
+
+
+@functools.lru_cache(maxsize=None)
+def animation_frames(process):
+    # Die Bildtabellen hängen nicht von den Eingaben ab und werden nur einmal pro Prozess erzeugt
+    if process not in FRAME_TABLES:
+        raise ValueError(f"No animation for process: {process}")
+    return FRAME_TABLES[process]()
+
+
+def frame_progress(process):
+    # Zustandsänderung und Fortschritt 0..1 innerhalb der Zustandsänderung für jedes Bild. Bewegt sich der Kolben
+    # dabei, folgt der Fortschritt seinem Hub, sonst läuft er gleichmäßig mit den Bildern.
+    table = animation_frames(process)
+    step = table['phase']
+    progress = np.empty(len(step))
+    kolben_y = table.get('kolben_y')
+    for i in np.unique(step):
+        index = np.nonzero(step == i)[0]
+        y = kolben_y[index] if kolben_y is not None else None
+        if y is not None and abs(y[-1] - y[0]) > 1e-9:
+            progress[index] = (y - y[0]) / (y[-1] - y[0])
+        else:
+            progress[index] = np.arange(len(index)) / max(len(index) - 1, 1)
+    return step, progress
+
+
+def animation_cursor(solution):
+    # Punkt im p-v- und T-s-Diagramm für jedes Bild der Animation, (frames, 2, 2) wie bei cursor_path
+    return cursor_path(solution, *frame_progress(solution['process']))
+
+
+def _setup_piston(ax, kolben_min):
+    ax.add_patch(Rectangle((1 - zylinder_breite / 2, 0), zylinder_breite, zylinder_hoehe, fill=None,
+                           edgecolor='black'))
+    kolben = Rectangle((1 - kolben_breite / 2, kolben_min), kolben_breite, kolben_hoehe, fc='black')
+    ax.add_patch(kolben)
+    stiel = Line2D((1, 1), (kolben_min + kolben_hoehe / 2, 0), lw=2, color='black')
+    ax.add_line(stiel)
+    phase_text = ax.text(1, 2.5, '', ha='center', va='center', fontsize=12, color='black')
+    return kolben, stiel, phase_text
+
+
+def _setup_combustion(ax, table):
+    kolben, stiel, phase_text = _setup_piston(ax, 0.3)
+    raum = Rectangle((1 - zylinder_breite / 2, 1.5), zylinder_breite, zylinder_hoehe - 1.5, color='blue')
+    ax.add_patch(raum)
+    kolben_y, stiel_y, raum_y, raum_hoehe = table['kolben_y'], table['stiel_y'], table['raum_y'], table['raum_hoehe']
+    colors, phase, phases = table['colors'], table['phase'], table['phases']
+
+    # Pro Bild werden nur noch vorberechnete Werte übernommen
+    def update(frame):
+        kolben.set_y(kolben_y[frame])
+        raum.set_y(raum_y[frame])
+        raum.set_height(raum_hoehe[frame])
+        raum.set_color(colors[frame])
+        stiel.set_ydata(stiel_y[frame])
+        phase_text.set_text(phases[phase[frame]])
+        return kolben, raum, stiel, phase_text
+
+    return (kolben, raum, stiel, phase_text), update
+
+
+def _setup_stirling(ax, table):
+    kolben, stiel, phase_text = _setup_piston(ax, 0.3)
+    verdr_kolben = Rectangle((1 - kolben_breite / 2, 1.4), kolben_breite, 0.5, fc='red')
+    ax.add_patch(verdr_kolben)
+    kolben_y, stiel_y, verdr_y = table['kolben_y'], table['stiel_y'], table['verdr_y']
+    phase, phases = table['phase'], table['phases']
+
+    def update(frame):
+        kolben.set_y(kolben_y[frame])
+        verdr_kolben.set_y(verdr_y[frame])
+        stiel.set_ydata(stiel_y[frame])
+        phase_text.set_text(phases[phase[frame]])
+        return kolben, verdr_kolben, stiel, phase_text
+
+    return (kolben, verdr_kolben, stiel, phase_text), update
+
+
+def _setup_joule(ax, table):
+    x, y = table['outline']
+    ax.add_patch(Polygon(np.column_stack([x, y]), closed=False, edgecolor='black', fill=None))
+
+    # Turbine als Trapez
+    x1, x2 = 4, 4.5
+    y1, y2, y3, y4 = 2.25, 2.3, 1.7, 1.8
+    ax.add_patch(Polygon(np.column_stack([[x1, x2, x2, x1, x1], [y1, y2, y3, y4, y1]]), closed=True,
+                         edgecolor='black', facecolor='green'))
+    ax.text(x1 - 0.1, (y1 + y4) / 2, 'Turbine', verticalalignment='center', horizontalalignment='right')
+
+    # Verdichter als Kreis mittig auf der linken Seite
+    circle_x, circle_y = 1, 2
+    ax.add_patch(Circle((circle_x, circle_y), 0.2, edgecolor='black', facecolor='blue'))
+    ax.text(circle_x + 0.25, circle_y, 'Compressor', verticalalignment='center')
+    ax.plot([0.85, 0.9], [1.87, 2.17], 'k-')
+    ax.plot([1.15, 1.10], [1.87, 2.17], 'k-')
+
+    # Brennkammer
+    combustion_width, combustion_height = 0.5, 0.3
+    combustion_x = 1 + (4.5 - 1) / 2 - combustion_width / 2
+    combustion_y = 3 - combustion_height / 2
+    ax.add_patch(Rectangle((combustion_x, combustion_y), combustion_width, combustion_height,
+                           edgecolor='black', facecolor='red'))
+    ax.text(combustion_x + combustion_width / 2, combustion_y - 0.1, 'Combustion',
+            verticalalignment='top', horizontalalignment='center')
+
+    point, = ax.plot([], [], 'ro')
+    path = table['path']
+
+    def update(frame):
+        point.set_data(path[frame, :, 0], path[frame, :, 1])
+        return point,
+
+    return (point,), update
+
+
+def setup_animation(ax, process):
+    # Zeichnet die festen Teile und liefert die beweglichen Artists samt update(frame) für FuncAnimation
+    table = animation_frames(process)
+    ax.axis('off')
+    if process == 'Joule':
+        ax.set_xlim(0, 5)
+        ax.set_ylim(0, 4)
+        artists, update = _setup_joule(ax, table)
+    else:
+        ax.set_xlim(0, 2)
+        ax.set_ylim(0, 3)
+        artists, update = (_setup_stirling if process == 'Stirling' else _setup_combustion)(ax, table)
+    return artists, update, table['frames']
+
+
+# Bildgröße beim Export, entspricht dem Standardfenster von pyplot
+EXPORT_FIGSIZE = (6.4, 4.8)
+EXPORT_DPI = 100
+
+
+def _render_frames(process, start, stop, dpi=EXPORT_DPI):
+    # Zeichnet die Bilder start..stop ohne Fenster. Wie beim Blitting wird der feste Hintergrund nur einmal
+    # gerendert, pro Bild werden nur die beweglichen Artists darübergelegt.
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=EXPORT_FIGSIZE, dpi=dpi)
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    artists, update, frames = setup_animation(ax, process)
+    for artist in artists:
+        artist.set_animated(True)
+    canvas.draw()
+    background = canvas.copy_from_bbox(fig.bbox)
+
+    images = []
+    for frame in range(start, min(stop, frames)):
+        canvas.restore_region(background)
+        for artist in update(frame):
+            ax.draw_artist(artist)
+        images.append(np.asarray(canvas.buffer_rgba())[..., :3].copy())
+    return images
+
+
+def frame_path(path, frame):
+    # otto.png wird zu otto_0000.png, otto_0001.png, ...
+    root, ext = os.path.splitext(path)
+    return f"{root}_{frame:04d}{ext}"
+
+
+def _write_png_frames(process, path, start, stop, dpi=EXPORT_DPI):
+    from PIL import Image
+
+    for frame, image in enumerate(_render_frames(process, start, stop, dpi), start):
+        Image.fromarray(image).save(frame_path(path, frame))
+    return stop - start
+
+
+def _render_gif_frames(process, start, stop, dpi=EXPORT_DPI):
+    # Die Farbreduktion auf 256 Farben ist der teuerste Teil des GIF-Exports und läuft deshalb in den Workern
+    from PIL import Image
+
+    return [Image.fromarray(image).quantize(method=Image.Quantize.FASTOCTREE)
+            for image in _render_frames(process, start, stop, dpi)]
+
+
+def _write_gif(path, images, fps):
+    first, *rest = images
+    first.save(path, save_all=True, append_images=rest, duration=round(1000 / fps), loop=0)
+
+
+class _Mp4Writer:
+    # Die Bilder gehen als Rohdaten über stdin an ffmpeg, es entstehen keine Zwischendateien
+    def __init__(self, path, fps):
+        ffmpeg = shutil.which('ffmpeg')
+        if ffmpeg is None:
+            raise OSError("Writing MP4 files requires ffmpeg on the PATH.")
+        self.path, self.fps, self.ffmpeg = path, fps, ffmpeg
+        self.process = None
+
+    def write(self, image):
+        if self.process is None:
+            height, width = image.shape[:2]
+            self.process = subprocess.Popen(
+                [self.ffmpeg, '-y', '-loglevel', 'error', '-f', 'rawvideo', '-pix_fmt', 'rgb24',
+                 '-s', f'{width}x{height}', '-r', str(self.fps), '-i', '-',
+                 '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-vcodec', 'libx264', '-pix_fmt', 'yuv420p', self.path],
+                stdin=subprocess.PIPE)
+        self.process.stdin.write(image.tobytes())
+
+    def close(self):
+        if self.process is not None:
+            self.process.stdin.close()
+            if self.process.wait() != 0:
+                raise OSError(f"ffmpeg failed to write {self.path}")
+
+
+def export_animation(process, path, fps=1000 / FRAME_INTERVAL, dpi=EXPORT_DPI, workers=None):
+    # Format nach Dateiendung: .mp4, .gif oder .png (Bildfolge otto_0000.png, ...)
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in ('.mp4', '.gif', '.png'):
+        raise ValueError(f"Unsupported animation format: {ext or path}")
+    frames = animation_frames(process)['frames']
+    workers = min(workers or os.cpu_count(), frames)
+    size = -(-frames // workers)
+    bounds = [(start, min(start + size, frames)) for start in range(0, frames, size)]
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    if ext == '.png':
+        # Jeder Worker schreibt seine Bilder selbst, es werden keine Pixel zurückgeschickt
+        tasks = [(_write_png_frames, process, path, start, stop, dpi) for start, stop in bounds]
+    elif ext == '.gif':
+        tasks = [(_render_gif_frames, process, start, stop, dpi) for start, stop in bounds]
+    else:
+        tasks = [(_render_frames, process, start, stop, dpi) for start, stop in bounds]
+
+    # ffmpeg wird vor dem Rendern gesucht, damit ein fehlendes Programm nicht erst am Ende auffällt
+    writer = _Mp4Writer(path, fps) if ext == '.mp4' else None
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    results = executor.map(_call, tasks) if executor else map(_call, tasks)
+    try:
+        if ext == '.png':
+            list(results)
+        elif ext == '.gif':
+            _write_gif(path, [image for images in results for image in images], fps)
+        else:
+            # Die Abschnitte kommen in Reihenfolge zurück und werden direkt an ffmpeg weitergereicht
+            try:
+                for images in results:
+                    for image in images:
+                        writer.write(image)
+            finally:
+                writer.close()
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return frames
+
+
+def _call(task):
+    return task[0](*task[1:])
@@ -0,0 +1,146 @@
+import numpy as np
+
+from cycle_definitions import compiled_cycle
+from cycle_solver import (PROCESS_CHANGES, PROCESS_FIELDS, STATE_FIELDS, CalculationContext, cycle_efficiency,
+                          step_change)
+
+
+# Reihenfolge der Prozessnamen, im Ergebnis als Index im Feld 'process' gespeichert
+PROCESSES = list(PROCESS_CHANGES)
+
+# Gleiche Felder wie State und ProcessValues im Einzelsolver. Ein Kreisprozess belegt RESULT_DTYPE.itemsize
+# = 265 Bytes, eine Million Kreisprozesse also rund 265 MB.
+STATE_DTYPE = np.dtype([(name, 'f8') for name in STATE_FIELDS])
+PROCESS_DTYPE = np.dtype([(name, 'f8') for name in PROCESS_FIELDS])
+RESULT_DTYPE = np.dtype([
+    ('process', 'i1'),
+    ('states', STATE_DTYPE, (4,)),
+    ('processes', PROCESS_DTYPE, (4,)),
+    ('efficiency', 'f8'),
+])
+
+# Obergrenze der Steffensen-Runden für Kreisprozesse mit Vorwärtsbezügen (z.B. Regenerator) und deren Toleranz
+MAX_ITERATIONS = 50
+ITERATION_TOLERANCE = 1e-10
+
+
+def _evaluate(context, parameters, out):
+    # Ein Durchlauf über alle Schritte; context.states und context.heats enthalten bei Vorwärtsbezügen die Werte
+    # des letzten Durchlaufs. Wie im Einzelsolver liefert Schritt i Zustand i + 1, der letzte wieder Zustand 1.
+    count = len(context.cycle.steps)
+    for i in range(count):
+        state, (h, s), values = step_change(context, i, parameters)
+        for name, value in zip(STATE_DTYPE.names, (*state, h, s)):
+            out['states'][name][..., (i + 1) % count] = value
+        for name, value in zip(PROCESS_DTYPE.names, values):
+            out['processes'][name][..., i] = value
+
+
+def _feedback(cycle, context):
+    return ([value for j in cycle.feedback_states for value in context.states[j]] +
+            [context.heats[j] for j in cycle.feedback_heats])
+
+
+def _set_feedback(cycle, context, values):
+    values = iter(values)
+    for j in cycle.feedback_states:
+        context.states[j] = (next(values), next(values), next(values))
+    for j in cycle.feedback_heats:
+        context.heats[j] = next(values)
+
+
+def _aitken(x0, x1, x2):
+    # Δ²-Extrapolation je Zeile; bei linearen Abhängigkeiten (konstante Stoffwerte) ist sie exakt
+    denominator = x2 - 2 * x1 + x0
+    return np.where(np.abs(denominator) > 1e-300, x0 - (x1 - x0) ** 2 / denominator, x2)
+
+
+def solve_compiled(cycle, out, t1, p1, v1, cp, cv, k, parameters, properties=None, n=None):
+    # Dieselben Schrittfunktionen wie im Einzelsolver, nur elementweise mit numpy. out braucht die Felder
+    # 'states', 'processes' und 'efficiency' mit je einem Eintrag pro Schritt. Temperaturen außerhalb der
+    # Stofftabellen ergeben NaN wie alle anderen ungültigen Zeilen.
+    context = CalculationContext(cycle, (t1, p1, v1), cp, cv, k, properties, n, xp=np)
+    _evaluate(context, parameters, out)
+    if cycle.iterative:
+        # Fixpunkt der Vorwärtsbezüge mit Steffensen: zwei Durchläufe, dann Aitken-Extrapolation. Eine einfache
+        # Fixpunktiteration bräuchte beim Regenerator je nach Wirkungsgrad Dutzende Durchläufe über den
+        # ganzen Batch. NaN-Zeilen gelten als fertig.
+        for _ in range(MAX_ITERATIONS):
+            x0 = _feedback(cycle, context)
+            _evaluate(context, parameters, out)
+            x1 = _feedback(cycle, context)
+            if not any(np.any(np.abs(b - a) > ITERATION_TOLERANCE * np.abs(b)) for a, b in zip(x0, x1)):
+                break
+            _evaluate(context, parameters, out)
+            x2 = _feedback(cycle, context)
+            _set_feedback(cycle, context, [_aitken(a, b, c) for a, b, c in zip(x0, x1, x2)])
+
+    out['efficiency'] = cycle_efficiency(context, np.moveaxis(out['states']['t'], -1, 0),
+                                         np.moveaxis(out['states']['p'], -1, 0),
+                                         np.moveaxis(out['processes']['q'], -1, 0), parameters)
+
+
+def _solve_family(process, out, t1, p1, v1, cp, cv, k, z, q, n=None, properties=None):
+    solve_compiled(compiled_cycle(process), out, t1, p1, v1, cp, cv, k, {'z': z, 'q': q}, properties, n)
+    out['process'] = PROCESSES.index(process)
+
+
+def solve_batch(process, t1, p1, v1, cp, cv, k, z, q, property_model=None, n=None):
+    # Alle Eingaben gegeneinander broadcasten, z.B. ein Gitter aus z und q gegen ein festes Medium.
+    # property_model: None für konstante Stoffwerte, ein Medienname oder ein Array von Namen pro Zeile.
+    # n: Polytropenexponent statt der Isentropen, als Zahl oder pro Zeile
+    arrays = [np.asarray(value, dtype=float) for value in (t1, p1, v1, cp, cv, k, z, q)]
+    if n is not None:
+        arrays.append(np.asarray(n, dtype=float))
+
+    if property_model is not None and not isinstance(property_model, str):
+        # Zeilen mit gleichem Stoffmodell werden gemeinsam gerechnet
+        model, process, *arrays = np.broadcast_arrays(np.asarray(property_model), np.asarray(process), *arrays)
+        out = np.empty(model.shape, dtype=RESULT_DTYPE)
+        for name in np.unique(model):
+            mask = model == name
+            part = [array[mask] for array in arrays]
+            out[mask] = solve_batch(process[mask], *part[:8], property_model=str(name),
+                                    n=part[8] if n is not None else None)
+        return out
+
+    properties = None
+    if property_model is not None:
+        from cycle_properties import property_table
+        properties = property_table(property_model)
+
+    if isinstance(process, str):
+        if process not in PROCESS_CHANGES:
+            raise ValueError(f"Unknown thermodynamic cycle: {process}")
+        arrays = np.broadcast_arrays(*arrays)
+        out = np.empty(arrays[0].shape, dtype=RESULT_DTYPE)
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            _solve_family(process, out, *arrays, properties=properties)
+        return out
+
+    # Gemischte Prozesse: jede Familie wird für sich als Block gerechnet
+    process, *arrays = np.broadcast_arrays(np.asarray(process), *arrays)
+    out = np.empty(process.shape, dtype=RESULT_DTYPE)
+    for name in np.unique(process):
+        if name not in PROCESS_CHANGES:
+            raise ValueError(f"Unknown thermodynamic cycle: {name}")
+        mask = process == name
+        part = np.empty(np.count_nonzero(mask), dtype=RESULT_DTYPE)
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            _solve_family(str(name), part, *(array[mask] for array in arrays), properties=properties)
+        out[mask] = part
+    return out
+
+
+def result_columns(result):
+    # Flache Spalten für tabellarische Ausgaben: t1..t4, p1..p4, ..., q12, w12, u12, ..., efficiency
+    steps = [f"{i + 1}{(i + 1) % 4 + 1}" for i in range(4)]
+    columns = {'process': np.asarray(PROCESSES)[result['process']]}
+    for name in STATE_DTYPE.names:
+        for i in range(4):
+            columns[f"{name}{i + 1}"] = result['states'][name][..., i]
+    for name in PROCESS_DTYPE.names:
+        for i, step in enumerate(steps):
+            columns[f"{name}{step}"] = result['processes'][name][..., i]
+    columns['efficiency'] = result['efficiency']
+    return columns
@@ -0,0 +1,256 @@
+import functools
+
+import numpy as np
+
+from cycle_solver import PROCESS_CHANGES, SOLUTION_CACHE_SIZE, cycle_key, solve_cycle_cached
+
+
+# Größte erlaubte Abweichung der Polylinie von der echten Kurve in Pixeln
+PIXEL_TOLERANCE = 0.5
+
+# Zielauflösung einer Diagrammachse in Pixeln (Breite, Höhe), passend zu den 6x10 in Figuren bei 100 dpi
+RESOLUTION = (500, 400)
+
+# Obergrenze der Punkte pro Kurve, falls die Toleranz sehr klein gewählt wird
+MAX_POINTS = 2000
+
+
+def sample_adaptive(curve, a, b, scale, tolerance=PIXEL_TOLERANCE, max_points=MAX_POINTS):
+    # Startet mit den Endpunkten und halbiert nur die Intervalle, deren Mittelpunkt mehr als die Toleranz
+    # neben der Sehne liegt. Geraden bleiben so bei zwei Punkten, steile Isentropen werden dicht abgetastet.
+    sx, sy = scale
+    t = np.array([a, b], dtype=float)
+    x, y = curve(t)
+    while len(t) < max_points:
+        t_mid = 0.5 * (t[:-1] + t[1:])
+        x_mid, y_mid = curve(t_mid)
+        dx, dy = np.diff(x) * sx, np.diff(y) * sy
+        ex = (x_mid - 0.5 * (x[:-1] + x[1:])) * sx
+        ey = (y_mid - 0.5 * (y[:-1] + y[1:])) * sy
+        chord = np.hypot(dx, dy)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            error = np.where(chord > 0, np.abs(dx * ey - dy * ex) / chord, np.hypot(ex, ey))
+        refine = np.nonzero(error > tolerance)[0]
+        if len(refine) == 0:
+            break
+        refine = refine[:max_points - len(t)]
+        t = np.insert(t, refine + 1, t_mid[refine])
+        x = np.insert(x, refine + 1, x_mid[refine])
+        y = np.insert(y, refine + 1, y_mid[refine])
+    return x, y
+
+
+def pixel_scale(segments, resolution):
+    # Pixel pro Dateneinheit aus den Endpunkten aller Segmente; die Kurven sind monoton, die Endpunkte
+    # spannen also den sichtbaren Bereich auf
+    points = np.array([point for segment in segments for point in segment['ends']])
+    span = points.max(axis=0) - points.min(axis=0)
+    span[span == 0] = 1
+    return resolution[0] / span[0], resolution[1] / span[1]
+
+
+def make_segment(label, curve, a, b, markers, annotation):
+    x, y = curve(np.array([a, b], dtype=float))
+    return {'label': label, 'curve': curve, 'range': (a, b), 'ends': list(zip(x, y)),
+            'markers': markers, 'annotation': annotation}
+
+
+def sample_segments(segments, tolerance, resolution):
+    scale = pixel_scale(segments, resolution)
+    sampled = []
+    for segment in segments:
+        x, y = sample_adaptive(segment['curve'], *segment['range'], scale, tolerance)
+        # Nur die Arrays werden behalten, damit zwischengespeicherte Kurven keine Closures festhalten
+        sampled.append({'label': segment['label'], 'x': x, 'y': y, 'markers': segment['markers'],
+                        'annotation': segment['annotation']})
+    return sampled
+
+
+def _line(x1, y1, x2, y2):
+    return lambda t: (x1 + (x2 - x1) * t, y1 + (y2 - y1) * t)
+
+
+def _properties(solution):
+    if solution.get('property_model') is None:
+        return None
+    from cycle_properties import property_table
+    return property_table(solution['property_model'])
+
+
+def pv_segments(solution):
+    # Mit einem Polytropenexponenten n ersetzt p·v^n = konst. die Isentropen, wie im Solver
+    n = solution.get('n')
+    k = solution['medium']['k'] if n is None else n
+    properties = _properties(solution)
+    states = solution['states']
+    segments = []
+
+    for i, label in enumerate(PROCESS_CHANGES[solution['process']]):
+        start, end = states[i], states[(i + 1) % len(states)]
+        p1, v1 = start['p'], start['v']
+        p2, v2 = end['p'], end['v']
+
+        titel = label.lower()
+        if "isentropic" in titel and properties is not None and n is None:
+            # Isentrope mit temperaturabhängigem cp: T(v) aus der Entropietabelle, p aus dem idealen Gasgesetz
+            curve = (lambda p_ref, v_ref, t_ref: lambda v: (
+                v, p_ref * (v_ref / v) * properties.isentropic_t_volume(t_ref, v_ref / v) / t_ref))(
+                p1, v1, start['t'])
+            a, b = min(v1, v2), max(v1, v2)
+        elif "isentropic" in titel:
+            constant = p1 * v1 ** k if v1 < v2 else p2 * v2 ** k
+            curve = (lambda c: lambda v: (v, c / v ** k))(constant)
+            a, b = min(v1, v2), max(v1, v2)
+        elif "isothermal" in titel:
+            curve = (lambda c: lambda v: (v, c / v))(p1 * v1)
+            a, b = min(v1, v2), max(v1, v2)
+        else:
+            curve, a, b = _line(v1, p1, v2, p2), 0.0, 1.0
+
+        segments.append(make_segment(label, curve, a, b, ([v1, v2], [p1, p2]), (v1, p1)))
+
+    return segments
+
+
+def ts_segments(solution):
+    cp, cv = solution['medium']['cp'], solution['medium']['cv']
+    R = cp - cv
+    properties = _properties(solution)
+    states = solution['states']
+    segments = []
+
+    list_delta_S = [0]
+
+    def log_curve(offset, isochoric, t_ref):
+        if properties is not None:
+            # Statt c·ln(T/T_ref) die tabellierte Entropieänderung bei konstantem Volumen bzw. Druck
+            delta_s = properties.delta_s_v if isochoric else properties.delta_s_p
+            return lambda T: (offset + delta_s(t_ref, T), T)
+        c = cv if isochoric else cp
+        return lambda T: (offset + c * np.log(T / t_ref), T)
+
+    for i, label in enumerate(PROCESS_CHANGES[solution['process']]):
+        start, end = states[i], states[(i + 1) % len(states)]
+        p1, T1, s1 = start['p'], start['t'], start['s']
+        p2, T2, s2 = end['p'], end['t'], end['s']
+
+        titel = label.lower()
+        if "isentrop" in titel:
+            # Überprüfe, ob es der erste Durchgang ist, wenn ja, setze den Startwert der Entropie auf 0
+            if i == 0:
+                s1 = 0
+            else:
+                s2 = s1
+            curve, a, b = _line(s1, T1, s2, T2), 0.0, 1.0
+            list_delta_S.append(s2)
+            marker = (s2, T2)
+        elif "isochor" in titel:
+            # Bei der Wärmezufuhr beginnt die Kurve bei T1, bei der Abfuhr endet sie bei s = 0
+            offset = list_delta_S[-1] if solution['process'] == "Stirling" and T1 < T2 else 0
+            curve, a, b = log_curve(offset, True, T1 if T1 < T2 else T2), T1, T2
+            s2 = curve(np.array([T2]))[0][0]
+            list_delta_S.append(s2)
+            if i == 3:
+                s2 = 0
+                s1 = list_delta_S[-2]
+            marker = (s2, T2)
+        elif "isobar" in titel:
+            curve, a, b = log_curve(0, False, T1 if T1 < T2 else T2), T1, T2
+            if i == 3:
+                marker = (0, T2)
+                s1 = list_delta_S[-1]
+            else:
+                marker = (s2, T2)
+        else:
+            # Isotherme: Entropieänderung über das ideale Gasgesetz, die Temperatur bleibt konstant
+            R = R if properties is None else properties.R
+            curve = (lambda offset, p_ref, T: lambda p: (offset + R * np.log(p_ref / p), np.full(np.shape(p), T)))(
+                list_delta_S[-1], p1, T1)
+            a, b = p1, p2
+            s2 = curve(np.array([p2]))[0][0]
+            s1 = abs(list_delta_S[-1]) if i > 0 else list_delta_S[-1]
+            list_delta_S.append(s2)
+            marker = (s2, T2)
+
+        segments.append(make_segment(label, curve, a, b, ([marker[0]], [marker[1]]), (s1, T1)))
+
+    return segments
+
+
+def cursor_path(solution, steps, progress):
+    # Punkt im p-v- und T-s-Diagramm für jede Zustandsänderung steps[i] beim Fortschritt progress[i] (0..1).
+    # Der Zustand wird aus der Art der Zustandsänderung bestimmt und dann über dieselben Kurvenfunktionen wie die
+    # gezeichneten Segmente abgebildet, der Punkt liegt also genau auf den Kurven. Ergebnis: (N, 2, 2) mit
+    # [:, 0] = (v, p) und [:, 1] = (s, T).
+    steps, progress = np.asarray(steps), np.asarray(progress, dtype=float)
+    pv, ts = pv_segments(solution), ts_segments(solution)
+    states = solution['states']
+    points = np.full((len(steps), 2, 2), np.nan)
+
+    for i, label in enumerate(PROCESS_CHANGES[solution['process']]):
+        mask = steps == i
+        f = progress[mask]
+        start, end = states[i], states[(i + 1) % len(states)]
+        v = start['v'] + f * (end['v'] - start['v'])
+
+        titel = label.lower()
+        if "isochor" in titel:
+            # Bei konstantem Volumen steigt p linear mit T, die p-v-Gerade hat dann denselben Parameter
+            pv_parameter = f
+            ts_parameter = start['t'] + f * (end['t'] - start['t'])
+        elif "isobar" in titel:
+            pv_parameter = f
+            ts_parameter = start['t'] * v / start['v']
+        elif "isotherm" in titel:
+            pv_parameter = v
+            ts_parameter = start['p'] * start['v'] / v
+        else:
+            # Isentrope bzw. Polytrope: p aus der gezeichneten Kurve (also mit demselben Exponenten), T aus dem idealen
+            # Gasgesetz, im T-s-Diagramm eine Gerade in T
+            pv_parameter = v
+            p = pv[i]['curve'](v)[1]
+            t = start['t'] * p * v / (start['p'] * start['v'])
+            span = end['t'] - start['t']
+            ts_parameter = (t - start['t']) / span if span != 0 else f
+
+        points[mask, 0] = np.column_stack(pv[i]['curve'](pv_parameter))
+        points[mask, 1] = np.column_stack(ts[i]['curve'](ts_parameter))
+    return points
+
+
+def pv_curves(solution, tolerance=PIXEL_TOLERANCE, resolution=RESOLUTION):
+    return sample_segments(pv_segments(solution), tolerance, resolution)
+
+
+def ts_curves(solution, tolerance=PIXEL_TOLERANCE, resolution=RESOLUTION):
+    return sample_segments(ts_segments(solution), tolerance, resolution)
+
+
+@functools.lru_cache(maxsize=SOLUTION_CACHE_SIZE)
+def _cycle_curves_cached(key, tolerance, resolution):
+    solution = solve_cycle_cached(*key)
+    curves = {'pv': pv_curves(solution, tolerance, resolution), 'ts': ts_curves(solution, tolerance, resolution)}
+    # Alle Aufrufer teilen sich diese Arrays, sie sind deshalb schreibgeschützt
+    for segment in curves['pv'] + curves['ts']:
+        segment['x'].flags.writeable = False
+        segment['y'].flags.writeable = False
+    return curves
+
+
+def copy_curves(curves):
+    # Eigene Dicts und Listen um die schreibgeschützten Arrays, wie copy_result im Solver; Änderungen eines
+    # Aufrufers erreichen so weder den Cache noch andere Aufrufer
+    return {name: [dict(segment, markers=tuple(list(values) for values in segment['markers']))
+                   for segment in segments]
+            for name, segments in curves.items()}
+
+
+def cycle_curves(process, t1, p1, v1, cp, cv, k, z, q, property_model=None, tolerance=PIXEL_TOLERANCE,
+                 resolution=RESOLUTION):
+    # Die Arrays werden pro gelöstem Kreisprozess und Auflösung einmal erzeugt und dann wiederverwendet
+    return copy_curves(_cycle_curves_cached(cycle_key(process, t1, p1, v1, cp, cv, k, z, q, property_model),
+                                            float(tolerance), tuple(resolution)))
+
+
+def cache_info():
+    return _cycle_curves_cached.cache_info()
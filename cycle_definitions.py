@@ -0,0 +1,271 @@
+import functools
+
+
+# Arten von Zustandsänderungen, im kompilierten Kreisprozess nur noch als Index gespeichert
+STEP_KINDS = ('isentropic', 'isochoric', 'isothermal', 'isobaric', 'polytropic')
+ISENTROPIC, ISOCHORIC, ISOTHERMAL, ISOBARIC, POLYTROPIC = range(len(STEP_KINDS))
+
+# Größe, die die Zielgröße eines Schritts an dessen Ende festlegt: Volumen, Druck, Temperatur oder Wärme in kJ/kg
+VOLUME, PRESSURE, TEMPERATURE, HEAT = range(4)
+
+# Zielgrößen eines Schritts. Verhältnisse beziehen sich auf den Anfangszustand des Schritts, to_* auf einen
+# anderen Zustand (Index 0 = Zustand 1). Wärme ist positiv, wenn sie zugeführt wird.
+TARGETS = {
+    'compression': VOLUME,          # v1/v2
+    'expansion': VOLUME,            # v2/v1
+    'to_volume': VOLUME,
+    'pressure_ratio': PRESSURE,     # p2/p1
+    'to_pressure': PRESSURE,
+    'temperature_ratio': TEMPERATURE,  # T2/T1
+    'temperature': TEMPERATURE,
+    'to_temperature': TEMPERATURE,
+    'regenerate': TEMPERATURE,      # T2 = T1 + effectiveness · (T_heiß - T1), T_heiß aus dem angegebenen Zustand
+    'heat': HEAT,
+    'heat_from': HEAT,              # Wärme entgegengesetzt gleich der des angegebenen Schritts (Regenerator-Gegenseite)
+}
+
+# Welche Größen eine Zustandsänderung festlegen können; bei der Isochore ist v fest, bei der Isobare p, usw.
+ALLOWED_TARGETS = {
+    ISENTROPIC: (VOLUME, PRESSURE, TEMPERATURE),
+    POLYTROPIC: (VOLUME, PRESSURE, TEMPERATURE),
+    ISOTHERMAL: (VOLUME, PRESSURE),
+    ISOCHORIC: (PRESSURE, TEMPERATURE, HEAT),
+    ISOBARIC: (VOLUME, TEMPERATURE, HEAT),
+}
+
+# Größe, die eine Zustandsänderung unverändert lässt, und Größe, auf die ein to_*-Ziel den Endzustand setzt;
+# damit prüft compile_cycle, ob der letzte Schritt wieder auf Zustand 1 endet
+INVARIANTS = {ISENTROPIC: 's', ISOCHORIC: 'v', ISOTHERMAL: 't', ISOBARIC: 'p', POLYTROPIC: None}
+STATE_TARGETS = {'to_volume': 'v', 'to_pressure': 'p', 'to_temperature': 't'}
+
+# Kreisprozesse als Folge von (Bezeichnung, Zustandsänderung, Zielgröße und Optionen). Werte sind Zahlen oder
+# Namen aus 'parameters'. 'internal' markiert Wärme, die nur innerhalb des Prozesses (Regenerator) übertragen wird
+# und deshalb nicht als zugeführte Wärme zählt. Der letzte Schritt muss wieder auf Zustand 1 enden.
+# 'closed_form' markiert die vier Prozesse der GUI: ihr Wirkungsgrad kommt bei konstanten Stoffwerten und echten
+# Isentropen aus den Lehrbuchformeln in cycle_solver.calculate_efficiency, sonst aus der Energiebilanz.
+CYCLE_DEFINITIONS = {
+    'Otto': {
+        'closed_form': True,
+        'parameters': {'z': "Compression Ratio [v1/v2]", 'q': "Heat Transfer [kJ/kg]"},
+        'steps': [
+            ("Isentropic Compression", 'isentropic', {'compression': 'z'}),
+            ("Isochoric Heat Input", 'isochoric', {'heat': 'q'}),
+            ("Isentropic Expansion", 'isentropic', {'to_volume': 0}),
+            ("Isochoric Heat Output", 'isochoric', {'to_temperature': 0}),
+        ],
+    },
+    'Diesel': {
+        'closed_form': True,
+        'parameters': {'z': "Compression Ratio [v1/v2]", 'q': "Injection Ratio [T3/T2]"},
+        'steps': [
+            ("Isentropic Compression", 'isentropic', {'compression': 'z'}),
+            ("Isobaric Heat Input", 'isobaric', {'temperature_ratio': 'q'}),
+            ("Isentropic Expansion", 'isentropic', {'to_volume': 0}),
+            ("Isochoric Heat Output", 'isochoric', {'to_temperature': 0}),
+        ],
+    },
+    'Stirling': {
+        # Ideal regeneriert: die Wärme der Isochoren bleibt im Regenerator, der Wirkungsgrad ist der Carnot-Wert
+        'closed_form': True,
+        'parameters': {'z': "Compression Ratio [v1/v2]", 'q': "Heat Transfer [kJ/kg]"},
+        'steps': [
+            ("Isothermal Compression", 'isothermal', {'compression': 'z'}),
+            ("Isochoric Heat Input", 'isochoric', {'heat': 'q', 'internal': True}),
+            ("Isothermal Expansion", 'isothermal', {'to_volume': 0}),
+            ("Isochoric Heat Output", 'isochoric', {'to_temperature': 0, 'internal': True}),
+        ],
+    },
+    'Joule': {
+        'closed_form': True,
+        'parameters': {'z': "Pressure Ratio [p2/p1]", 'q': "Heat Transfer [kJ/kg]"},
+        'steps': [
+            ("Isentropic Compression", 'isentropic', {'pressure_ratio': 'z'}),
+            ("Isobaric Heat Input", 'isobaric', {'heat': 'q'}),
+            ("Isentropic Expansion", 'isentropic', {'to_pressure': 0}),
+            ("Isobaric Heat Output", 'isobaric', {'to_temperature': 0}),
+        ],
+    },
+    'Seiliger': {
+        'parameters': {'z': "Compression Ratio [v1/v2]", 'alpha': "Pressure Ratio [p3/p2]",
+                       'phi': "Cut-off Ratio [v4/v3]"},
+        'steps': [
+            ("Isentropic Compression", 'isentropic', {'compression': 'z'}),
+            ("Isochoric Heat Input", 'isochoric', {'pressure_ratio': 'alpha'}),
+            ("Isobaric Heat Input", 'isobaric', {'expansion': 'phi'}),
+            ("Isentropic Expansion", 'isentropic', {'to_volume': 0}),
+            ("Isochoric Heat Output", 'isochoric', {'to_temperature': 0}),
+        ],
+    },
+    'Ericsson': {
+        # Ideal regeneriert wie Stirling, nur mit Isobaren statt Isochoren
+        'parameters': {'z': "Pressure Ratio [p2/p1]", 'tau': "Temperature Ratio [T3/T1]"},
+        'steps': [
+            ("Isothermal Compression", 'isothermal', {'pressure_ratio': 'z'}),
+            ("Isobaric Heat Input", 'isobaric', {'temperature_ratio': 'tau', 'internal': True}),
+            ("Isothermal Expansion", 'isothermal', {'to_pressure': 0}),
+            ("Isobaric Heat Output", 'isobaric', {'to_temperature': 0, 'internal': True}),
+        ],
+    },
+    'Atkinson': {
+        'parameters': {'z': "Compression Ratio [v1/v2]", 'q': "Heat Transfer [kJ/kg]"},
+        'steps': [
+            ("Isentropic Compression", 'isentropic', {'compression': 'z'}),
+            ("Isochoric Heat Input", 'isochoric', {'heat': 'q'}),
+            ("Isentropic Expansion", 'isentropic', {'to_pressure': 0}),
+            ("Isobaric Heat Output", 'isobaric', {'to_temperature': 0}),
+        ],
+    },
+    'Miller': {
+        'parameters': {'z': "Compression Ratio [v1/v2]", 'e': "Expansion Ratio [v4/v3]",
+                       'q': "Heat Transfer [kJ/kg]"},
+        'steps': [
+            ("Isentropic Compression", 'isentropic', {'compression': 'z'}),
+            ("Isochoric Heat Input", 'isochoric', {'heat': 'q'}),
+            ("Isentropic Expansion", 'isentropic', {'expansion': 'e'}),
+            ("Isochoric Heat Output", 'isochoric', {'to_pressure': 0}),
+            ("Isobaric Heat Output", 'isobaric', {'to_temperature': 0}),
+        ],
+    },
+    'Regenerated Joule': {
+        # Der Regenerator wärmt die verdichtete Luft mit dem Abgas nach der Turbine (Zustand 5) vor
+        'parameters': {'z': "Pressure Ratio [p2/p1]", 'q': "Heat Transfer [kJ/kg]",
+                       'epsilon': "Regenerator Effectiveness [-]"},
+        'steps': [
+            ("Isentropic Compression", 'isentropic', {'pressure_ratio': 'z'}),
+            ("Regenerator Heat Input", 'isobaric', {'regenerate': 4, 'effectiveness': 'epsilon', 'internal': True}),
+            ("Isobaric Heat Input", 'isobaric', {'heat': 'q'}),
+            ("Isentropic Expansion", 'isentropic', {'to_pressure': 0}),
+            ("Regenerator Heat Output", 'isobaric', {'heat_from': 1, 'internal': True}),
+            ("Isobaric Heat Output", 'isobaric', {'to_temperature': 0}),
+        ],
+    },
+}
+
+
+class CompiledCycle:
+    # Kreisprozess mit aufgelösten Zielgrößen. Pro Schritt bleiben (Art, festgelegte Größe, Zielfunktion,
+    # Exponentfunktion, intern); die Zielfunktion rechnet (Anfangszustand, Zustände, Wärmen, Parameter) direkt
+    # in den Zielwert um, beim Auswerten wird also nichts mehr nachgeschlagen oder verglichen.
+    # feedback_states/feedback_heats: Zustände und Wärmen, die ein früherer Schritt schon braucht (Vorwärtsbezüge)
+    # dependencies: Parameter, die jeder Schritt außer seinem Anfangszustand verwendet
+    def __init__(self, name, labels, steps, parameters, feedback_states=(), feedback_heats=(), dependencies=(),
+                 closed_form=False):
+        self.name = name
+        self.labels = labels
+        self.steps = steps
+        self.parameters = parameters
+        self.feedback_states = tuple(sorted(set(feedback_states)))
+        self.feedback_heats = tuple(sorted(set(feedback_heats)))
+        self.iterative = bool(self.feedback_states or self.feedback_heats)
+        self.internal = tuple(step[4] for step in steps)
+        self.dependencies = tuple(dependencies) or ((),) * len(steps)
+        self.closed_form = closed_form
+
+
+def _parameter(value, parameters):
+    # Zahl oder Name eines Parameters als Funktion der Parameter-Arrays
+    if isinstance(value, str):
+        if value not in parameters:
+            raise ValueError(f"Unknown cycle parameter: {value}")
+        return lambda values: values[value]
+    value = float(value)
+    return lambda values: value
+
+
+def _target_function(target, argument, extra):
+    # Übersetzt eine Zielgröße in eine Funktion (Anfangszustand, Zustände, Wärmen, Parameter) -> Zielwert
+    if target == 'compression':
+        return lambda start, states, heats, values: start[2] / argument(values)
+    if target == 'expansion':
+        return lambda start, states, heats, values: start[2] * argument(values)
+    if target == 'pressure_ratio':
+        return lambda start, states, heats, values: start[1] * argument(values)
+    if target == 'temperature_ratio':
+        return lambda start, states, heats, values: start[0] * argument(values)
+    if target in ('temperature', 'heat'):
+        return lambda start, states, heats, values: argument(values)
+    if target == 'to_volume':
+        return lambda start, states, heats, values: states[argument][2]
+    if target == 'to_pressure':
+        return lambda start, states, heats, values: states[argument][1]
+    if target == 'to_temperature':
+        return lambda start, states, heats, values: states[argument][0]
+    if target == 'regenerate':
+        return lambda start, states, heats, values: start[0] + extra(values) * (states[argument][0] - start[0])
+    return lambda start, states, heats, values: -heats[argument]
+
+
+def _closes(kinds, targets):
+    # Verfolgt pro Zustand, welche der Größen v, p, t, s sicher gleich denen von Zustand 1 sind. Zwei davon legen
+    # den Zustand des idealen Gases fest; nach dem letzten Schritt müssen es also mindestens zwei sein.
+    everything = {'v', 'p', 't', 's'}
+    known = [everything]
+    for i, (kind, (target, argument)) in enumerate(zip(kinds, targets)):
+        start = known[i]
+        if start == everything and target in STATE_TARGETS and argument == 0:
+            # Vom Zustand 1 aus zurück auf einen Wert von Zustand 1 bleibt der Zustand stehen
+            end = set(everything)
+        else:
+            end = {INVARIANTS[kind]} & start
+            if target in STATE_TARGETS and argument <= i and STATE_TARGETS[target] in known[argument]:
+                end.add(STATE_TARGETS[target])
+        known.append(everything if len(end) >= 2 else end)
+    return known[-1] == everything
+
+
+def compile_cycle(definition, name=None):
+    steps, labels = [], []
+    parameters = tuple(definition.get('parameters', ()))
+    count = len(definition['steps'])
+    feedback_states, feedback_heats = [], []
+    kinds, resolved, dependencies = [], [], []
+    for i, (label, kind, options) in enumerate(definition['steps']):
+        if kind not in STEP_KINDS:
+            raise ValueError(f"Unknown change of state: {kind}")
+        kind = STEP_KINDS.index(kind)
+        targets = [target for target in options if target in TARGETS]
+        if len(targets) != 1:
+            raise ValueError(f"Step {i + 1} needs exactly one of: {', '.join(TARGETS)}")
+        target = targets[0]
+        quantity = TARGETS[target]
+        if quantity not in ALLOWED_TARGETS[kind]:
+            raise ValueError(f"A {STEP_KINDS[kind]} change cannot be defined by {target}")
+
+        if target in ('to_volume', 'to_pressure', 'to_temperature', 'regenerate', 'heat_from'):
+            argument = int(options[target])
+            if not 0 <= argument < count:
+                raise ValueError(f"Step {i + 1} refers to a state or step that does not exist: {argument}")
+            # Zustand j ist nach Schritt j - 1 bekannt, die Wärme von Schritt j nach Schritt j
+            if target == 'heat_from' and argument >= i:
+                feedback_heats.append(argument)
+            elif target != 'heat_from' and argument > i:
+                feedback_states.append(argument)
+        else:
+            argument = _parameter(options[target], parameters)
+        kinds.append(kind)
+        resolved.append((target, argument))
+
+        extra = _parameter(options.get('effectiveness', 1.0), parameters) if target == 'regenerate' else None
+        if kind == POLYTROPIC:
+            if 'n' not in options:
+                raise ValueError(f"Step {i + 1} is polytropic and needs an exponent n")
+            exponent = _parameter(options['n'], parameters)
+        else:
+            exponent = None
+        steps.append((kind, quantity, _target_function(target, argument, extra), exponent,
+                      bool(options.get('internal', False))))
+        labels.append(label)
+        # Zustands- und Schrittbezüge sind Indizes, Parameter stehen als Namen in den Optionen
+        dependencies.append(tuple(options[name] for name in (target, 'effectiveness', 'n')
+                                  if isinstance(options.get(name), str)))
+    if not _closes(kinds, resolved):
+        raise ValueError("The cycle is not closed: the last step must end at state 1.")
+    return CompiledCycle(name, labels, steps, parameters, feedback_states, feedback_heats, dependencies,
+                         bool(definition.get('closed_form', False)))
+
+
+@functools.lru_cache(maxsize=None)
+def compiled_cycle(name):
+    if name not in CYCLE_DEFINITIONS:
+        raise ValueError(f"Unknown thermodynamic cycle: {name}")
+    return compile_cycle(CYCLE_DEFINITIONS[name], name)
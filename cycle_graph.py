@@ -0,0 +1,57 @@
+import numpy as np
+
+from cycle_batch import PROCESS_DTYPE, STATE_DTYPE, solve_compiled
+from cycle_definitions import compile_cycle, compiled_cycle
+
+
+def graph_dtype(cycle):
+    # Ein Zustand und eine Energiebilanz pro Schritt, wie RESULT_DTYPE im Batch-Solver ohne das Prozessfeld
+    return np.dtype([
+        ('states', STATE_DTYPE, (len(cycle.steps),)),
+        ('processes', PROCESS_DTYPE, (len(cycle.steps),)),
+        ('efficiency', 'f8'),
+    ])
+
+
+def solve_graph(cycle, t1, p1, v1, cp, cv, k, property_model=None, **parameters):
+    # cycle: Name aus CYCLE_DEFINITIONS, eine Definition oder ein CompiledCycle. Alle Eingaben und Parameter
+    # werden gegeneinander gebroadcastet; gerechnet wird mit denselben Schrittfunktionen wie in solve_cycle und
+    # solve_batch. Schritt i liefert Zustand (i + 1) % N, h und s eines Zustands sind wie dort die Änderungen
+    # über den Schritt, der auf ihn führt.
+    if isinstance(cycle, str):
+        cycle = compiled_cycle(cycle)
+    elif isinstance(cycle, dict):
+        cycle = compile_cycle(cycle)
+    missing = [name for name in cycle.parameters if name not in parameters]
+    if missing:
+        raise ValueError(f"Missing cycle parameters: {', '.join(missing)}")
+
+    names = list(cycle.parameters)
+    arrays = np.broadcast_arrays(*(np.asarray(value, dtype=float) for value in
+                                   (t1, p1, v1, cp, cv, k, *(parameters[name] for name in names))))
+    properties = None
+    if property_model is not None:
+        from cycle_properties import property_table
+        properties = property_table(property_model)
+
+    out = np.zeros(arrays[0].shape, dtype=graph_dtype(cycle))
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        solve_compiled(cycle, out, *arrays[:6], dict(zip(names, arrays[6:])), properties)
+    return out
+
+
+def graph_columns(cycle, result):
+    # Flache Spalten wie cycle_batch.result_columns, aber für beliebig viele Zustände
+    if isinstance(cycle, str):
+        cycle = compiled_cycle(cycle)
+    count = len(cycle.steps)
+    steps = [f"{i + 1}{(i + 1) % count + 1}" for i in range(count)]
+    columns = {'process': np.full(result.shape, cycle.name or '')}
+    for name in STATE_DTYPE.names:
+        for i in range(count):
+            columns[f"{name}{i + 1}"] = result['states'][name][..., i]
+    for name in PROCESS_DTYPE.names:
+        for i, step in enumerate(steps):
+            columns[f"{name}{step}"] = result['processes'][name][..., i]
+    columns['efficiency'] = result['efficiency']
+    return columns
@@ -0,0 +1,270 @@
+import itertools
+import math
+import os
+
+import numpy as np
+
+
+# Stichproben pro Block beim Durchlaufen gemessener Druckverläufe; begrenzt den Speicher unabhängig von der Dateigröße
+CHUNK_SIZE = 1_000_000
+
+# Kurbelwinkel eines Arbeitsspiels, 720° beim Viertakt und 360° beim Zweitakt
+CYCLE_DEGREES = 720.0
+
+# Winkelklassen für Min/Max/Mittelwert, etwa eine pro Pixel der Diagrammbreite
+DISPLAY_BINS = 1000
+
+# Umrechnung gemessener Drücke in bar
+PRESSURE_UNITS = {'bar': 1.0, 'pa': 1e-5, 'kpa': 1e-2, 'mpa': 10.0}
+
+
+def open_trace(path):
+    # Gemessener p-v-Verlauf als (v, p) ohne die Datei zu laden: .npy wird per mmap geöffnet, andere Dateien gelten
+    # als rohe float64-Paare (v, p). Ein .npy darf ein (N, 2)-Array mit den Spalten v, p oder Felder 'v' und 'p' haben.
+    if os.path.splitext(path)[1].lower() == '.npy':
+        data = np.load(path, mmap_mode='r')
+    else:
+        data = np.memmap(path, dtype=np.float64, mode='r').reshape(-1, 2)
+    if data.dtype.names:
+        return data['v'], data['p']
+    if data.ndim != 2 or data.shape[1] != 2:
+        raise ValueError(f"Expected a (N, 2) array of volume and pressure in {path}")
+    return data[:, 0], data[:, 1]
+
+
+class PolytropicFit:
+    # Lineare Regression ln p = ln C - n ln v über beliebig viele Blöcke. Pro Block werden Mittelwerte und
+    # zentrierte Summen gebildet und dann zusammengeführt (Chan et al.), so bleibt die Summe über Milliarden
+    # Stichproben ohne Auslöschung und der Speicher hängt nur von der Blockgröße ab.
+    def __init__(self):
+        self.count = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self.sxx = 0.0
+        self.sxy = 0.0
+        self.syy = 0.0
+
+    def add(self, v, p):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x = np.log(np.asarray(v, dtype=float))
+            y = np.log(np.asarray(p, dtype=float))
+        valid = np.isfinite(x) & np.isfinite(y)
+        if not valid.all():
+            x, y = x[valid], y[valid]
+        count = len(x)
+        if count == 0:
+            return
+        mean_x, mean_y = x.mean(), y.mean()
+        dx, dy = x - mean_x, y - mean_y
+        total = self.count + count
+        delta_x, delta_y = mean_x - self.mean_x, mean_y - self.mean_y
+        weight = self.count * count / total
+        self.sxx += dx @ dx + delta_x * delta_x * weight
+        self.sxy += dx @ dy + delta_x * delta_y * weight
+        self.syy += dy @ dy + delta_y * delta_y * weight
+        self.mean_x += delta_x * count / total
+        self.mean_y += delta_y * count / total
+        self.count = total
+
+    def result(self):
+        if self.count < 2 or self.sxx == 0:
+            raise ValueError("Not enough distinct volumes to fit a polytropic exponent.")
+        n = -self.sxy / self.sxx
+        r_squared = self.sxy ** 2 / (self.sxx * self.syy) if self.syy else 1.0
+        return {
+            'n': n,
+            # p·v^n = constant mit p und v in den Einheiten der Messung
+            'constant': float(np.exp(self.mean_y + n * self.mean_x)),
+            'r_squared': r_squared,
+            'samples': self.count,
+        }
+
+
+def phase_mask(v, previous, phase):
+    # Verdichtung: Volumen nimmt ab, Expansion: Volumen nimmt zu. previous ist das letzte Volumen des
+    # vorherigen Blocks, damit die Richtung auch an Blockgrenzen stimmt.
+    dv = np.diff(v, prepend=v[0] if previous is None else previous)
+    return dv < 0 if phase == 'compression' else dv > 0
+
+
+def fit_polytropic(v, p, phase=None, v_range=None, p_min=None, chunk_size=CHUNK_SIZE):
+    # Polytropenexponent aus einem gemessenen Verlauf. v und p dürfen memmaps sein, gelesen wird blockweise.
+    # phase: None, 'compression' oder 'expansion'; v_range: (v_min, v_max) schneidet z.B. Ladungswechsel
+    # und Verbrennung ab; p_min blendet Messrauschen bei kleinen Drücken aus.
+    if len(v) != len(p):
+        raise ValueError("Volume and pressure traces must have the same length.")
+    if phase not in (None, 'compression', 'expansion'):
+        raise ValueError(f"Unknown phase: {phase}")
+    fit = PolytropicFit()
+    previous = None
+    for start in range(0, len(v), chunk_size):
+        v_chunk = np.asarray(v[start:start + chunk_size], dtype=float)
+        p_chunk = np.asarray(p[start:start + chunk_size], dtype=float)
+        mask = np.ones(len(v_chunk), dtype=bool)
+        if phase is not None:
+            mask &= phase_mask(v_chunk, previous, phase)
+        if v_range is not None:
+            mask &= (v_chunk >= v_range[0]) & (v_chunk <= v_range[1])
+        if p_min is not None:
+            mask &= p_chunk >= p_min
+        previous = v_chunk[-1]
+        fit.add(v_chunk[mask], p_chunk[mask])
+    return fit.result()
+
+
+class SliderCrank:
+    # Zylindervolumen aus dem Kurbelwinkel (0° = oberer Totpunkt) für einen Kurbeltrieb mit Pleuel; Längen in m
+    def __init__(self, bore, stroke, conrod, compression_ratio):
+        if conrod <= stroke / 2:
+            raise ValueError("The connecting rod must be longer than the crank radius.")
+        if compression_ratio <= 1:
+            raise ValueError("The compression ratio must be greater than 1.")
+        self.bore = bore
+        self.stroke = stroke
+        self.conrod = conrod
+        self.compression_ratio = compression_ratio
+        self.area = math.pi / 4 * bore ** 2
+        self.displacement = self.area * stroke
+        self.clearance = self.displacement / (compression_ratio - 1)
+
+    def volume(self, angle):
+        theta = np.radians(angle)
+        radius = self.stroke / 2
+        piston = self.conrod + radius * (1 - np.cos(theta)) - np.sqrt(self.conrod ** 2 - (radius * np.sin(theta)) ** 2)
+        return self.clearance + self.area * piston
+
+
+def _text_chunks(path, chunk_size, columns):
+    # CSV oder Leerzeichen-getrennt; eine Kopfzeile wird erkannt und erlaubt Spaltennamen statt Indizes
+    with open(path) as file:
+        first = file.readline()
+        delimiter = ',' if ',' in first else None
+        fields = [field.strip().lower() for field in first.split(delimiter)]
+        try:
+            [float(field) for field in fields]
+            lines = itertools.chain([first], file)
+        except ValueError:
+            lines = file
+            columns = [fields.index(column.lower()) if isinstance(column, str) else column for column in columns]
+        if any(isinstance(column, str) for column in columns):
+            raise ValueError(f"{path} has no header line, columns must be given as numbers")
+        while True:
+            block = list(itertools.islice(lines, chunk_size))
+            if not block:
+                break
+            data = np.loadtxt(block, delimiter=delimiter, usecols=columns, ndmin=2)
+            yield data[:, 0], data[:, 1]
+
+
+def read_log_chunks(path, chunk_size=CHUNK_SIZE, columns=(0, 1), dtype='f8'):
+    # Liefert (Kurbelwinkel in Grad, Druck) blockweise. .npy wird per mmap geöffnet, .csv/.txt zeilenweise
+    # gelesen, alles andere gilt als rohe Binärdatei mit zwei Werten (Winkel, Druck) vom Typ dtype pro Stichprobe.
+    # Bei Binärdateien sind die Spalten Indizes 0 und 1.
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.csv', '.txt'):
+        yield from _text_chunks(path, chunk_size, columns)
+        return
+    if extension != '.npy':
+        # Rohdaten blockweise mit fromfile statt mmap, damit gelesene Seiten nicht im Prozess liegen bleiben
+        dtype = np.dtype(dtype)
+        with open(path, 'rb') as file:
+            while True:
+                data = np.fromfile(file, dtype=dtype, count=2 * chunk_size)
+                if len(data) < 2:
+                    break
+                data = data[:len(data) // 2 * 2].reshape(-1, 2)
+                yield data[:, columns[0]].astype(float), data[:, columns[1]].astype(float)
+        return
+    data = np.load(path, mmap_mode='r')
+    if data.dtype.names:
+        angle, pressure = (data[data.dtype.names[column] if isinstance(column, int) else column] for column in columns)
+    else:
+        angle, pressure = data[:, columns[0]], data[:, columns[1]]
+    for start in range(0, len(angle), chunk_size):
+        yield (np.asarray(angle[start:start + chunk_size], dtype=float),
+               np.asarray(pressure[start:start + chunk_size], dtype=float))
+
+
+class IndicatorAccumulator:
+    # Verarbeitet einen Druckverlauf blockweise mit konstantem Speicher: pro Winkelklasse Minimum, Maximum und
+    # Summe des Drucks für die Anzeige, pro abgeschlossenem Arbeitsspiel die indizierte Arbeit ∮p dV.
+    # Der Winkel darf fortlaufend sein oder bei cycle_degrees umspringen.
+    def __init__(self, crank, cycle_degrees=CYCLE_DEGREES, bins=DISPLAY_BINS, pressure_scale=1.0):
+        self.crank = crank
+        self.cycle_degrees = cycle_degrees
+        self.bins = bins
+        self.pressure_scale = pressure_scale
+        self.p_min = np.full(bins, np.inf)
+        self.p_max = np.full(bins, -np.inf)
+        self.p_sum = np.zeros(bins)
+        self.count = np.zeros(bins, dtype=np.int64)
+        self.work = []
+        self.current_work = 0.0
+        self.current_complete = None
+        self.previous = None
+        self.samples = 0
+
+    def add(self, angle, pressure):
+        p = np.asarray(pressure, dtype=float) * self.pressure_scale
+        valid = np.isfinite(p) & np.isfinite(angle)
+        if not valid.all():
+            angle, p = angle[valid], p[valid]
+        if len(p) == 0:
+            return
+        self.samples += len(p)
+        phase = np.mod(angle, self.cycle_degrees)
+        volume = self.crank.volume(phase)
+
+        index = np.minimum((phase * (self.bins / self.cycle_degrees)).astype(np.intp), self.bins - 1)
+        np.minimum.at(self.p_min, index, p)
+        np.maximum.at(self.p_max, index, p)
+        np.add.at(self.p_sum, index, p)
+        self.count += np.bincount(index, minlength=self.bins)
+
+        if self.previous is None:
+            # Das erste Arbeitsspiel zählt nur, wenn die Messung an seinem Anfang beginnt
+            step = abs(phase[1] - phase[0]) if len(phase) > 1 else 0
+            self.current_complete = phase[0] <= step
+        else:
+            phase = np.concatenate(([self.previous[0]], phase))
+            p = np.concatenate(([self.previous[1]], p))
+            volume = np.concatenate(([self.previous[2]], volume))
+        self.previous = (phase[-1], p[-1], volume[-1])
+        if len(p) < 2:
+            return
+
+        # Trapezregel für p dV in J (bar · m³ = 1e5 J); ein Umspringen des Winkels beginnt ein neues Arbeitsspiel
+        work = 0.5 * (p[1:] + p[:-1]) * np.diff(volume) * 1e5
+        cycle = np.cumsum(phase[1:] < phase[:-1])
+        sums = np.bincount(cycle, weights=work, minlength=cycle[-1] + 1)
+        sums[0] += self.current_work
+        for i, value in enumerate(sums[:-1]):
+            if i > 0 or self.current_complete:
+                self.work.append(value)
+        if len(sums) > 1:
+            self.current_complete = True
+        self.current_work = sums[-1]
+
+    def summary(self):
+        valid = self.count > 0
+        angle = (np.arange(self.bins)[valid] + 0.5) * (self.cycle_degrees / self.bins)
+        work = np.asarray(self.work)
+        return {
+            'angle': angle,
+            'volume': self.crank.volume(angle),
+            'p_mean': self.p_sum[valid] / self.count[valid],
+            'p_min': self.p_min[valid],
+            'p_max': self.p_max[valid],
+            'work': work,
+            # Indizierter Mitteldruck in bar
+            'imep': work / self.crank.displacement / 1e5,
+            'samples': self.samples,
+        }
+
+
+def read_indicator(path, crank, cycle_degrees=CYCLE_DEGREES, bins=DISPLAY_BINS, pressure_unit='bar',
+                   chunk_size=CHUNK_SIZE, columns=(0, 1), dtype='f8'):
+    accumulator = IndicatorAccumulator(crank, cycle_degrees, bins, PRESSURE_UNITS[pressure_unit.lower()])
+    for angle, pressure in read_log_chunks(path, chunk_size, columns, dtype):
+        accumulator.add(angle, pressure)
+    return accumulator.summary()
@@ -0,0 +1,106 @@
+import numpy as np
+
+from cycle_batch import solve_batch
+from cycle_sensitivity import OUTPUTS, cycle_outputs
+from cycle_solver import PROCESS_CHANGES
+
+
+# Zielgrößen wie im Ergebnis des Batch-Solvers: Wirkungsgrad in %, Nutzarbeit in kJ/kg, T_max in K, p_max in bar
+TARGETS = OUTPUTS
+
+# Gesuchte Eingabe: Verdichtungs- bzw. Druckverhältnis z oder Wärmezufuhr q (beim Diesel das Einspritzverhältnis)
+UNKNOWNS = ('z', 'q')
+
+# Standard-Suchintervalle; die Wurzel muss dazwischen liegen, sonst ist das Ziel nicht erreichbar (NaN)
+DEFAULT_BOUNDS = {'z': (1.0, 100.0), 'q': (0.0, 20_000.0)}
+# Beim Diesel reicht das Einspritzverhältnis höchstens bis z, sonst endet die Einspritzung erst nach dem unteren
+# Totpunkt; None steht für die obere Grenze z der jeweiligen Zeile
+DIESEL_PHI_BOUNDS = (1.0 + 1e-9, None)
+
+MAX_ITERATIONS = 100
+TOLERANCE = 1e-12
+
+
+def default_bounds(process, unknown):
+    if process == "Diesel" and unknown == 'q':
+        return DIESEL_PHI_BOUNDS
+    return DEFAULT_BOUNDS[unknown]
+
+
+def solve_inverse(process, target, value, unknown, t1, p1, cp, cv, k, z=None, q=None, bounds=None,
+                  tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS):
+    # Sucht für jede Zeile den Wert von unknown ('z' oder 'q'), bei dem target den Wert value annimmt.
+    # Newton-Schritte mit den analytischen Ableitungen; fällt ein Schritt aus dem Intervall, wird halbiert.
+    # Liegt das Ziel nicht zwischen den Intervallgrenzen, ist das Ergebnis NaN.
+    if target not in TARGETS:
+        raise ValueError(f"Unknown target: {target}")
+    if unknown not in UNKNOWNS:
+        raise ValueError(f"Can only solve for z or q, not {unknown}")
+    if process not in PROCESS_CHANGES:
+        raise ValueError(f"Unknown thermodynamic cycle: {process}")
+    fixed = q if unknown == 'z' else z
+    if fixed is None:
+        raise ValueError(f"Solving for {unknown} needs a value for {'q' if unknown == 'z' else 'z'}")
+
+    lower, upper = bounds if bounds is not None else default_bounds(process, unknown)
+    if upper is None:
+        upper = z
+    arrays = np.broadcast_arrays(*(np.asarray(array, dtype=float)
+                                   for array in (value, t1, p1, cp, cv, k, fixed, lower, upper)))
+    shape = arrays[0].shape
+    value, t1, p1, cp, cv, k, fixed, lo, hi = (np.array(array).reshape(-1) for array in arrays)
+    column = 1 if unknown == 'z' else 2
+
+    def evaluate(x, index):
+        inputs = (x, fixed[index]) if unknown == 'z' else (fixed[index], x)
+        outputs = cycle_outputs(process, t1[index], p1[index], cp[index], cv[index], k[index], *inputs)[target]
+        return outputs[0] - value[index], outputs[column]
+
+    everything = np.arange(len(value))
+    f_lo, _ = evaluate(lo, everything)
+    f_hi, _ = evaluate(hi, everything)
+    with np.errstate(invalid='ignore'):
+        reachable = np.isfinite(f_lo) & np.isfinite(f_hi) & (np.sign(f_lo) != np.sign(f_hi))
+    result = np.full(len(value), np.nan)
+    result[f_lo == 0] = lo[f_lo == 0]
+    result[f_hi == 0] = hi[f_hi == 0]
+    reachable &= (f_lo != 0) & (f_hi != 0)
+
+    # Nur die noch nicht konvergierten Zeilen werden weitergerechnet
+    active = np.nonzero(reachable)[0]
+    lo, hi, f_lo = lo[active], hi[active], f_lo[active]
+    x = 0.5 * (lo + hi)
+    scale = np.maximum(np.abs(value[active]), 1.0)
+    for _ in range(max_iterations):
+        if len(active) == 0:
+            break
+        f, df = evaluate(x, active)
+        with np.errstate(invalid='ignore'):
+            same_side = np.sign(f) == np.sign(f_lo)
+        lo = np.where(same_side, x, lo)
+        f_lo = np.where(same_side, f, f_lo)
+        hi = np.where(same_side, hi, x)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            newton = x - f / df
+            inside = np.isfinite(newton) & (newton > np.minimum(lo, hi)) & (newton < np.maximum(lo, hi))
+        step = np.where(inside, newton, 0.5 * (lo + hi))
+
+        done = (np.abs(f) <= tolerance * scale) | (np.abs(step - x) <= tolerance * np.maximum(np.abs(x), 1.0))
+        result[active[done]] = np.where(np.abs(f[done]) <= tolerance * scale[done], x[done], step[done])
+        keep = ~done
+        active, lo, hi, f_lo, scale, x = active[keep], lo[keep], hi[keep], f_lo[keep], scale[keep], step[keep]
+
+    # Nach max_iterations bleibt der beste Stand des Intervalls stehen
+    result[active] = x
+    return result.reshape(shape)
+
+
+def solve_inverse_cycles(process, target, value, unknown, t1, p1, v1, cp, cv, k, z=None, q=None, **options):
+    # Löst das inverse Problem und rechnet die gefundenen Kreisprozesse mit dem Batch-Solver vollständig durch
+    x = solve_inverse(process, target, value, unknown, t1, p1, cp, cv, k, z=z, q=q, **options)
+    if unknown == 'z':
+        z = x
+    else:
+        q = x
+    return x, solve_batch(process, t1, p1, v1, cp, cv, k, z, q)
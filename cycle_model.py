@@ -0,0 +1,63 @@
+from cycle_definitions import compiled_cycle
+from cycle_solver import PROCESS_CHANGES, CalculationContext, cycle_result, solve_step, step_parameters
+
+
+# Eingaben, von denen alle Schritte abhängen; z und q wirken nur auf die Schritte, die sie verwenden
+GLOBAL_INPUTS = ('process', 't1', 'p1', 'v1', 'cp', 'cv', 'k', 'property_model')
+
+
+class CycleModel:
+    # Hält die zuletzt gerechneten Schritte eines Kreisprozesses. Ändert sich nur eine Eingabe, wird ab dem ersten
+    # Schritt neu gerechnet, der davon abhängt; die Schritte davor samt ihren Zuständen und Wärmen bleiben erhalten.
+    # Ändert sich z.B. beim Otto-Prozess nur q, bleibt die Verdichtung 1 → 2 stehen.
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.inputs = None
+        self.steps = []
+        self.result = None
+
+    def first_dirty_step(self, inputs):
+        if self.inputs is None or any(self.inputs[name] != inputs[name] for name in GLOBAL_INPUTS):
+            return 0
+        for i in range(len(self.steps)):
+            if any(self.inputs[name] != inputs[name] for name in step_parameters(inputs['process'], i)):
+                return i
+        return None
+
+    def update(self, process, t1, p1, v1, cp, cv, k, z, q, property_model=None):
+        # Liefert das Ergebnis wie solve_cycle und die Indizes der neu gerechneten Schritte.
+        # Schritt i führt auf Zustand (i + 1) % N, diese Zustände haben sich also womöglich geändert.
+        if process not in PROCESS_CHANGES:
+            raise ValueError(f"Unknown thermodynamic cycle: {process}")
+        inputs = {'process': process, 't1': t1, 'p1': p1, 'v1': v1, 'cp': cp, 'cv': cv, 'k': k, 'z': z, 'q': q,
+                  'property_model': property_model}
+        first = self.first_dirty_step(inputs)
+        if first is None:
+            return self.result, []
+
+        properties = None
+        if property_model is not None:
+            from cycle_properties import property_table
+            properties = property_table(property_model)
+
+        # Kontext so wiederherstellen, wie er nach Schritt first - 1 war
+        cycle = compiled_cycle(process)
+        context = CalculationContext(cycle, (t1, p1, v1), cp, cv, k, properties)
+        parameters = {'z': z, 'q': q}
+        steps = self.steps[:first]
+        for i, (state, values) in enumerate(steps):
+            context.heats[i] = values.q
+            if i + 1 < len(cycle.steps):
+                context.states[i + 1] = (state.t, state.p, state.v)
+
+        for i in range(first, len(cycle.steps)):
+            # Schlägt ein Schritt fehl, bleiben self.steps und self.result beim letzten gültigen Stand
+            steps.append(solve_step(context, i, parameters))
+
+        self.inputs = inputs
+        self.steps = steps
+        self.result = cycle_result(context, parameters, property_model, [step[0] for step in steps],
+                                   [step[1] for step in steps])
+        return self.result, list(range(first, len(steps)))
@@ -0,0 +1,198 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from cycle_batch import solve_batch
+from cycle_solver import MEDIA_PROPERTIES
+
+
+# Ausgaben pro Stichprobe, Spalten des gemeinsamen Ergebnispuffers
+MC_OUTPUTS = ('efficiency', 'net_work', 't_max', 'p_max')
+
+# Eingaben, für die eine Verteilung angegeben werden kann
+MC_INPUTS = ('t1', 'p1', 'z', 'q', 'cp', 'cv', 'k')
+
+# Stichproben, die ein Worker auf einmal zieht und rechnet
+CHUNK_SIZE = 250_000
+
+# Klassen der Histogramme und Kreisprozesse, aus denen die Bänder im p-v- und T-s-Diagramm bestimmt werden
+HISTOGRAM_BINS = 100
+BAND_SAMPLES = 2000
+
+PERCENTILES = (2.5, 5, 25, 50, 75, 95, 97.5)
+
+
+def parse_distribution(text):
+    # "300" ist ein fester Wert, sonst "normal:mittelwert:std", "uniform:min:max" oder "triangular:min:modus:max"
+    kind, *values = text.split(':')
+    if not values:
+        return float(kind)
+    return (kind.lower(), *(float(value) for value in values))
+
+
+def draw(rng, distribution, size):
+    if np.isscalar(distribution):
+        return np.full(size, float(distribution))
+    kind, *values = distribution
+    if kind == 'normal' and len(values) == 2:
+        return rng.normal(values[0], values[1], size)
+    if kind == 'uniform' and len(values) == 2:
+        return rng.uniform(values[0], values[1], size)
+    if kind == 'triangular' and len(values) == 3:
+        return rng.triangular(values[0], values[1], values[2], size)
+    raise ValueError(f"Unknown distribution: {':'.join(str(value) for value in distribution)}")
+
+
+def medium_distributions(distributions, medium='Air'):
+    # Nicht angegebene Stoffwerte kommen wie in update_properties aus dem Medium. Wird cp oder cv gestreut,
+    # ohne dass k angegeben ist, folgt k pro Stichprobe aus cp / cv.
+    properties = MEDIA_PROPERTIES.get(medium)
+    if not properties or properties['cp'] == '':
+        raise ValueError(f"Unknown medium: {medium}")
+    unknown = set(distributions) - set(MC_INPUTS)
+    if unknown:
+        raise ValueError(f"Unknown inputs: {', '.join(sorted(unknown))}")
+    missing = [name for name in ('t1', 'p1', 'z', 'q') if name not in distributions]
+    if missing:
+        raise ValueError(f"Missing distributions: {', '.join(missing)}")
+    merged = {name: properties[name] for name in ('cp', 'cv', 'k')}
+    if 'k' not in distributions and ('cp' in distributions or 'cv' in distributions):
+        merged['k'] = None
+    merged.update(distributions)
+    return merged
+
+
+def draw_inputs(rng, distributions, size):
+    inputs = {name: draw(rng, distributions[name], size) for name in MC_INPUTS if distributions[name] is not None}
+    if distributions['k'] is None:
+        inputs['k'] = inputs['cp'] / inputs['cv']
+    inputs['v1'] = (inputs['cp'] - inputs['cv']) * inputs['t1'] / (inputs['p1'] * 1e5)
+    return inputs
+
+
+def solve_samples(process, inputs):
+    result = solve_batch(process, *(inputs[name] for name in ('t1', 'p1', 'v1', 'cp', 'cv', 'k', 'z', 'q')))
+    return result, np.column_stack([result['efficiency'], -result['processes']['w'].sum(axis=-1),
+                                    result['states']['t'].max(axis=-1), result['states']['p'].max(axis=-1)])
+
+
+def _solve_chunk(name, size, process, distributions, seed, start, stop):
+    # Der Worker zieht seine Stichproben selbst und schreibt nur die Ergebnisse in den gemeinsamen Puffer,
+    # zwischen den Prozessen werden also keine Arrays übertragen
+    buffer = shared_memory.SharedMemory(name=name)
+    try:
+        outputs = np.ndarray((size, len(MC_OUTPUTS)), dtype=float, buffer=buffer.buf)
+        inputs = draw_inputs(np.random.default_rng(seed), distributions, stop - start)
+        outputs[start:stop] = solve_samples(process, inputs)[1]
+        del outputs
+    finally:
+        buffer.close()
+    return stop - start
+
+
+def summarize(outputs, percentiles=PERCENTILES, bins=HISTOGRAM_BINS):
+    summary = {'samples': len(outputs)}
+    for i, name in enumerate(MC_OUTPUTS):
+        values = outputs[:, i]
+        values = values[np.isfinite(values)]
+        if len(values) == 0:
+            # Keine gültige Stichprobe, z.B. wenn die Verteilungen nur ungültige Eingaben liefern
+            summary[name] = {'valid': 0, 'mean': np.nan, 'std': np.nan,
+                             'percentiles': dict.fromkeys(percentiles, np.nan),
+                             'histogram': (np.zeros(0, dtype=np.intp), np.zeros(0))}
+            continue
+        counts, edges = np.histogram(values, bins=bins)
+        summary[name] = {'valid': len(values), 'mean': values.mean(), 'std': values.std(),
+                         'percentiles': dict(zip(percentiles, np.percentile(values, percentiles))),
+                         'histogram': (counts, edges)}
+    return summary
+
+
+def run_monte_carlo(process, distributions, samples=1_000_000, medium='Air', workers=None, chunk_size=CHUNK_SIZE,
+                    seed=0, percentiles=PERCENTILES, bins=HISTOGRAM_BINS):
+    # distributions: {'t1': 300, 'z': ('normal', 8, 0.2), ...}; jede Stichprobe wird mit dem Batch-Solver gerechnet.
+    # Die Blöcke haben eigene Zufallsfolgen aus einer SeedSequence, das Ergebnis hängt also nicht von workers ab.
+    distributions = medium_distributions(distributions, medium)
+    bounds = [(start, min(start + chunk_size, samples)) for start in range(0, samples, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(bounds))
+
+    buffer = shared_memory.SharedMemory(create=True, size=samples * len(MC_OUTPUTS) * 8)
+    try:
+        arguments = [(buffer.name, samples, process, distributions, chunk_seed, start, stop)
+                     for chunk_seed, (start, stop) in zip(seeds, bounds)]
+        if workers == 1 or len(bounds) == 1:
+            for args in arguments:
+                _solve_chunk(*args)
+        else:
+            with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+                futures = [executor.submit(_solve_chunk, *args) for args in arguments]
+                for future in futures:
+                    future.result()
+        outputs = np.ndarray((samples, len(MC_OUTPUTS)), dtype=float, buffer=buffer.buf)
+        summary = summarize(outputs, percentiles, bins)
+        del outputs
+    finally:
+        buffer.close()
+        buffer.unlink()
+    return summary
+
+
+def confidence_bands(process, distributions, medium='Air', samples=BAND_SAMPLES, seed=0, levels=(5, 50, 95)):
+    # Bänder im p-v- und T-s-Diagramm: pro Zustandsänderung und Stützstelle die Perzentile der y-Werte über eine
+    # Teilmenge der Kreisprozesse, aufgetragen über dem Median der x-Werte
+    from cycle_plot import pv_lines, ts_lines
+
+    distributions = medium_distributions(distributions, medium)
+    inputs = draw_inputs(np.random.default_rng(np.random.SeedSequence(seed).spawn(1)[0]), distributions, samples)
+    result, _ = solve_samples(process, inputs)
+    # Nur Kreisprozesse mit gültigen Zuständen; ohne einen einzigen gibt es keine Bänder (None)
+    valid = np.all(np.isfinite(result['states'].view((float, len(result.dtype['states'].base.names)))),
+                   axis=(-2, -1))
+    if not valid.any():
+        return None
+    result, inputs = result[valid], {name: values[valid] for name, values in inputs.items()}
+    bands = {}
+    for key, lines in (('pv', pv_lines(process, result['states'], inputs['k'])),
+                       ('ts', ts_lines(process, result['states'], inputs['cp'], inputs['cv']))):
+        bands[key] = [{'x': np.nanmedian(line[..., 0], axis=0),
+                       'y': np.nanpercentile(line[..., 1], levels, axis=0)} for line in lines]
+    return bands
+
+
+def save_monte_carlo(path, summary, bands=None, process=''):
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    rows = 2 if bands is not None else 1
+    fig = Figure(figsize=(10, 4 * rows), dpi=100)
+    FigureCanvasAgg(fig)
+    for i, (name, title) in enumerate([('efficiency', 'Efficiency (%)'), ('net_work', 'Net Work [kJ/kg]')], 1):
+        ax = fig.add_subplot(rows, 2, i)
+        counts, edges = summary[name]['histogram']
+        # Ohne gültige Stichproben bleibt das Diagramm leer, nur der Titel nennt 0 samples
+        if len(counts):
+            ax.stairs(counts, edges, fill=True, alpha=0.6)
+        percentiles = summary[name]['percentiles']
+        for level in (5, 50, 95):
+            if level in percentiles and np.isfinite(percentiles[level]):
+                ax.axvline(percentiles[level], color='black', linestyle='--' if level != 50 else '-', linewidth=0.8)
+        ax.set_title(f"{process} {title}, {summary[name]['valid']} samples".strip())
+        ax.set_xlabel(title)
+        ax.set_ylabel('Samples')
+
+    if bands is not None:
+        for i, (key, title, xlabel, ylabel) in enumerate([('pv', 'p-V Diagram', 'Volume [m3/kg]', 'Pressure [bar]'),
+                                                          ('ts', 'T-s Diagram', 'Entropy [J/kg]',
+                                                           'Temperature [K]')], 3):
+            ax = fig.add_subplot(rows, 2, i)
+            for segment in bands[key]:
+                low, median, high = segment['y'][0], segment['y'][len(segment['y']) // 2], segment['y'][-1]
+                line, = ax.plot(segment['x'], median, linewidth=1)
+                ax.fill_between(segment['x'], low, high, color=line.get_color(), alpha=0.3, linewidth=0)
+            ax.set_title(title)
+            ax.set_xlabel(xlabel)
+            ax.set_ylabel(ylabel)
+    fig.tight_layout()
+    fig.savefig(path)
@@ -0,0 +1,278 @@
+import numpy as np
+
+from cycle_batch import PROCESSES
+from cycle_solver import PROCESS_CHANGES
+
+
+# Punkte pro Zustandsänderung; die Kurven werden geometrisch abgetastet, damit reichen wenige Punkte
+LINE_POINTS = 24
+
+# Ab dieser Anzahl Kreisprozesse wird statt Linien ein Dichtebild gezeichnet; Agg braucht pro Linie
+# etwa 50 µs, die Rasterung in numpy ist bei vielen Linien deutlich schneller
+DENSITY_THRESHOLD = 1000
+
+# Kreisprozesse pro Block bei der Rasterung, begrenzt den Speicher unabhängig von der Batchgröße
+DENSITY_CHUNK = 4096
+
+
+def _linspace(a, b, points):
+    return a[:, None] + (b - a)[:, None] * np.linspace(0, 1, points)
+
+
+def _geomspace(a, b, points):
+    # Potenz- und Logarithmuskurven sind in logarithmischer Teilung gleichmäßig gekrümmt
+    return a[:, None] * (b / a)[:, None] ** np.linspace(0, 1, points)
+
+
+def pv_lines(process, states, k, points=LINE_POINTS):
+    # Vektorisierte Form von cycle_curves.pv_segments: liefert pro Zustandsänderung ein (N, points, 2) Array
+    k = np.broadcast_to(k, states.shape[:1])[:, None]
+    lines = []
+    for i, label in enumerate(PROCESS_CHANGES[process]):
+        start, end = states[:, i], states[:, (i + 1) % 4]
+        p1, v1, p2, v2 = start['p'], start['v'], end['p'], end['v']
+
+        titel = label.lower()
+        if "isentropic" in titel:
+            constant = np.where(v1 < v2, p1 * v1 ** k[:, 0], p2 * v2 ** k[:, 0])[:, None]
+            volumes = _geomspace(v1, v2, points)
+            pressures = constant / volumes ** k
+        elif "isothermal" in titel:
+            volumes = _geomspace(v1, v2, points)
+            pressures = (p1 * v1)[:, None] / volumes
+        else:
+            volumes, pressures = _linspace(v1, v2, points), _linspace(p1, p2, points)
+        lines.append(np.stack([volumes, pressures], axis=-1))
+    return lines
+
+
+def ts_lines(process, states, cp, cv, points=LINE_POINTS):
+    # Vektorisierte Form von cycle_curves.ts_segments mit denselben Entropie-Bezugspunkten
+    n = states.shape[0]
+    cp = np.broadcast_to(cp, (n,))[:, None]
+    cv = np.broadcast_to(cv, (n,))[:, None]
+    R = cp - cv
+    lines = []
+
+    list_delta_S = [np.zeros(n)]
+    for i, label in enumerate(PROCESS_CHANGES[process]):
+        start, end = states[:, i], states[:, (i + 1) % 4]
+        p1, T1, s1 = start['p'], start['t'], start['s']
+        p2, T2 = end['p'], end['t']
+
+        titel = label.lower()
+        if "isentrop" in titel:
+            s1 = np.zeros(n) if i == 0 else s1
+            s2 = end['s'] if i == 0 else s1
+            entropies, temperatures = _linspace(s1, s2, points), _linspace(T1, T2, points)
+            list_delta_S.append(s2)
+        elif "isochor" in titel:
+            temperatures = _geomspace(T1, T2, points)
+            heating = (T1 < T2)[:, None]
+            offset = list_delta_S[-1][:, None] if process == "Stirling" else 0
+            entropies = np.where(heating, offset + cv * np.log(temperatures / T1[:, None]),
+                                 cv * np.log(temperatures / T2[:, None]))
+            list_delta_S.append(entropies[:, -1])
+        elif "isobar" in titel:
+            temperatures = _geomspace(T1, T2, points)
+            reference = np.where(T1 < T2, T1, T2)[:, None]
+            entropies = cp * np.log(temperatures / reference)
+        else:
+            pressures = _geomspace(p1, p2, points)
+            entropies = list_delta_S[-1][:, None] + R * np.log(p1[:, None] / pressures)
+            temperatures = np.broadcast_to(T1[:, None], entropies.shape)
+            list_delta_S.append(entropies[:, -1])
+        lines.append(np.stack([entropies, temperatures], axis=-1))
+    return lines
+
+
+def batch_lines(result, cp, cv, k, points=LINE_POINTS):
+    # Alle Zustandsänderungen aller Kreisprozesse als (N * 4, points, 2) Arrays für p-v und T-s
+    result = np.ravel(result)
+    cp, cv, k = (np.broadcast_to(np.asarray(value, dtype=float), result.shape) for value in (cp, cv, k))
+    pv, ts, order = [], [], []
+    for code in np.unique(result['process']):
+        index = np.nonzero(result['process'] == code)[0]
+        process = PROCESSES[code]
+        states = result['states'][index]
+        pv.append(np.stack(pv_lines(process, states, k[index], points), axis=1))
+        ts.append(np.stack(ts_lines(process, states, cp[index], cv[index], points), axis=1))
+        order.append(index)
+    order = np.concatenate(order)
+    return np.concatenate(pv).reshape(-1, points, 2), np.concatenate(ts).reshape(-1, points, 2), order
+
+
+def draw_segments(ax, segments):
+    artists = []
+    for step_number, segment in enumerate(segments, 1):
+        # Zeichnet die Verbindungslinien ohne Marker
+        line, = ax.plot(segment['x'], segment['y'], linestyle='-', label=segment['label'])
+        # Markiert die Eckpunkte der Zustände, leeres Label, um Duplikate in der Legende zu vermeiden
+        markers, = ax.plot(*segment['markers'], 'o', label='')
+        annotation = ax.annotate(str(step_number), segment['annotation'], textcoords="offset points", xytext=(10, 0),
+                                 ha='right')
+        artists.append((line, markers, annotation))
+    return artists
+
+
+def update_segments(ax, artists, segments):
+    # Setzt neue Kurven in die vorhandenen Artists, statt das Diagramm neu aufzubauen
+    for (line, markers, annotation), segment in zip(artists, segments):
+        line.set_data(segment['x'], segment['y'])
+        markers.set_data(*segment['markers'])
+        annotation.xy = segment['annotation']
+    ax.relim()
+    ax.autoscale_view()
+
+
+def create_pv_diagram(ax, curves):
+    artists = draw_segments(ax, curves['pv'])
+
+    ax.set_title('p-V Diagram')
+    ax.set_xlabel('Volume [m3/kg]')
+    ax.set_ylabel('Pressure [bar]')
+    ax.legend()
+    return artists
+
+
+def create_ts_diagram(ax, curves):
+    artists = draw_segments(ax, curves['ts'])
+
+    ax.set_title('T-s Diagram')
+    ax.set_xlabel('Entropy [J/kg]')
+    ax.set_ylabel('Temperature [K]')
+    ax.legend()
+    ax.text(0.5, 0.95, "Assumed state: 0°C, 1 atm", transform=ax.transAxes,
+            horizontalalignment='center', verticalalignment='center',
+            fontsize=10, color='gray', alpha=0.8)
+    return artists
+
+
+def overlay_indicator(ax, summary, mass, color='black'):
+    # Gemessenes Indikatordiagramm über dem idealen Kreisprozess: Mittelwert je Winkelklasse als Linie, Minimum
+    # und Maximum über alle Arbeitsspiele als dünne Hüllkurven. mass rechnet das Zylindervolumen in m3/kg um.
+    volume = summary['volume'] / mass
+    artists = [
+        ax.plot(volume, summary['p_min'], color=color, linewidth=0.5, alpha=0.4, label='')[0],
+        ax.plot(volume, summary['p_max'], color=color, linewidth=0.5, alpha=0.4, label='')[0],
+        ax.plot(volume, summary['p_mean'], color=color, linewidth=1.2,
+                label=f"Measured ({len(summary['work'])} cycles)")[0],
+    ]
+    ax.legend()
+    return artists
+
+
+def _draw_lines(ax, lines, values, cmap, linewidth, alpha):
+    from matplotlib.collections import LineCollection
+
+    # Eine einzige Collection statt einem ax.plot pro Segment und Kreisprozess
+    collection = LineCollection(lines, linewidths=linewidth, alpha=alpha, cmap=cmap)
+    if values is not None:
+        collection.set_array(values)
+    ax.add_collection(collection)
+    # Grenzen direkt aus den Arrays, autoscale_view müsste dafür jede Linie einzeln transformieren
+    x0, x1, y0, y1 = line_extent(lines)
+    ax.set_xlim(x0, x1)
+    ax.set_ylim(y0, y1)
+    return collection
+
+
+def line_extent(lines):
+    return np.nanmin(lines[..., 0]), np.nanmax(lines[..., 0]), np.nanmin(lines[..., 1]), np.nanmax(lines[..., 1])
+
+
+def rasterize(lines, extent, bins, counts=None):
+    # Zeichnet die Polylinien pixelgenau (DDA) in ein Zählraster und addiert auf counts, damit große
+    # Batches blockweise gerastert werden können. Jede Teilstrecke bekommt so viele Punkte, wie sie
+    # Pixel überstreicht, es entstehen also keine Lücken. NaN-Strecken fallen heraus.
+    width, height = bins
+    x0, x1, y0, y1 = extent
+    if counts is None:
+        counts = np.zeros(width * height, dtype=np.int64)
+    px = (lines[..., 0] - x0) * ((width - 1) / ((x1 - x0) or 1))
+    py = (lines[..., 1] - y0) * ((height - 1) / ((y1 - y0) or 1))
+    start_x, start_y = px[:, :-1].ravel(), py[:, :-1].ravel()
+    dx, dy = np.diff(px, axis=1).ravel(), np.diff(py, axis=1).ravel()
+    steps = np.maximum(np.abs(dx), np.abs(dy))
+    valid = np.isfinite(steps) & np.isfinite(start_x) & np.isfinite(start_y)
+    start_x, start_y, dx, dy = start_x[valid], start_y[valid], dx[valid], dy[valid]
+    steps = np.ceil(steps[valid]).astype(np.intp) + 1
+
+    pieces = np.repeat(np.arange(len(steps)), steps)
+    t = (np.arange(len(pieces)) - np.repeat(np.cumsum(steps) - steps, steps)) / np.repeat(steps, steps)
+    ix = np.rint(start_x[pieces] + dx[pieces] * t).astype(np.intp)
+    iy = np.rint(start_y[pieces] + dy[pieces] * t).astype(np.intp)
+    inside = (ix >= 0) & (ix < width) & (iy >= 0) & (iy < height)
+    counts += np.bincount(iy[inside] * width + ix[inside], minlength=width * height)
+    return counts
+
+
+def _draw_density(ax, counts, extent, bins, cmap):
+    from matplotlib.colors import LogNorm
+
+    image = np.where(counts > 0, counts, np.nan).reshape(bins[1], bins[0])
+    ax.set_xlim(extent[0], extent[1])
+    ax.set_ylim(extent[2], extent[3])
+    return ax.imshow(image, origin='lower', aspect='auto', cmap=cmap, norm=LogNorm(), extent=extent,
+                     interpolation='nearest')
+
+
+def overlay_mode(count, mode=None):
+    if mode is None:
+        return 'density' if count > DENSITY_THRESHOLD else 'lines'
+    return mode
+
+
+def overlay_cycles(ax_pv, ax_ts, result, cp, cv, k, values='efficiency', mode=None, cmap='viridis',
+                   linewidth=0.5, alpha=0.6, bins=(500, 400)):
+    # values: Feldname aus dem Ergebnis, eigenes Array pro Kreisprozess oder None für einfarbige Linien
+    result = np.ravel(result)
+    cp, cv, k = (np.broadcast_to(np.asarray(value, dtype=float), result.shape) for value in (cp, cv, k))
+    mode = overlay_mode(len(result), mode)
+
+    if mode == 'density':
+        # Die Kurven sind zwischen den Zuständen monoton, die Eckpunkte legen also den Bildausschnitt fest
+        corners = batch_lines(result, cp, cv, k, points=2)
+        extents = [line_extent(corners[0]), line_extent(corners[1])]
+        counts = [None, None]
+        for start in range(0, len(result), DENSITY_CHUNK):
+            part = slice(start, start + DENSITY_CHUNK)
+            pv, ts, _ = batch_lines(result[part], cp[part], cv[part], k[part], LINE_POINTS)
+            counts = [rasterize(lines, extent, bins, total) for lines, extent, total in zip((pv, ts), extents, counts)]
+        artists = [_draw_density(ax, total, extent, bins, cmap)
+                   for ax, total, extent in zip((ax_pv, ax_ts), counts, extents)]
+    else:
+        pv, ts, order = batch_lines(result, cp, cv, k, LINE_POINTS)
+        if isinstance(values, str):
+            values = result[values]
+        if values is not None:
+            # Jede der vier Zustandsänderungen eines Kreisprozesses bekommt dessen Farbe
+            values = np.repeat(np.ravel(values)[order], 4)
+        artists = [_draw_lines(ax, lines, values, cmap, linewidth, alpha) for ax, lines in ((ax_pv, pv), (ax_ts, ts))]
+
+    ax_pv.set_title('p-V Diagram')
+    ax_pv.set_xlabel('Volume [m3/kg]')
+    ax_pv.set_ylabel('Pressure [bar]')
+    ax_ts.set_title('T-s Diagram')
+    ax_ts.set_xlabel('Entropy [J/kg]')
+    ax_ts.set_ylabel('Temperature [K]')
+    return artists
+
+
+def save_overlay(path, result, cp, cv, k, values='efficiency', mode=None):
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    mode = overlay_mode(np.size(result), mode)
+    fig = Figure(figsize=(6, 10), dpi=100)
+    FigureCanvasAgg(fig)
+    ax_pv = fig.add_subplot(2, 1, 1)
+    ax_ts = fig.add_subplot(2, 1, 2)
+    artists = overlay_cycles(ax_pv, ax_ts, result, cp, cv, k, values=values, mode=mode)
+    if mode == 'density' or values is not None:
+        label = 'Cycles per bin' if mode == 'density' else values if isinstance(values, str) else None
+        for ax, artist in zip((ax_pv, ax_ts), artists):
+            fig.colorbar(artist, ax=ax, label=label)
+    # Feste Ränder statt tight_layout, das die Figur dafür einmal zusätzlich zeichnen müsste
+    fig.subplots_adjust(left=0.14, right=0.97, bottom=0.06, top=0.96, hspace=0.25)
+    fig.savefig(path)
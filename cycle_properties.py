@@ -0,0 +1,161 @@
+import functools
+
+import numpy as np
+
+
+# Universelle Gaskonstante in J/(kmol·K)
+R_UNIVERSAL = 8314.462618
+
+# Bereich und Schrittweite der Stofftabellen in K. Oberhalb von 3500 K werden die NASA-Polynome für O2 und H2
+# leicht extrapoliert, außerhalb des Bereichs liefern die Tabellen NaN.
+T_MIN = 200.0
+T_MAX = 5000.0
+T_STEP = 1.0
+
+# Verfeinerung der Umkehrtabellen T(h), T(u), T(s) gegenüber dem Temperaturgitter
+INVERSE_OVERSAMPLING = 4
+
+# NASA-7-Koeffizienten (GRI-Mech 3.0 / Burcat): (Sprungtemperatur, Koeffizienten unterhalb, oberhalb)
+# cp/R = a1 + a2 T + a3 T² + a4 T³ + a5 T⁴, a6 und a7 sind die Integrationskonstanten für h und s
+NASA_POLYNOMIALS = {
+    'N2': (1000.0,
+           (3.298677, 1.4082404e-03, -3.963222e-06, 5.641515e-09, -2.444854e-12, -1020.8999, 3.950372),
+           (2.92664, 1.4879768e-03, -5.68476e-07, 1.0097038e-10, -6.753351e-15, -922.7977, 5.980528)),
+    'O2': (1000.0,
+           (3.78245636, -2.99673416e-03, 9.84730201e-06, -9.68129509e-09, 3.24372837e-12, -1063.94356, 3.65767573),
+           (3.28253784, 1.48308754e-03, -7.57966669e-07, 2.09470555e-10, -2.16717794e-14, -1088.45772, 5.45323129)),
+    'H2': (1000.0,
+           (2.34433112, 7.98052075e-03, -1.9478151e-05, 2.01572094e-08, -7.37611761e-12, -917.935173, 0.683010238),
+           (3.3372792, -4.94024731e-05, 4.99456778e-07, -1.79566394e-10, 2.00255376e-14, -950.158922, -3.20502331)),
+    'Ar': (1000.0,
+           (2.5, 0.0, 0.0, 0.0, 0.0, -745.375, 4.366),
+           (2.5, 0.0, 0.0, 0.0, 0.0, -745.375, 4.366)),
+    'He': (1000.0,
+           (2.5, 0.0, 0.0, 0.0, 0.0, -745.375, 0.928723974),
+           (2.5, 0.0, 0.0, 0.0, 0.0, -745.375, 0.928723974)),
+}
+
+# Molmassen in kg/kmol
+MOLAR_MASSES = {'N2': 28.0134, 'O2': 31.9988, 'H2': 2.01588, 'Ar': 39.948, 'He': 4.002602}
+
+# Zusammensetzung der Medien aus MEDIA_PROPERTIES in Molanteilen
+MEDIA_COMPOSITION = {
+    'Air': {'N2': 0.7808, 'O2': 0.2095, 'Ar': 0.0097},
+    'Hydrogen': {'H2': 1.0},
+    'Nitrogen': {'N2': 1.0},
+    'Helium': {'He': 1.0},
+}
+
+
+def nasa_properties(species, T):
+    # Dimensionslose cp/R, h/R und s°/R einer Spezies aus den NASA-Polynomen
+    t_switch, low, high = NASA_POLYNOMIALS[species]
+    a = np.where((T < t_switch)[:, None], np.array(low), np.array(high))
+    a1, a2, a3, a4, a5, a6, a7 = a.T
+    cp = a1 + a2 * T + a3 * T ** 2 + a4 * T ** 3 + a5 * T ** 4
+    h = a1 * T + a2 * T ** 2 / 2 + a3 * T ** 3 / 3 + a4 * T ** 4 / 4 + a5 * T ** 5 / 5 + a6
+    s = a1 * np.log(T) + a2 * T + a3 * T ** 2 / 2 + a4 * T ** 3 / 3 + a5 * T ** 4 / 4 + a7
+    return cp, h, s
+
+
+def uniform_table(x, y, oversampling=1):
+    # y(x) auf einem gleichmäßigen x-Gitter, damit eine Abfrage nur Index und Bruchteil braucht statt einer Suche
+    grid = np.linspace(x[0], x[-1], (len(x) - 1) * oversampling + 1)
+    values = np.interp(grid, x, y)
+    return grid[0], (len(grid) - 1) / (grid[-1] - grid[0]), values, np.diff(values)
+
+
+def interpolate(table, x):
+    # Lineare Interpolation auf einer uniform_table, außerhalb des Bereichs NaN
+    x0, scale, values, slopes = table
+    position = (np.asarray(x, dtype=float) - x0) * scale
+    # fmax/fmin statt clip, damit NaN-Eingaben einen gültigen Index bekommen und erst unten zu NaN werden
+    index = np.fmin(np.fmax(position, 0), len(slopes) - 1).astype(np.intp)
+    result = values[index] + (position - index) * slopes[index]
+    # [()] macht aus 0-d Ergebnissen wieder Skalare, der Einzelsolver bekommt also normale Zahlen zurück
+    return np.where((position >= 0) & (position <= len(slopes)), result, np.nan)[()]
+
+
+class PropertyTable:
+    # cp(T), h(T), u(T) und s°(T) eines Mediums auf einem dichten Temperaturgitter. Alle Abfragen sind
+    # lineare Interpolationen und funktionieren für Skalare wie für Arrays beliebiger Größe.
+    def __init__(self, name, composition):
+        self.name = name
+        molar_mass = sum(fraction * MOLAR_MASSES[species] for species, fraction in composition.items())
+        self.R = R_UNIVERSAL / molar_mass
+
+        T = np.arange(T_MIN, T_MAX + T_STEP / 2, T_STEP)
+        cp = np.zeros_like(T)
+        h = np.zeros_like(T)
+        s = np.zeros_like(T)
+        for species, fraction in composition.items():
+            cp_i, h_i, s_i = nasa_properties(species, T)
+            cp += fraction * cp_i
+            h += fraction * h_i
+            s += fraction * s_i
+
+        self.t = T
+        self.cp = cp * self.R
+        self.cv = self.cp - self.R
+        self.h = h * self.R
+        self.u = self.h - self.R * T
+        self.s0 = s * self.R
+        # Entropie bei konstantem Volumen: ∫cv/T dT, Grundlage für Isentropen über das Volumenverhältnis
+        self.s_v = self.s0 - self.R * np.log(T)
+
+        # Vorwärtstabellen über T und Umkehrtabellen über h, u, s°, s_v. Alle Größen sind streng monoton in T,
+        # die Umkehrtabellen werden feiner abgetastet, weil ihr Gitter nicht mit dem T-Gitter zusammenfällt.
+        self.tables = {name: uniform_table(T, getattr(self, name)) for name in ('cp', 'cv', 'h', 'u', 's0', 's_v')}
+        self.inverse = {name: uniform_table(getattr(self, name), T, INVERSE_OVERSAMPLING)
+                        for name in ('h', 'u', 's0', 's_v')}
+
+    def _lookup(self, name, T):
+        return interpolate(self.tables[name], T)
+
+    def _inverse(self, name, value):
+        return interpolate(self.inverse[name], value)
+
+    def cp_at(self, T):
+        return self._lookup('cp', T)
+
+    def cv_at(self, T):
+        return self._lookup('cv', T)
+
+    def delta_h(self, t1, t2):
+        return self._lookup('h', t2) - self._lookup('h', t1)
+
+    def delta_u(self, t1, t2):
+        return self._lookup('u', t2) - self._lookup('u', t1)
+
+    def delta_s_p(self, t1, t2):
+        # Entropieänderung bei konstantem Druck
+        return self._lookup('s0', t2) - self._lookup('s0', t1)
+
+    def delta_s_v(self, t1, t2):
+        # Entropieänderung bei konstantem Volumen
+        return self._lookup('s_v', t2) - self._lookup('s_v', t1)
+
+    def t_from_h(self, t1, dh):
+        return self._inverse('h', self._lookup('h', t1) + dh)
+
+    def t_from_u(self, t1, du):
+        return self._inverse('u', self._lookup('u', t1) + du)
+
+    def isentropic_t_volume(self, t1, ratio):
+        # Endtemperatur einer Isentrope mit v1/v2 = ratio: s_v(T2) = s_v(T1) + R ln(v1/v2)
+        return self._inverse('s_v', self._lookup('s_v', t1) + self.R * np.log(ratio))
+
+    def isentropic_t_pressure(self, t1, ratio):
+        # Endtemperatur einer Isentrope mit p2/p1 = ratio: s°(T2) = s°(T1) + R ln(p2/p1)
+        return self._inverse('s0', self._lookup('s0', t1) + self.R * np.log(ratio))
+
+    def isentropic_volume_ratio(self, t1, t2):
+        # Volumenverhältnis v1/v2 einer Isentrope von t1 nach t2
+        return np.exp(self.delta_s_v(t1, t2) / self.R)
+
+
+@functools.lru_cache(maxsize=None)
+def property_table(medium):
+    if medium not in MEDIA_COMPOSITION:
+        raise ValueError(f"No temperature-dependent properties for medium: {medium}")
+    return PropertyTable(medium, MEDIA_COMPOSITION[medium])
@@ -0,0 +1,113 @@
+import numpy as np
+
+from cycle_solver import PROCESS_CHANGES
+
+
+# Ausgaben wie im Ergebnis des Batch-Solvers: Wirkungsgrad in %, Nutzarbeit in kJ/kg, T_max in K, p_max in bar
+OUTPUTS = ('efficiency', 'net_work', 't_max', 'p_max')
+
+# Eingaben, nach denen abgeleitet wird; cp und cv bleiben wie im Solver unabhängig von k fest
+INPUTS = ('z', 'q', 'k', 't1', 'p1')
+
+
+# Geschlossene Formen der vier Ausgaben mit konstanten Stoffwerten, jeweils als (Wert, d/dz, d/dq, d/dk, d/dt1, d/dp1).
+# Sie folgen aus den Schrittfunktionen in cycle_solver und calculate_efficiency,
+# z.B. Otto: w = cv (t2 - t1) + cv (t4 - t3) = -q (1 - z^(1-k)).
+def _otto(t1, p1, cp, cv, k, z, q):
+    a, c, L = k - 1, 1000 / cv, np.log(z)
+    r = z ** -a
+    t3 = t1 * z ** a + c * q
+    zero = np.zeros_like(z)
+    return {
+        'efficiency': (100 * (1 - r), 100 * a * r / z, zero, 100 * L * r, zero, zero),
+        'net_work': (q * (1 - r), q * a * r / z, 1 - r, q * L * r, zero, zero),
+        't_max': (t3, a * t1 * z ** a / z, np.full_like(q, c), t1 * z ** a * L, z ** a, zero),
+        'p_max': (p1 * z ** k * t3 / (t1 * z ** a), k * p1 * z ** a + p1 * c * q / t1, p1 * z * c / t1,
+                  p1 * z ** k * L, -p1 * z * c * q / t1 ** 2, z ** k + z * c * q / t1),
+    }
+
+
+def _diesel(t1, p1, cp, cv, k, z, q):
+    # q ist das Einspritzverhältnis phi
+    a, phi, L = k - 1, q, np.log(z)
+    g = (phi ** k - 1) / (phi - 1)
+    dg_phi = (k * phi ** a * (phi - 1) - (phi ** k - 1)) / (phi - 1) ** 2
+    dg_k = phi ** k * np.log(phi) / (phi - 1)
+    m = k * z ** a
+    work = (cp * z ** a * (phi - 1) - cv * (phi ** k - 1)) / 1000
+    zero = np.zeros_like(z)
+    return {
+        'efficiency': (100 * (1 - g / m), 100 * a * g / (m * z), -100 * dg_phi / m,
+                       -100 * (dg_k / m - g * z ** a * (1 + k * L) / m ** 2), zero, zero),
+        'net_work': (t1 * work, cp * t1 * a * z ** a / z * (phi - 1) / 1000,
+                     (cp * t1 * z ** a - cv * t1 * k * phi ** a) / 1000,
+                     t1 * (cp * z ** a * L * (phi - 1) - cv * phi ** k * np.log(phi)) / 1000, work, zero),
+        't_max': (t1 * z ** a * phi, a * t1 * z ** a / z * phi, t1 * z ** a, t1 * z ** a * phi * L, z ** a * phi, zero),
+        'p_max': (p1 * z ** k, k * p1 * z ** a, zero, p1 * z ** k * L, zero, z ** k),
+    }
+
+
+def _stirling(t1, p1, cp, cv, k, z, q):
+    R, c, L = cp - cv, 1000 / cv, np.log(z)
+    t3 = t1 + c * q
+    zero = np.zeros_like(z)
+    return {
+        'efficiency': (100 * (1 - t1 / t3), zero, 100 * t1 * c / t3 ** 2, zero, -100 * c * q / t3 ** 2, zero),
+        'net_work': (R * L * q / cv, R * q / (cv * z), R * L / cv, zero, zero, zero),
+        't_max': (t3, zero, np.full_like(q, c), zero, np.ones_like(z), zero),
+        'p_max': (p1 * z * t3 / t1, p1 * t3 / t1, p1 * z * c / t1, zero, -p1 * z * c * q / t1 ** 2, z * t3 / t1),
+    }
+
+
+def _joule(t1, p1, cp, cv, k, z, q):
+    b, c, L = (k - 1) / k, 1000 / cp, np.log(z)
+    r = z ** -b
+    zero = np.zeros_like(z)
+    return {
+        'efficiency': (100 * (1 - r), 100 * b * r / z, zero, 100 * L * r / k ** 2, zero, zero),
+        'net_work': (q * (1 - r), q * b * r / z, 1 - r, q * L * r / k ** 2, zero, zero),
+        't_max': (t1 * z ** b + c * q, b * t1 * z ** b / z, np.full_like(q, c), t1 * z ** b * L / k ** 2, z ** b, zero),
+        'p_max': (p1 * z, np.full_like(z, p1), zero, zero, zero, z),
+    }
+
+
+CYCLE_OUTPUTS = {'Otto': _otto, 'Diesel': _diesel, 'Stirling': _stirling, 'Joule': _joule}
+
+
+def cycle_outputs(process, t1, p1, cp, cv, k, z, q):
+    # Einzelner Prozess, Ausgaben als Dict von Tupeln; der inverse Solver braucht davon nur eine Ausgabe
+    if process not in CYCLE_OUTPUTS:
+        raise ValueError(f"Unknown thermodynamic cycle: {process}")
+    arrays = np.broadcast_arrays(*(np.asarray(value, dtype=float) for value in (t1, p1, cp, cv, k, z, q)))
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        return CYCLE_OUTPUTS[process](*arrays)
+
+
+def _stack(outputs):
+    values = np.stack([outputs[name][0] for name in OUTPUTS], axis=-1)
+    jacobian = np.stack([np.stack(outputs[name][1:], axis=-1) for name in OUTPUTS], axis=-2)
+    return values, jacobian
+
+
+def cycle_sensitivities(process, t1, p1, cp, cv, k, z, q):
+    # Werte (..., 4) und Jacobi-Matrix (..., 4, 5) in der Reihenfolge OUTPUTS x INPUTS.
+    # process darf wie bei solve_batch ein Array sein, jede Prozessfamilie wird als Block gerechnet.
+    if isinstance(process, str):
+        return _stack(cycle_outputs(process, t1, p1, cp, cv, k, z, q))
+
+    process, *arrays = np.broadcast_arrays(np.asarray(process), *(np.asarray(value, dtype=float)
+                                                                  for value in (t1, p1, cp, cv, k, z, q)))
+    values = np.empty(process.shape + (len(OUTPUTS),))
+    jacobian = np.empty(process.shape + (len(OUTPUTS), len(INPUTS)))
+    for name in np.unique(process):
+        if name not in PROCESS_CHANGES:
+            raise ValueError(f"Unknown thermodynamic cycle: {name}")
+        mask = process == name
+        values[mask], jacobian[mask] = _stack(cycle_outputs(str(name), *(array[mask] for array in arrays)))
+    return values, jacobian
+
+
+def sensitivity_columns(jacobian):
+    # Flache Spalten d_efficiency_d_z, d_efficiency_d_q, ... für tabellarische Ausgaben
+    return {f"d_{output}_d_{name}": jacobian[..., i, j]
+            for i, output in enumerate(OUTPUTS) for j, name in enumerate(INPUTS)}
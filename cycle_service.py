@@ -0,0 +1,293 @@
+import asyncio
+import collections
+import json
+import math
+import time
+
+import numpy as np
+
+from cycle_batch import PROCESS_DTYPE, STATE_DTYPE, solve_batch
+from cycle_solver import MEDIA_PROPERTIES, PROCESS_CHANGES
+
+
+# Größter Batch, der auf einmal gerechnet wird
+MAX_BATCH = 4096
+
+# Obergrenze offener Rechnungen; darüber antwortet der Dienst sofort mit 503 statt die Warteschlange zu verlängern
+MAX_PENDING = 20_000
+
+# Wartezeit in Sekunden, bevor ein Batch geschlossen wird. Bei 0 wird nur einmal an die Event-Loop abgegeben,
+# damit alle bereits eingetroffenen Anfragen noch in denselben Batch kommen.
+BATCH_WINDOW = 0.0
+
+# Anzahl der letzten Anfragen, über die die Latenzen ausgewertet werden
+METRICS_WINDOW = 100_000
+
+INPUT_FIELDS = ('t1', 'p1', 'v1', 'cp', 'cv', 'k', 'z', 'q')
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               413: 'Payload Too Large', 422: 'Unprocessable Entity', 500: 'Internal Server Error',
+               503: 'Service Unavailable'}
+
+# Größter angenommener Request-Body in Bytes
+MAX_BODY = 1 << 20
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def request_inputs(payload):
+    # Eine Anfrage wie {"process": "Otto", "medium": "Air", "t1": 300, "p1": 1, "z": 8, "q": 1500}.
+    # Statt medium können cp, cv und k angegeben werden, v1 folgt sonst aus dem idealen Gasgesetz.
+    if not isinstance(payload, dict):
+        raise RequestError(400, "Each cycle must be a JSON object.")
+    process = payload.get('process')
+    if process not in PROCESS_CHANGES:
+        raise RequestError(400, f"Unknown thermodynamic cycle: {process}")
+    values = dict(payload)
+    if 'medium' in values and 'cp' not in values:
+        properties = MEDIA_PROPERTIES.get(values['medium'])
+        if not properties or properties['cp'] == '':
+            raise RequestError(400, f"Unknown medium: {values['medium']}")
+        values.update(properties)
+    try:
+        if values.get('v1') is None:
+            cp, cv, t1, p1 = (float(values[name]) for name in ('cp', 'cv', 't1', 'p1'))
+            values['v1'] = (cp - cv) * t1 / (p1 * 1e5)
+        return process, tuple(float(values[name]) for name in INPUT_FIELDS)
+    except KeyError as e:
+        raise RequestError(400, f"Missing input: {e.args[0]}")
+    except (TypeError, ValueError, ZeroDivisionError):
+        raise RequestError(400, "Inputs must be numbers.")
+
+
+def result_to_json(row):
+    # Ungültige Lösungen kommen aus dem Batch als NaN statt als Ausnahme
+    states = row['states'].tolist()
+    if not math.isfinite(row['efficiency']) or not all(math.isfinite(value) for state in states for value in state):
+        return None
+    return {
+        'states': [dict(zip(STATE_DTYPE.names, state)) for state in states],
+        'processes': [dict(zip(PROCESS_DTYPE.names, values)) for values in row['processes'].tolist()],
+        'efficiency': float(row['efficiency']),
+    }
+
+
+class LatencyMetrics:
+    def __init__(self, window=METRICS_WINDOW):
+        self.latencies = collections.deque(maxlen=window)
+        self.requests = 0
+        self.rejected = 0
+        self.batches = 0
+        self.batched_cycles = 0
+        self.largest_batch = 0
+
+    def record_batch(self, size):
+        self.batches += 1
+        self.batched_cycles += size
+        self.largest_batch = max(self.largest_batch, size)
+
+    def record_request(self, seconds):
+        self.requests += 1
+        self.latencies.append(seconds)
+
+    def summary(self):
+        latencies = np.fromiter(self.latencies, dtype=float) * 1000
+        # Ohne Messwerte stehen die Perzentile auf None, json.dumps schreibt daraus null statt des ungültigen NaN
+        if len(latencies):
+            p50, p90, p99 = (float(value) for value in np.percentile(latencies, [50, 90, 99]))
+            slowest = float(latencies.max())
+        else:
+            p50 = p90 = p99 = slowest = None
+        return {
+            'requests': self.requests,
+            'rejected': self.rejected,
+            'batches': self.batches,
+            'mean_batch_size': self.batched_cycles / self.batches if self.batches else 0,
+            'largest_batch': self.largest_batch,
+            'latency_ms': {
+                'p50': p50, 'p90': p90, 'p99': p99, 'max': slowest,
+                'window': len(latencies),
+            },
+        }
+
+
+class CycleService:
+    # Sammelt gleichzeitige Anfragen in einer Warteschlange und rechnet sie gemeinsam mit solve_batch.
+    # Gerechnet wird in einem Thread neben der Event-Loop, die währenddessen weiter Verbindungen annimmt,
+    # Anfragen liest und /metrics beantwortet; es läuft immer nur ein Batch zur Zeit.
+    def __init__(self, max_batch=MAX_BATCH, max_pending=MAX_PENDING, batch_window=BATCH_WINDOW):
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.batch_window = batch_window
+        self.pending = 0
+        self.queue = collections.deque()
+        self.wakeup = None
+        self.worker = None
+        self.metrics = LatencyMetrics()
+
+    def start(self):
+        self.wakeup = asyncio.Event()
+        self.worker = asyncio.get_running_loop().create_task(self._batch_loop())
+
+    async def stop(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            try:
+                await self.worker
+            except asyncio.CancelledError:
+                pass
+
+    def submit(self, cycles):
+        # Eine Anfrage, die allein schon mehr Kreisprozesse hat als erlaubt, passt auch später nicht
+        if len(cycles) > self.max_pending:
+            self.metrics.rejected += 1
+            raise RequestError(413, f"At most {self.max_pending} cycles per request.")
+        # Backpressure: lieber sofort ablehnen, als Anfragen unbegrenzt warten zu lassen
+        if self.pending + len(cycles) > self.max_pending:
+            self.metrics.rejected += 1
+            raise RequestError(503, "Too many pending calculations, retry later.")
+        future = asyncio.get_running_loop().create_future()
+        self.queue.append((cycles, future))
+        self.pending += len(cycles)
+        self.wakeup.set()
+        return future
+
+    async def _batch_loop(self):
+        while True:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+            # Anfragen, die während dieser Abgabe eintreffen, landen noch im selben Batch
+            await asyncio.sleep(self.batch_window)
+            while self.queue:
+                await self._solve_queued()
+
+    async def _solve_queued(self):
+        batch, size = [], 0
+        while self.queue and (not batch or size + len(self.queue[0][0]) <= self.max_batch):
+            cycles, future = self.queue.popleft()
+            batch.append((cycles, future))
+            size += len(cycles)
+        self.pending -= size
+
+        inputs = [cycle for cycles, _ in batch for cycle in cycles]
+        processes = np.array([process for process, _ in inputs])
+        columns = np.array([values for _, values in inputs], dtype=float).reshape(-1, len(INPUT_FIELDS)).T
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(None, solve_batch, processes, *columns)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.metrics.record_batch(size)
+
+        start = 0
+        for cycles, future in batch:
+            if not future.done():
+                future.set_result(result[start:start + len(cycles)])
+            start += len(cycles)
+
+    async def solve(self, payload):
+        # Ein einzelnes Objekt liefert ein Objekt zurück, eine Liste eine Liste
+        single = not isinstance(payload, list)
+        cycles = [request_inputs(item) for item in ([payload] if single else payload)]
+        if not cycles:
+            return []
+        rows = await self.submit(cycles)
+        results = [result_to_json(row) for row in rows]
+        if single:
+            if results[0] is None:
+                raise RequestError(422, "The cycle has no valid solution for these inputs.")
+            return results[0]
+        return results
+
+    async def handle(self, method, path, body):
+        if path == '/solve':
+            if method != 'POST':
+                raise RequestError(405, "Use POST for /solve.")
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                raise RequestError(400, "Request body is not valid JSON.")
+            return await self.solve(payload)
+        if path == '/metrics' and method == 'GET':
+            return self.metrics.summary()
+        if path == '/health' and method == 'GET':
+            return {'status': 'ok', 'pending': self.pending}
+        raise RequestError(404, f"No route for {method} {path}")
+
+    async def handle_connection(self, reader, writer):
+        # Minimaler HTTP/1.1-Server mit Keep-Alive, ausreichend für lokale Werkzeuge und Lasttests
+        try:
+            while True:
+                try:
+                    header = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                start = time.perf_counter()
+                request_line, *header_lines = header.decode('latin-1').split('\r\n')
+                headers = {}
+                for line in header_lines:
+                    name, _, value = line.partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    method, path, version = request_line.split(' ', 2)
+                except ValueError:
+                    break
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+
+                try:
+                    length = int(headers.get('content-length') or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    # Ohne gültige Länge ist das Ende des Bodys unbekannt, die Verbindung wird danach geschlossen
+                    status, response = 400, {'error': "Content-Length must be a non-negative integer."}
+                    keep_alive = False
+                elif length > MAX_BODY:
+                    status, response = 413, {'error': "Request body too large."}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b''
+                    try:
+                        status, response = 200, await self.handle(method, path.split('?', 1)[0], body)
+                    except RequestError as e:
+                        status, response = e.status, {'error': str(e)}
+                    except Exception as e:
+                        status, response = 500, {'error': str(e)}
+
+                data = json.dumps(response).encode()
+                lines = [f"HTTP/1.1 {status} {STATUS_TEXT[status]}", "Content-Type: application/json",
+                         f"Content-Length: {len(data)}", f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+                if status == 503:
+                    lines.append("Retry-After: 1")
+                writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode() + data)
+                if path.startswith('/solve'):
+                    self.metrics.record_request(time.perf_counter() - start)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(host='127.0.0.1', port=8765, unix_path=None, **options):
+    service = CycleService(**options)
+    service.start()
+    if unix_path:
+        server = await asyncio.start_unix_server(service.handle_connection, path=unix_path)
+        print(f"Serving on {unix_path}")
+    else:
+        server = await asyncio.start_server(service.handle_connection, host, port)
+        print(f"Serving on http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
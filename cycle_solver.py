@@ -0,0 +1,425 @@
+import functools
+import math
+
+from cycle_definitions import (HEAT, ISENTROPIC, ISOBARIC, ISOCHORIC, ISOTHERMAL, POLYTROPIC, PRESSURE, VOLUME,
+                               CYCLE_DEFINITIONS, compiled_cycle)
+
+
+# Zustandsänderungen der einzelnen Kreisprozesse in Reihenfolge 1 → 2 → 3 → 4 → 1. Die Schritte selbst stehen in
+# cycle_definitions; hier nur die Bezeichnungen der vier Prozesse, die GUI, Batch-Solver und Dienst anbieten.
+PROCESS_CHANGES = {name: [label for label, _, _ in CYCLE_DEFINITIONS[name]['steps']]
+                   for name in ('Otto', 'Diesel', 'Stirling', 'Joule')}
+
+# Stoffwerte der auswählbaren Medien, 'Custom' wird in der GUI von Hand ausgefüllt
+MEDIA_PROPERTIES = {
+    'Air': {'cp': 1005, 'cv': 718, 'k': 1.4},
+    'Hydrogen': {'cp': 14304, 'cv': 10153, 'k': 1.41},
+    'Nitrogen': {'cp': 1040, 'cv': 743, 'k': 1.4},
+    'Helium': {'cp': 5193, 'cv': 3116, 'k': 1.66},
+    'Custom': {'cp': '', 'cv': '', 'k': ''}
+}
+
+# Anzahl der zuletzt gerechneten Kreisprozesse, die im Cache gehalten werden
+SOLUTION_CACHE_SIZE = 128
+
+
+# Feldnamen der Zustände und Prozessgrößen, dieselben wie in den dtypes des Batch-Solvers
+STATE_FIELDS = ('t', 'p', 'v', 'h', 's')
+PROCESS_FIELDS = ('q', 'w', 'u')
+
+
+class State:
+    # Zustand mit T in K, p in bar, v in m³/kg, h in kJ/kg und s in J/kgK. Feste Slots statt eines Dicts pro
+    # Zustand; state['t'] liest wie bei einem Record aus dem Batch-Solver, beide lassen sich gleich auswerten.
+    __slots__ = STATE_FIELDS
+
+    def __init__(self, t, p, v, h=0.0, s=0.0):
+        self.t = t
+        self.p = p
+        self.v = v
+        self.h = h
+        self.s = s
+
+    def __getitem__(self, name):
+        if name not in STATE_FIELDS:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def __iter__(self):
+        return iter((self.t, self.p, self.v, self.h, self.s))
+
+    def __eq__(self, other):
+        return isinstance(other, State) and tuple(self) == tuple(other)
+
+    def __repr__(self):
+        return f"State(t={self.t!r}, p={self.p!r}, v={self.v!r}, h={self.h!r}, s={self.s!r})"
+
+
+class ProcessValues:
+    # Wärme, Arbeit und innere Energie einer Zustandsänderung in kJ/kg, wie State mit values['q'] lesbar
+    __slots__ = PROCESS_FIELDS
+
+    def __init__(self, q, w, u):
+        self.q = q
+        self.w = w
+        self.u = u
+
+    def __getitem__(self, name):
+        if name not in PROCESS_FIELDS:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def __iter__(self):
+        return iter((self.q, self.w, self.u))
+
+    def __eq__(self, other):
+        return isinstance(other, ProcessValues) and tuple(self) == tuple(other)
+
+    def __repr__(self):
+        return f"ProcessValues(q={self.q!r}, w={self.w!r}, u={self.u!r})"
+
+
+class ScalarMath:
+    # Rechenfunktionen für einzelne Zahlen. Der Batch-Solver gibt stattdessen numpy mit, so laufen dieselben
+    # Schrittfunktionen auf Zahlen und auf Arrays. math.log wirft bei negativen Temperaturen ValueError,
+    # np.log liefert NaN, und der restliche Batch rechnet weiter.
+    log = staticmethod(math.log)
+
+    @staticmethod
+    def zeros_like(value):
+        return 0.0
+
+    @staticmethod
+    def where(condition, a, b):
+        return a if condition else b
+
+
+class CalculationContext:
+    # Kompilierter Kreisprozess, Stoffwerte und bisherige Zustände einer einzelnen Rechnung. Jede Rechnung hat
+    # ihren eigenen Kontext, es gibt keinen gemeinsamen Zustand zwischen gleichzeitig laufenden Rechnungen.
+    # properties ist None für konstante cp, cv und k oder eine PropertyTable aus cycle_properties.
+    # n: Polytropenexponent, der die Isentropen ersetzt, oder None.
+    # xp: ScalarMath für einzelne Kreisprozesse, numpy für den Batch-Solver.
+    # states[i] ist der Anfangszustand von Schritt i als (t, p, v), heats[i] die Wärme von Schritt i. Vor dem
+    # ersten Durchlauf stehen dort Zustand 1 und 0, Vorwärtsbezüge lesen also zunächst diese Werte.
+    def __init__(self, cycle, state, cp, cv, k, properties=None, n=None, xp=ScalarMath):
+        self.cycle = cycle
+        self.cp = cp
+        self.cv = cv
+        self.k = k
+        self.properties = properties
+        self.n = n
+        self.xp = xp
+        self.states = [tuple(state)] * len(cycle.steps)
+        self.heats = [xp.zeros_like(state[0])] * len(cycle.steps)
+
+
+# Die Schrittfunktionen bekommen den Eingangszustand als (t, p, v), die festgelegte Größe (VOLUME, PRESSURE,
+# TEMPERATURE oder HEAT) mit ihrem Zielwert und liefern (t2, p2, v2), (h2, s2), (q, w, u). h2 und s2 sind die
+# Änderungen über den Schritt. Sie rechnen unverändert mit Zahlen (solve_cycle) und elementweise mit Arrays
+# (solve_batch, solve_graph); die Art und die Zielgröße sind für einen Batch gleich, verzweigt wird also nur
+# einmal pro Schritt.
+def _gas_constant(context):
+    return context.cp - context.cv if context.properties is None else context.properties.R
+
+
+def _enthalpy_and_energy(context, t1, t2):
+    # Änderung von h und u in kJ/kg
+    if context.properties is None:
+        return context.cp * (t2 - t1) / 1000, context.cv * (t2 - t1) / 1000
+    return context.properties.delta_h(t1, t2) / 1000, context.properties.delta_u(t1, t2) / 1000
+
+
+def isentropic_change(context, state, quantity, value, n=None):
+    k, properties = context.k, context.properties
+    t1, p1, v1 = state
+
+    if quantity == VOLUME:
+        v2 = value
+        if properties is None:
+            t2 = t1 * (v1 / v2) ** (k - 1)
+        else:
+            # Isentrope mit temperaturabhängigem cp über die tabellierten Entropiefunktionen
+            t2 = properties.isentropic_t_volume(t1, v1 / v2)
+        p2 = p1 * (v1 / v2) * (t2 / t1)
+    elif quantity == PRESSURE:
+        p2 = value
+        if properties is None:
+            t2 = t1 * (p2 / p1) ** ((k - 1) / k)
+        else:
+            t2 = properties.isentropic_t_pressure(t1, p2 / p1)
+        v2 = v1 * (p1 / p2) * (t2 / t1)
+    else:
+        t2 = value
+        if properties is None:
+            v2 = v1 / (t2 / t1) ** (1 / (k - 1))
+        else:
+            v2 = v1 / properties.isentropic_volume_ratio(t1, t2)
+        p2 = p1 * (v1 / v2) * (t2 / t1)
+
+    h2, u = _enthalpy_and_energy(context, t1, t2)
+    # Die Isentrope bleibt exakt bei Δs = 0, auch wenn k nicht genau cp/cv ist
+    s2 = context.xp.zeros_like(t2)
+    q = context.xp.zeros_like(t2)
+    w = u
+
+    return (t2, p2, v2), (h2, s2), (q, w, u)
+
+
+def isochoric_change(context, state, quantity, value, n=None):
+    cv, properties = context.cv, context.properties
+    t1, p1, v1 = state
+
+    if quantity == HEAT:
+        if properties is None:
+            t2 = t1 + value / cv * 1000
+        else:
+            # Die Wärme ändert die innere Energie, die Endtemperatur folgt aus der u(T)-Tabelle
+            t2 = properties.t_from_u(t1, value * 1000)
+    elif quantity == PRESSURE:
+        t2 = t1 * value / p1
+    else:
+        t2 = value
+    v2 = v1
+    p2 = p1 * (t2 / t1)
+
+    h2, u = _enthalpy_and_energy(context, t1, t2)
+    if properties is None:
+        # Treibt die Wärmeabfuhr die Temperatur unter 0 K, wirft math.log ValueError und np.log liefert NaN
+        s2 = cv * context.xp.log(t2 / t1)
+    else:
+        s2 = properties.delta_s_v(t1, t2)
+    # Ohne Arbeit ist die Wärme gleich Δu; mit Stofftabellen weicht sie um den Interpolationsfehler von der Vorgabe ab
+    q = u
+    w = context.xp.zeros_like(t2)
+
+    return (t2, p2, v2), (h2, s2), (q, w, u)
+
+
+def isothermal_change(context, state, quantity, value, n=None):
+    cp, cv, properties, log = context.cp, context.cv, context.properties, context.xp.log
+    t1, p1, v1 = state
+    R = _gas_constant(context)
+
+    t2 = t1
+    if quantity == VOLUME:
+        v2 = value
+        p2 = p1 * v1 / v2
+    else:
+        p2 = value
+        v2 = v1 * p1 / p2
+
+    h2 = context.xp.zeros_like(t2)
+    if properties is None:
+        s2 = cv * log(p2 / p1) + cp * log(v2 / v1)
+    else:
+        s2 = R * log(v2 / v1)
+    u = context.xp.zeros_like(t2)
+    w = -R * t2 * log(p1 / p2) / 1000
+    q = -w
+
+    return (t2, p2, v2), (h2, s2), (q, w, u)
+
+
+def polytropic_change(context, state, quantity, value, n):
+    # Polytrope p·v^n = konst.; n = k entspricht der Isentrope, n = 1 der Isotherme
+    cv, properties, xp = context.cv, context.properties, context.xp
+    t1, p1, v1 = state
+    R = _gas_constant(context)
+
+    # Volumenverhältnis v1/v2 aus der festgelegten Größe
+    if quantity == VOLUME:
+        ratio = v1 / value
+    elif quantity == PRESSURE:
+        ratio = (value / p1) ** (1 / n)
+    else:
+        ratio = (value / t1) ** (1 / (n - 1))
+    v2 = v1 / ratio
+    p2 = p1 * ratio ** n
+    t2 = t1 * ratio ** (n - 1)
+
+    h2, u = _enthalpy_and_energy(context, t1, t2)
+    if properties is None:
+        s2 = cv * xp.log(t2 / t1) + R * xp.log(v2 / v1)
+    else:
+        # Die Endtemperatur folgt hier nicht aus einer Tabelle, außerhalb des Bereichs wird u zu NaN
+        s2 = properties.delta_s_v(t1, t2) + R * xp.log(v2 / v1)
+
+    # Für n = 1 geht die Polytrope in die Isotherme über; der Nenner wird dort nur gegen die Division durch 0 ersetzt
+    w = xp.where(n == 1, R * t1 * xp.log(ratio), R * (t2 - t1) / (n - 1 + (n == 1))) / 1000
+    q = u - w
+
+    return (t2, p2, v2), (h2, s2), (q, w, u)
+
+
+def isobaric_change(context, state, quantity, value, n=None):
+    cp, properties = context.cp, context.properties
+    t1, p1, v1 = state
+    R = _gas_constant(context)
+
+    if quantity == HEAT:
+        if properties is None:
+            t2 = t1 + value * 1000 / cp
+        else:
+            t2 = properties.t_from_h(t1, value * 1000)
+    elif quantity == VOLUME:
+        t2 = t1 * value / v1
+    else:
+        t2 = value
+    p2 = p1
+    v2 = v1 * t2 / t1
+
+    h2, u = _enthalpy_and_energy(context, t1, t2)
+    if properties is None:
+        s2 = cp * context.xp.log(t2 / t1)
+    else:
+        s2 = properties.delta_s_p(t1, t2)
+    w = -(v2 - v1) * R * t2 / v2 / 1000
+    q = h2
+
+    return (t2, p2, v2), (h2, s2), (q, w, u)
+
+
+# Schrittfunktion je Art der Zustandsänderung, Index wie STEP_KINDS in cycle_definitions
+STEP_FUNCTIONS = {
+    ISENTROPIC: isentropic_change,
+    ISOCHORIC: isochoric_change,
+    ISOTHERMAL: isothermal_change,
+    ISOBARIC: isobaric_change,
+    POLYTROPIC: polytropic_change,
+}
+
+
+def step_change(context, i, parameters):
+    # Schritt i des kompilierten Kreisprozesses für Zahlen oder Arrays. Der Anfangszustand steht in
+    # context.states[i]; Endzustand und Wärme werden für die folgenden Schritte dort eingetragen.
+    kind, quantity, target, exponent, _ = context.cycle.steps[i]
+    state = context.states[i]
+    value = target(state, context.states, context.heats, parameters)
+    n = exponent(parameters) if exponent is not None else context.n
+    if kind == ISENTROPIC and n is not None:
+        kind = POLYTROPIC
+    end, changes, values = STEP_FUNCTIONS[kind](context, state, quantity, value, n)
+
+    context.heats[i] = values[0]
+    if i + 1 < len(context.states):
+        context.states[i + 1] = end
+    return end, changes, values
+
+
+def calculate_efficiency(process, t_min, t_max, p_min, p_max, k, z, phi):
+    # Geschlossene Formeln mit Zustand 1 (t_min, p_min) und Zustand 3 (t_max, p_max)
+    if process == "Otto":
+        return (1 - 1 / (z ** (k - 1))) * 100
+    if process == "Diesel":
+        return (1 - (1 / (k * z ** (k - 1)) * (phi ** k - 1) / (phi - 1))) * 100
+    if process == "Stirling":
+        return (1 - t_min / t_max) * 100
+    if process == "Joule":
+        return (1 - (p_min / p_max) ** ((k - 1) / k)) * 100
+    return 0 * z
+
+
+def energy_efficiency(heat, internal):
+    # Thermischer Wirkungsgrad aus der Energiebilanz: Nettowärme = Nettoarbeit, bezogen auf die zugeführte Wärme.
+    # heat enthält das q jedes Schritts, als Zahl oder Array; Wärme interner Schritte (Regenerator) zählt nicht
+    # als zugeführt.
+    heat = list(heat)
+    heat_input = sum(q * (q > 0) for q, inner in zip(heat, internal) if not inner)
+    return sum(heat) / heat_input * 100
+
+
+def cycle_efficiency(context, t, p, heat, parameters):
+    # t, p: Temperaturen und Drücke der Zustände 1 bis N, heat: q jedes Schritts. Die geschlossenen Formeln gelten
+    # nur für konstante Stoffwerte und echte Isentropen, alle anderen Fälle rechnen über die Energiebilanz.
+    cycle = context.cycle
+    if cycle.closed_form and context.properties is None and context.n is None:
+        return calculate_efficiency(cycle.name, t[0], t[2], p[0], p[2], context.k, parameters['z'], parameters['q'])
+    return energy_efficiency(heat, cycle.internal)
+
+
+def solve_cycle(process, t1, p1, v1, cp, cv, k, z, q, property_model=None, n=None):
+    # property_model: Name eines Mediums für temperaturabhängige Stoffwerte, None für konstante cp, cv und k.
+    # n: Polytropenexponent, der die Isentropen ersetzt, z.B. aus einem gemessenen Indikatordiagramm
+    if process not in PROCESS_CHANGES:
+        raise ValueError(f"Unknown thermodynamic cycle: {process}")
+    properties = None
+    if property_model is not None:
+        from cycle_properties import property_table
+        properties = property_table(property_model)
+
+    # Zustandsverlauf und Wärmen gehören nur zu dieser Rechnung
+    context = CalculationContext(compiled_cycle(process), (t1, p1, v1), cp, cv, k, properties, n)
+    parameters = {'z': z, 'q': q}
+    new_states = []
+    process_values = []
+
+    for i in range(len(context.cycle.steps)):
+        state, values = solve_step(context, i, parameters)
+        new_states.append(state)
+        process_values.append(values)
+
+    return cycle_result(context, parameters, property_model, new_states, process_values)
+
+
+def step_parameters(process, i):
+    # Eingaben, von denen Schritt i außer dem Eingangszustand und den Stoffwerten abhängt
+    return compiled_cycle(process).dependencies[i]
+
+
+def solve_step(context, i, parameters):
+    # Schritt i für einen einzelnen Kreisprozess, Ausgabe als State bzw. ProcessValues
+    (t2, p2, v2), (h2, s2), values = step_change(context, i, parameters)
+    # Die Stofftabellen liefern außerhalb ihres Temperaturbereichs NaN
+    if context.properties is not None and not (math.isfinite(t2) and math.isfinite(values[2])):
+        raise ValueError("Temperature outside the range of the property tables")
+    return State(t2, p2, v2, h2, s2), ProcessValues(*values)
+
+
+def cycle_result(context, parameters, property_model, new_states, process_values):
+    # Der letzte Schritt führt zurück auf Zustand 1, daher stehen die Ergebnisse um eins verschoben
+    states = new_states[-1:] + new_states[:-1]
+    efficiency = cycle_efficiency(context, [state.t for state in states], [state.p for state in states],
+                                  [values.q for values in process_values], parameters)
+
+    return {
+        'process': context.cycle.name,
+        'medium': {'cp': context.cp, 'cv': context.cv, 'k': context.k},
+        'property_model': property_model,
+        'n': context.n,
+        'z': parameters['z'],
+        'q': parameters['q'],
+        'states': states,
+        'processes': process_values,
+        'efficiency': efficiency,
+    }
+
+
+def cycle_key(process, t1, p1, v1, cp, cv, k, z, q, property_model=None):
+    # Normierte Eingaben, damit z.B. 8 und 8.0 oder " Otto" und "Otto" denselben Cache-Eintrag treffen
+    return ((process.strip(),) + tuple(float(value) for value in (t1, p1, v1, cp, cv, k, z, q)) +
+            (property_model,))
+
+
+@functools.lru_cache(maxsize=SOLUTION_CACHE_SIZE)
+def _solve_cycle_cached(key):
+    return solve_cycle(*key)
+
+
+def copy_result(result):
+    # Eigene Listen, Zustände und Prozessgrößen; der Eintrag im Cache bleibt so unverändert
+    copy = dict(result)
+    copy['medium'] = dict(result['medium'])
+    copy['states'] = [State(*state) for state in result['states']]
+    copy['processes'] = [ProcessValues(*values) for values in result['processes']]
+    return copy
+
+
+def solve_cycle_cached(process, t1, p1, v1, cp, cv, k, z, q, property_model=None):
+    # Gleiche Eingaben werden nur einmal gerechnet. Jeder Aufrufer bekommt eine Kopie, Änderungen daran
+    # erreichen also weder den Cache noch andere Aufrufer.
+    return copy_result(_solve_cycle_cached(cycle_key(process, t1, p1, v1, cp, cv, k, z, q, property_model)))
+
+
+def cache_info():
+    return _solve_cycle_cached.cache_info()
@@ -0,0 +1,128 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from cycle_batch import RESULT_DTYPE, solve_batch
+from cycle_solver import MEDIA_PROPERTIES
+
+
+# Reihenfolge der Gitterachsen in der Ergebnisdatei
+SWEEP_AXES = ('medium', 't1', 'p1', 'z', 'q')
+
+# Anzahl der Gitterpunkte, die ein Worker auf einmal rechnet und schreibt
+SHARD_SIZE = 250_000
+
+
+def as_axis(values):
+    return np.atleast_1d(np.asarray(values, dtype=float))
+
+
+def medium_axis(media):
+    # Medien können als Name aus MEDIA_PROPERTIES oder direkt als {'cp', 'cv', 'k'} angegeben werden
+    if isinstance(media, (str, dict)):
+        media = [media]
+    names, table = [], []
+    for medium in media:
+        if isinstance(medium, str):
+            properties = MEDIA_PROPERTIES.get(medium)
+            if not properties or properties['cp'] == '':
+                raise ValueError(f"Unknown medium: {medium}")
+            names.append(medium)
+        else:
+            properties = medium
+            names.append(medium.get('name', 'Custom'))
+        table.append((properties['cp'], properties['cv'], properties['k']))
+    return names, np.asarray(table, dtype=float)
+
+
+def _solve_shard(path, process, axes, media_table, v1, start, stop):
+    result = np.load(path, mmap_mode='r+')
+    index = np.unravel_index(np.arange(start, stop), result.shape)
+    cp, cv, k = media_table[index[0]].T
+    t1, p1, z, q = (axes[name][i] for name, i in zip(SWEEP_AXES[1:], index[1:]))
+    if v1 is None:
+        # Spezifisches Volumen aus dem idealen Gasgesetz, p in bar
+        v1 = (cp - cv) * t1 / (p1 * 1e5)
+    result.reshape(-1)[start:stop] = solve_batch(process, t1, p1, v1, cp, cv, k, z, q)
+    result.flush()
+    del result
+    return stop - start
+
+
+def run_sweep(process, path, z, q, t1=300, p1=1, medium='Air', v1=None, workers=None, shard_size=SHARD_SIZE):
+    names, media_table = medium_axis(medium)
+    axes = {'t1': as_axis(t1), 'p1': as_axis(p1), 'z': as_axis(z), 'q': as_axis(q)}
+    shape = (len(names),) + tuple(len(axes[name]) for name in SWEEP_AXES[1:])
+
+    # Das Ergebnis wird direkt auf die Platte geschrieben, jeder Worker füllt seinen Abschnitt
+    result = np.lib.format.open_memmap(path, mode='w+', dtype=RESULT_DTYPE, shape=shape)
+    del result
+    with open(sweep_axes_path(path), 'w') as file:
+        json.dump({'process': process, 'medium': names, 'media_properties': media_table.tolist(),
+                   **{name: values.tolist() for name, values in axes.items()}}, file)
+
+    size = int(np.prod(shape))
+    bounds = [(start, min(start + shard_size, size)) for start in range(0, size, shard_size)]
+    if workers == 1 or len(bounds) == 1:
+        for start, stop in bounds:
+            _solve_shard(path, process, axes, media_table, v1, start, stop)
+    else:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+            futures = [executor.submit(_solve_shard, path, process, axes, media_table, v1, start, stop)
+                       for start, stop in bounds]
+            for future in futures:
+                future.result()
+
+    return load_sweep(path)
+
+
+def sweep_axes_path(path):
+    return os.path.splitext(path)[0] + '_axes.json'
+
+
+def load_sweep(path):
+    with open(sweep_axes_path(path)) as file:
+        axes = json.load(file)
+    return np.load(path, mmap_mode='r'), axes
+
+
+def sweep_medium_properties(result, axes):
+    # cp, cv und k für jeden Gitterpunkt, als Broadcast-Ansicht ohne Kopie
+    table = np.asarray(axes['media_properties'], dtype=float)
+    shape = (len(table),) + (1,) * (len(SWEEP_AXES) - 1)
+    return [np.broadcast_to(table[:, i].reshape(shape), result.shape) for i in range(3)]
+
+
+def net_work(result):
+    # Abgegebene Arbeit ist im Prozess negativ gezählt
+    return -result['processes']['w'].sum(axis=-1)
+
+
+def sweep_maps(result, x='z', y='q', **fixed):
+    # Schnitt durch das Gitter: x und y bleiben frei, alle anderen Achsen auf einen Index festgelegt
+    index = tuple(slice(None) if name in (x, y) else fixed.get(name, 0) for name in SWEEP_AXES)
+    section = result[index]
+    if SWEEP_AXES.index(x) < SWEEP_AXES.index(y):
+        section = section.T
+    return {'efficiency': np.array(section['efficiency']), 'net_work': net_work(section)}
+
+
+def save_sweep_maps(path, maps, axes, x='z', y='q'):
+    # Nur der Agg-Canvas, damit der Export ohne Tk und pyplot läuft
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    labels = {'medium': 'Medium', 't1': 'T1 [K]', 'p1': 'p1 [bar]', 'z': 'z [-]', 'q': 'q / φ'}
+    fig = Figure(figsize=(10, 4), dpi=100)
+    FigureCanvasAgg(fig)
+    for i, (key, title) in enumerate([('efficiency', 'Efficiency (%)'), ('net_work', 'Net Work [kJ/kg]')], 1):
+        ax = fig.add_subplot(1, 2, i)
+        contour = ax.contourf(axes[x], axes[y], maps[key], levels=20)
+        fig.colorbar(contour, ax=ax)
+        ax.set_title(title)
+        ax.set_xlabel(labels[x])
+        ax.set_ylabel(labels[y])
+    fig.tight_layout()
+    fig.savefig(path)
@@ -1,21 +1,19 @@
-import math
-import numpy as np
 import tkinter as tk
-import matplotlib.pyplot as plt
 from tkinter import ttk
 from tkinter import messagebox
 from tkinter import font as tkfont
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.animation import FuncAnimation
-from matplotlib.colors import to_rgb, to_hex
+# numpy und matplotlib werden erst beim ersten Öffnen der Diagramme bzw. Animationen importiert,
+# damit das Rechenfenster schnell startet
+from cycle_definitions import compiled_cycle
+from cycle_model import CycleModel
+from cycle_solver import MEDIA_PROPERTIES, PROCESS_CHANGES
 
 
-# Definition der globalen Summe der Wärmemengen
-global_summe_q = 0
+# Wartezeit nach dem letzten Tastendruck, bevor live neu gerechnet wird, in Millisekunden
+LIVE_UPDATE_DELAY = 150
 
-# Globale Liste zur Speicherung der Zustände
-state_history = []
+# Höchstzahl der Diagrammkopien, die zum Vergleich offen bleiben
+DIAGRAM_COPIES = 3
 
 
 class StateFrame:
@@ -55,6 +53,9 @@ class StateFrame:
 
         self.frame.columnconfigure(1, weight=1)
 
+    def destroy(self):
+        self.frame.destroy()
+
     def toggle_fields(self):
         if self.additional_fields_visible:
             for label, entry in self.additional_entries:  # Zusätzliche Felder ausblenden
@@ -130,6 +131,9 @@ class ProcessFrame:
     def update_title(self, new_title):
         self.label.config(text=new_title)
 
+    def destroy(self):
+        self.frame.destroy()
+
     def clear_fields(self):
         for entry in self.entries:
             entry.configure(state='normal')
@@ -137,6 +141,262 @@ class ProcessFrame:
             entry.configure(state='readonly')
 
 
+class DiagramFigure:
+    # Fenster mit p-v- und T-s-Diagramm übereinander. Figur, Achsen und Linien werden einmal angelegt und bei
+    # neuen Ergebnissen wiederverwendet; release() gibt alles ausdrücklich wieder frei.
+    def __init__(self, master, title, x_shift=300):
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+        self.window = tk.Toplevel(master)
+        self.window.title(title)
+
+        diagram_width = 600
+        diagram_height = 800
+        screen_width = self.window.winfo_screenwidth()
+        screen_height = self.window.winfo_screenheight()
+        x_offset = (screen_width - diagram_width) // 2
+        y_offset = (screen_height - diagram_height) // 2
+
+        # Fensterposition und Größe festlegen
+        self.window.geometry(f'{diagram_width}x{diagram_height}+{x_offset + x_shift}+{y_offset}')
+
+        # Die Größe und Auflösung der Figur werden angepasst, P-v oben und T-s unten
+        self.figure = Figure(figsize=(6, 10), dpi=100)
+        self.ax_pv = self.figure.add_subplot(2, 1, 1)
+        self.ax_ts = self.figure.add_subplot(2, 1, 2)
+        self.canvas = FigureCanvasTkAgg(self.figure, master=self.window)
+        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.process = None
+        self.curves = None
+        self.artists = None
+        # Optionaler Punkt, der mit der Animation über die Kurven läuft; er wird wie dort geblittet
+        self.cursor = None
+        self.cursor_artists = None
+        self.cursor_frame = 0
+        self.background = None
+        self.draw_connection = self.canvas.mpl_connect('draw_event', self.on_draw)
+
+    def draw(self, curves, process, cursor=None):
+        from cycle_plot import create_pv_diagram, create_ts_diagram, update_segments
+
+        if self.process == process:
+            # Gleicher Prozess: nur neue Daten in die vorhandenen Linien setzen; der alte Punkt zählt nicht zu
+            # den Achsengrenzen
+            for artist in self.cursor_artists or ():
+                artist.set_data([], [])
+            update_segments(self.ax_pv, self.artists[0], curves['pv'])
+            update_segments(self.ax_ts, self.artists[1], curves['ts'])
+        else:
+            # Anderer Prozess: andere Zustandsänderungen in der Legende, die Achsen werden neu beschriftet
+            self.ax_pv.clear()
+            self.ax_ts.clear()
+            self.artists = (create_pv_diagram(self.ax_pv, curves), create_ts_diagram(self.ax_ts, curves))
+            # clear() hat auch die Punkte entfernt
+            self.cursor_artists = None
+            # tight_layout nur beim Neuaufbau, die Beschriftungen ändern sich beim Aktualisieren nicht
+            self.figure.tight_layout()
+        if cursor is not None and self.cursor_artists is None:
+            # Nach der Legende angelegt, damit der Punkt nicht darin auftaucht
+            self.cursor_artists = tuple(ax.plot([], [], 'o', color='black', markersize=9, zorder=5, animated=True)[0]
+                                        for ax in (self.ax_pv, self.ax_ts))
+        self.process = process
+        self.curves = curves
+        self.cursor = cursor
+        self.canvas.draw_idle()
+
+    def on_draw(self, event):
+        # Hintergrund ohne Punkt nach jedem vollen Neuzeichnen merken, dann den Punkt wieder darüberlegen
+        self.background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self.move_cursor(self.cursor_frame)
+
+    def move_cursor(self, frame):
+        if self.cursor is None or self.cursor_artists is None or self.background is None:
+            return
+        frame %= len(self.cursor)
+        self.canvas.restore_region(self.background)
+        for i, (artist, ax) in enumerate(zip(self.cursor_artists, (self.ax_pv, self.ax_ts))):
+            artist.set_data(self.cursor[frame, i, :1], self.cursor[frame, i, 1:])
+            ax.draw_artist(artist)
+        self.canvas.blit(self.figure.bbox)
+        self.cursor_frame = frame
+
+    def release(self):
+        self.canvas.mpl_disconnect(self.draw_connection)
+        self.figure.clear()
+        self.canvas.get_tk_widget().destroy()
+        self.window.destroy()
+        self.figure = self.canvas = self.artists = self.curves = self.cursor = self.cursor_artists = None
+        self.background = None
+
+
+class DiagramPanel:
+    # Ein einziges Diagrammfenster für alle Rechnungen. Schließen blendet es nur aus, beim nächsten Öffnen werden
+    # Figur und Linien wiederverwendet. "Keep Copy" legt eine feste Kopie zum Vergleich an; von den Kopien bleiben
+    # höchstens max_copies offen, die älteste wird beim Überschreiten freigegeben.
+    def __init__(self, master, max_copies=3):
+        self.master = master
+        self.max_copies = max_copies
+        self.diagram = None
+        self.copies = []
+
+    def visible(self):
+        return self.diagram is not None and self.diagram.window.winfo_viewable()
+
+    def show(self, curves, process, cursor=None):
+        self.refresh(curves, process, cursor)
+        self.diagram.window.deiconify()
+        self.diagram.window.lift()
+
+    def refresh(self, curves, process, cursor=None):
+        # Neue Kurven ins Fenster setzen, ohne es in den Vordergrund zu holen
+        if self.diagram is None:
+            self.diagram = DiagramFigure(self.master, "Thermodynamic Diagrams")
+            self.diagram.window.protocol("WM_DELETE_WINDOW", self.diagram.window.withdraw)
+            keep_button = tk.Button(self.diagram.window, text="Keep Copy", command=self.keep_copy)
+            keep_button.pack(side="bottom", fill="x", before=self.diagram.canvas.get_tk_widget())
+        self.diagram.draw(curves, process, cursor)
+
+    def move_cursor(self, process, frame):
+        # Von der Animation pro Bild aufgerufen; nur die Animation des gezeigten Prozesses bewegt den Punkt
+        if self.diagram is not None and self.diagram.process == process and self.visible():
+            self.diagram.move_cursor(frame)
+
+    def keep_copy(self):
+        if self.diagram is None or self.diagram.curves is None:
+            return
+        copy = DiagramFigure(self.master, f"Thermodynamic Diagrams ({self.diagram.process}, copy)",
+                             x_shift=300 - 40 * (len(self.copies) + 1))
+        copy.draw(self.diagram.curves, self.diagram.process)
+        copy.window.protocol("WM_DELETE_WINDOW", lambda: self.release_copy(copy))
+        self.copies.append(copy)
+        while len(self.copies) > self.max_copies:
+            self.release_copy(self.copies[0])
+
+    def release_copy(self, copy):
+        self.copies.remove(copy)
+        copy.release()
+
+
+class AnimationTimer:
+    # Ein gemeinsamer Takt über root.after für alle offenen Animationen statt einer eigenen Schleife pro Fenster.
+    # Er läuft nur, solange mindestens eine Animation nicht pausiert ist.
+    def __init__(self, master, interval):
+        self.master = master
+        self.interval = interval
+        self.players = []
+        self.job = None
+
+    def add(self, player):
+        self.players.append(player)
+        self.start()
+
+    def remove(self, player):
+        if player in self.players:
+            self.players.remove(player)
+        if not self.players:
+            self.stop()
+
+    def start(self):
+        if self.job is None:
+            self.job = self.master.after(self.interval, self.tick)
+
+    def stop(self):
+        if self.job is not None:
+            self.master.after_cancel(self.job)
+            self.job = None
+
+    def tick(self):
+        self.job = None
+        running = [player for player in self.players if not player.paused]
+        for player in running:
+            player.step()
+        if running:
+            self.job = self.master.after(self.interval, self.tick)
+
+
+class AnimationPlayer:
+    # Kolben- bzw. Turbinenanimation in einem Tk-Fenster. Pro Takt werden nur die beweglichen Artists über den
+    # gespeicherten Hintergrund gezeichnet (Blitting); der Hintergrund wird bei jedem vollen Neuzeichnen erneuert.
+    def __init__(self, master, timer, process, on_close=None, x_shift=0, on_frame=None):
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from cycle_animation import setup_animation
+
+        self.timer = timer
+        self.process = process
+        self.on_close = on_close
+        self.on_frame = on_frame
+        self.paused = False
+        self.position = 0.0
+        self.frame = None
+
+        self.window = tk.Toplevel(master)
+        self.window.title(f"{process} Animation")
+        self.window.geometry(f"+{60 + x_shift}+60")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        self.figure = Figure(figsize=(5, 4), dpi=100)
+        self.ax = self.figure.add_subplot()
+        self.artists, self.update, self.frames = setup_animation(self.ax, process)
+        for artist in self.artists:
+            artist.set_animated(True)
+        self.canvas = FigureCanvasTkAgg(self.figure, master=self.window)
+        self.background = None
+        self.draw_connection = self.canvas.mpl_connect('draw_event', self.on_draw)
+
+        controls = tk.Frame(self.window)
+        controls.pack(side="bottom", fill="x")
+        self.pause_button = tk.Button(controls, text="Pause", width=8, command=self.toggle_pause)
+        self.pause_button.pack(side="left", padx=5, pady=2)
+        tk.Label(controls, text="Speed:").pack(side="left")
+        self.speed_var = tk.DoubleVar(value=1.0)
+        tk.Scale(controls, variable=self.speed_var, from_=0.25, to=4, resolution=0.25, orient="horizontal",
+                 showvalue=True).pack(side="left", fill="x", expand=True, padx=5)
+        self.canvas.get_tk_widget().pack(side="top", fill=tk.BOTH, expand=True)
+        self.canvas.draw()
+        timer.add(self)
+
+    def on_draw(self, event):
+        # Nach einem vollen Neuzeichnen (z.B. Größenänderung) den Hintergrund ohne bewegliche Teile merken
+        self.background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self.blit(self.frame if self.frame is not None else 0)
+
+    def blit(self, frame):
+        if self.background is None:
+            return
+        self.canvas.restore_region(self.background)
+        for artist in self.update(frame):
+            self.ax.draw_artist(artist)
+        self.canvas.blit(self.figure.bbox)
+        self.frame = frame
+        if self.on_frame is not None:
+            self.on_frame(self.process, frame)
+
+    def step(self):
+        # Die Geschwindigkeit verschiebt nur die Bildposition; unveränderte Bilder werden nicht neu gezeichnet
+        self.position = (self.position + self.speed_var.get()) % self.frames
+        frame = int(self.position)
+        if frame != self.frame:
+            self.blit(frame)
+
+    def toggle_pause(self):
+        self.paused = not self.paused
+        self.pause_button.config(text="Resume" if self.paused else "Pause")
+        if not self.paused:
+            self.timer.start()
+
+    def close(self):
+        self.timer.remove(self)
+        self.canvas.mpl_disconnect(self.draw_connection)
+        self.figure.clear()
+        self.canvas.get_tk_widget().destroy()
+        self.window.destroy()
+        self.figure = self.canvas = self.background = self.artists = self.update = self.on_frame = None
+        if self.on_close is not None:
+            self.on_close(self)
+
+
 def are_fields_filled():
     # Prüfen, ob die benötigten Felder ausgefüllt sind und numerisch sind
     required_fields = [compression_ratio_entry, heat_or_injection_entry]  # Liste der erforderlichen Felder
@@ -173,21 +433,20 @@ def are_fields_filled():
     return True
 
 
-def get_values_from_StateFrame(state_frame):
-    # Überprüfe zuerst, ob alle benötigten Felder ausgefüllt sind
-    if not are_fields_filled():
-        return None
-
-    v = float(state_frame.entries[2][1].get())
-    p = float(state_frame.entries[1][1].get())
-    t = float(state_frame.entries[0][1].get())
-    cp = float(entries[0].get())  # Cp aus Entry holen
-    cv = float(entries[1].get())  # Cv aus Entry holen
-    k = float(entries[2].get())
+def get_cycle_inputs():
+    # Alle Eingaben einmalig aus den Widgets lesen
+    t1, p1, v1 = (float(entry.get()) for _, entry in state1_frame.entries)
+    cp, cv, k = (float(entry.get()) for entry in entries)
     z = float(compression_ratio_entry.get())
     q = float(heat_or_injection_entry.get())
+    return t1, p1, v1, cp, cv, k, z, q
+
 
-    return v, p, t, cp, cv, k, z, q
+def get_property_model():
+    # Temperaturabhängige Stoffwerte gibt es nur für die vordefinierten Gase
+    if temperature_dependent_var.get() and medium_combobox.get() != 'Custom':
+        return medium_combobox.get()
+    return None
 
 
 def format_value(value):
@@ -201,18 +460,20 @@ def format_value(value):
     return formatted_value
 
 
-def update_state_and_process(state_frame, process_frame, t, p, v, h, s, q, w, u):
-    # Werte formatieren vor dem Einfügen in die GUI
-    t_str = format_value(t)
-    p_str = format_value(p)
-    v_str = format_value(v)
-    h_str = format_value(h)
-    s_str = format_value(s)
-    q_str = format_value(q)
-    w_str = format_value(w)
-    u_str = format_value(u)
+def set_entry(field, value, readonly):
+    # Nur geänderte Felder neu schreiben, unveränderte Felder flackern so beim Live-Update nicht
+    if field.get() == value:
+        return
+    field.configure(state='normal')
+    field.delete(0, tk.END)
+    field.insert(0, value)
+    if readonly:
+        field.configure(state='readonly')
 
-    # Liste der zu aktualisierenden Felder in StateFrame und ProcessFrame
+
+def update_state_and_process(state_frame, process_frame, state, values, skip_inputs=False):
+    # state und values sind Records aus dem Solver; die Zahlen werden nur zur Anzeige formatiert und nie
+    # aus den Feldern zurückgelesen
     state_fields = [
         state_frame.entries[0][1],
         state_frame.entries[1][1],
@@ -228,210 +489,15 @@ def update_state_and_process(state_frame, process_frame, t, p, v, h, s, q, w, u)
     ]
 
     # Alle Felder aktivieren, Werte einfügen
-    for i, (field, value) in enumerate(zip(state_fields, [t_str, p_str, v_str, h_str, s_str])):
-        field.configure(state='normal')
-        field.delete(0, tk.END)
-        field.insert(0, value)
+    for i, (field, value) in enumerate(zip(state_fields, state)):
+        # Beim Live-Update bleiben die Eingabefelder von Zustand 1 so, wie sie gerade getippt werden
+        if skip_inputs and state_frame.first_state and i <= 2:
+            continue
         # Setze nur die zusätzlichen Felder oder Felder von anderen States auf readonly
-        if i > 2 or not state_frame.first_state:
-            field.configure(state='readonly')
-
-    for field, value in zip(process_fields, [q_str, w_str, u_str]):
-        field.configure(state='normal')
-        field.delete(0, tk.END)
-        field.insert(0, value)
-        field.configure(state='readonly')
-
+        set_entry(field, format_value(value), i > 2 or not state_frame.first_state)
 
-def isentropic_change(vorheriger_state_frame, nachfolgender_state_frame, process_frame, letzter_durchlauf=False):
-    global global_summe_q
-    global state_history
-    v1, p1, t1, cp, cv, k, z, q = get_values_from_StateFrame(vorheriger_state_frame)
-
-    # Save data in state history
-    actual_state = {'t': t1, 'p': p1, 'v': v1}
-    state_history.append(actual_state)
-
-    # Den Titel des aktuellen ProcessFrame überprüfen
-    titel = process_frame.label.cget("text").lower()
-    if "compression" in titel:
-        if process_combobox.get() == "Joule":
-            # z is in this case the pressureratio z = p2/p1
-            t2 = t1 * z ** ((k - 1) / k)
-            p2 = z * p1
-            v2 = v1 * (p1 / p2) ** (1 / k)
-        else:
-            t2 = t1 * (z ** (k - 1))
-            v2 = v1 / z  # Für eine isentropische Zustandsänderung in einem idealen Gas
-            p2 = p1 * (z ** k)
-    elif "expansion" in titel:
-        if process_combobox.get() == "Diesel":
-            second_state = state_history[1]
-            v = second_state['v']
-            v2 = v * z
-            p2 = p1 * ((v1 / v2) ** k)
-            t2 = t1 * ((v1 / v2) ** (k - 1))
-        elif process_combobox.get() == "Joule":
-            # z is in this case the pressureratio z = p3/p4
-            t2 = t1 * (1 / z) ** ((k - 1) / k)
-            p2 = p1 / z
-            v2 = v1 * (p1 / p2) ** (1 / k)
-        else:
-            t2 = t1 * ((1 / z) ** (k - 1))
-            v2 = v1 * z
-            p2 = p1 * ((1/z) ** k)
-    else:
-        t2, p2, v2 = None, None, None  # Wenn keines von den beiden zustimmt
-
-    h2 = cp * (t2 - t1) / 1000
-    s2 = 0
-    q = 0
-
-    if letzter_durchlauf:
-        w = -global_summe_q  # u auf den negativen Wert der globalen Summe setzen
-        u = w
-    else:
-        u = cv * (t2 - t1) / 1000
-        w = u
-        global_summe_q += w  # Addiere die Arbeit zur globalen Summe
-
-    update_state_and_process(nachfolgender_state_frame, process_frame, t2, p2, v2, h2, s2, q, w, u)
-
-
-def isochoric_change(vorheriger_state_frame, nachfolgender_state_frame, process_frame, letzter_durchlauf=False):
-    global global_summe_q
-    global state_history
-    v1, p1, t1, cp, cv, k, z, q = get_values_from_StateFrame(vorheriger_state_frame)
-
-
-    actual_state = {'t': t1, 'p': p1, 'v': v1}
-    state_history.append(actual_state)
-
-    # Wärmemenge für den letzten Durchlauf anpassen
-    if letzter_durchlauf:
-        q = global_summe_q
-
-    # Den Titel des aktuellen ProcessFrame überprüfen
-    titel = process_frame.label.cget("text").lower()
-    if "output" in titel:
-        q = q * -1
-    else:
-        q = q
-
-    if not letzter_durchlauf:
-        # Update der globalen Summe der Wärmemengen, außer im letzten Durchlauf
-        global_summe_q += q
-
-    v2 = v1
-    t2 = t1 + q / cv * 1000
-    p2 = p1 * (t2 / t1)
-    h2 = cp * (t2 - t1) / 1000
-    u = cv * (t2 - t1) / 1000
-    w = 0
-    try:
-        # Versuche, s2 zu berechnen. Dies könnte Fehler werfen, wenn t1 oder t2 nicht gültige Werte für math.log sind.
-        s2 = cv * math.log(t2 / t1)
-    except Exception as e:
-        # Fängt jegliche Art von Ausnahme ab, die beim Versuch, s2 zu berechnen, auftritt.
-        messagebox.showerror("Error", "Error calculating entropy: " + str(e))
-        s2 = None  # Optional: Setze s2 auf einen Fehlerwert oder handle den Fehler anderweitig.
-
-    update_state_and_process(nachfolgender_state_frame, process_frame, t2, p2, v2, h2, s2, q, w, u)
-
-
-def isothermal_change(vorheriger_state_frame, nachfolgender_state_frame, process_frame, letzter_durchlauf=False):
-    global global_summe_q
-    global state_history
-    v1, p1, t1, cp, cv, k, z, q = get_values_from_StateFrame(vorheriger_state_frame)
-    R = cp - cv
-
-    actual_state = {'t': t1, 'p': p1, 'v': v1}
-    state_history.append(actual_state)
-
-    # Den Titel des aktuellen ProcessFrame überprüfen
-    titel = process_frame.label.cget("text").lower()
-    if "compression" in titel:
-        v2 = v1 / z
-    elif "expansion" in titel:
-        v2 = v1 * z
-    else:
-        t2, p2, v2 = None, None, None
-
-    t2 = t1
-    p2 = p1 * v1 / v2
-    h2 = cp * (t2 - t1) / 1000
-    s2 = cv * math.log(p2 / p1) + cp * math.log(v2 / v1)
-
-    u = 0
-
-    if letzter_durchlauf:
-        w = -global_summe_q
-        q = -w
-    else:
-        w = -R * t2 * math.log(p1 / p2) / 1000
-        q = -w
-        global_summe_q += w + q  # Addiere die Arbeit zur globalen Summe
-
-    update_state_and_process(nachfolgender_state_frame, process_frame, t2, p2, v2, h2, s2, q, w, u)
-
-
-def isobaric_change(vorheriger_state_frame, nachfolgender_state_frame, process_frame, letzter_durchlauf=False):
-    global global_summe_q
-    global state_history
-    v1, p1, t1, cp, cv, k, z, q = get_values_from_StateFrame(vorheriger_state_frame)
-    R = cp - cv
-
-    actual_state = {'t': t1, 'p': p1, 'v': v1}
-    state_history.append(actual_state)
-
-    # Den Titel des aktuellen ProcessFrame überprüfen
-    titel = process_frame.label.cget("text").lower()
-    if "output" in titel:
-        # Wärmemenge für den letzten Durchlauf anpassen
-        vorzeichen = -1
-        if letzter_durchlauf:
-            first_state = state_history[0]
-            t2 = first_state['t']
-            v2 = v1 * t2 / t1
-            w = -(v2 - v1) * R * t2 / v2 / 1000
-            global_summe_q += w  # w des aktuellen Zustandes wird in die Energiebilanz mit einberechnet
-            q = global_summe_q * vorzeichen
-        else:
-            t2 = t1 + q * vorzeichen * 1000 / cp
-    else:
-        t2 = t1 + q * 1000 / cp
-        if process_combobox.get() == "Diesel":
-            phi = q  # q ist hier das Injektionsverhältnis
-            t2 = t1 * abs(phi)  # Injektionsverhältnis immer positiv
-
-    p2 = p1
-    v2 = v1 * t2 / t1
-    h2 = cp * (t2 - t1) / 1000
-    s2 = cp * math.log(t2 / t1)
-    w = -(v2 - v1) * R * t2 / v2 / 1000
-    u = cv * (t2 - t1) / 1000
-
-    if not letzter_durchlauf:
-        q = cp * (t2 - t1) / 1000
-        # Update der globalen Summe der Wärmemengen, außer im letzten Durchlauf
-        global_summe_q += q + w
-
-    update_state_and_process(nachfolgender_state_frame, process_frame, t2, p2, v2, h2, s2, q, w, u)
-
-
-def determine_and_calculate_process_change(vorheriger_state_frame, nachfolgender_state_frame, process_frame,
-                                            letzter_durchlauf=False):
-    titel = process_frame.label.cget("text").lower()
-    if "isentrop" in titel:
-        isentropic_change(vorheriger_state_frame, nachfolgender_state_frame, process_frame)
-    elif "isochor" in titel:
-        isochoric_change(vorheriger_state_frame, nachfolgender_state_frame, process_frame,
-                         letzter_durchlauf=letzter_durchlauf)
-    elif "isotherm" in titel:
-        isothermal_change(vorheriger_state_frame, nachfolgender_state_frame, process_frame)
-    elif "isobar" in titel:
-        isobaric_change(vorheriger_state_frame, nachfolgender_state_frame, process_frame,
-                        letzter_durchlauf=letzter_durchlauf)
+    for field, value in zip(process_fields, values):
+        set_entry(field, format_value(value), True)
 
 
 def update_efficiency_display(efficiency):
@@ -441,599 +507,165 @@ def update_efficiency_display(efficiency):
     efficiency_entry.config(state='readonly')  # Feld wieder sperren
 
 
-def calculate_efficiency():
-    process = process_combobox.get()
-    efficiency = 0
-    t_min = float(state1_frame.entries[0][1].get())
-    t_max = float(state3_frame.entries[0][1].get())
-    p_min = float(state1_frame.entries[1][1].get())
-    p_max = float(state3_frame.entries[1][1].get())
-    z = float(compression_ratio_entry.get())
-    phi = float(heat_or_injection_entry.get())
-    k = float(entries[2].get())
-    if process == "Otto":
-        efficiency = (1 - 1 / (z ** (k - 1))) * 100
-    elif process == "Diesel":
-        efficiency = (1 - (1 / (k * z ** (k - 1)) * (phi ** k - 1 ) / (phi - 1))) * 100
-    elif process == "Stirling":
-        efficiency = (1 - t_min / t_max) * 100
-    elif process == "Joule":
-        efficiency = (1 - (p_min / p_max) ** ((k - 1) / k)) * 100
+def show_result(result, steps, skip_inputs=False):
+    # Prozess i führt von Zustand i auf Zustand i + 1, der letzte zurück auf Zustand 1
+    for i in steps:
+        j = (i + 1) % len(state_frames)
+        update_state_and_process(state_frames[j], process_frames[i], result['states'][j], result['processes'][i],
+                                 skip_inputs)
 
-    update_efficiency_display(efficiency)
+    update_efficiency_display(result['efficiency'])
 
 
 def perform_calculations():
-    global global_summe_q
-    global_summe_q = 0  # Zurücksetzen der Summe der Wärmemengen zu Beginn der Berechnung
-    state_history.clear()
-
-    for i in range(len(process_frames)):
-        vorheriger_state_frame = [state1_frame, state2_frame, state3_frame, state4_frame][i]
-        nachfolgender_state_frame = [state2_frame, state3_frame, state4_frame, state1_frame][i]
-        process_frame = process_frames[i]
-        if i < len(process_frames) - 1:  # Für alle außer dem letzten Durchlauf
-            determine_and_calculate_process_change(vorheriger_state_frame, nachfolgender_state_frame,
-                                                    process_frame)
-        else:  # Im letzten Durchlauf
-            determine_and_calculate_process_change(vorheriger_state_frame, nachfolgender_state_frame,
-                                                    process_frame, letzter_durchlauf=True)
-
-    # Berechnung des Wirkungsgrads hinzufügen
-    calculate_efficiency()
-
-
-def create_pv_diagram(ax):
-    k = float(entries[2].get())
-    step_number = 1
-
-    for i, process_frame in enumerate(process_frames):
-        start_state_frame = [state1_frame, state2_frame, state3_frame, state4_frame][i]
-        end_state_frame = [state2_frame, state3_frame, state4_frame, state1_frame][i]
-        p1, v1 = float(start_state_frame.entries[1][1].get()), float(start_state_frame.entries[2][1].get())
-        p2, v2 = float(end_state_frame.entries[1][1].get()), float(end_state_frame.entries[2][1].get())
-
-        # Zeichnet die Verbindungslinien ohne Marker
-        if "isentropic" in process_frame.label.cget("text").lower():
-            volumes = np.linspace(min(v1, v2), max(v1, v2), 100)
-            pressures = p1 * (v1 ** k) / (volumes ** k) if v1 < v2 else p2 * (v2 ** k) / (volumes ** k)
-            ax.plot(volumes, pressures, linestyle='-', label=process_frame.label.cget("text"))
-        elif "isothermal" in process_frame.label.cget("text").lower():
-            volumes = np.linspace(min(v1, v2), max(v1, v2), 100)
-            pressures = p1 * v1 / volumes
-            ax.plot(volumes, pressures, linestyle='-', label=process_frame.label.cget("text"))
-        else:
-            ax.plot([v1, v2], [p1, p2], linestyle='-', label=process_frame.label.cget("text"))
-
-        # Markiert die Eckpunkte der Zustände
-        ax.plot([v1, v2], [p1, p2], 'o', label='')  # Leeres Label, um Duplikate in der Legende zu vermeiden
-        ax.annotate(str(step_number), (v1, p1), textcoords="offset points", xytext=(10, 0), ha='right')
-        step_number += 1
-
-    ax.set_title('p-V Diagram')
-    ax.set_xlabel('Volume [m3/kg]')
-    ax.set_ylabel('Pressure [bar]')
-    ax.legend()
-
-
-def create_ts_diagram(ax):
-    cp = float(entries[0].get())
-    cv = float(entries[1].get())
-    R = cp - cv
-
-    list_delta_S = [0]
-    step_number = 1
-
-    for i, process_frame in enumerate(process_frames):
-        start_state_frame = [state1_frame, state2_frame, state3_frame, state4_frame][i]
-        end_state_frame = [state2_frame, state3_frame, state4_frame, state1_frame][i]
-        p1, v1, T1, s1 = (float(start_state_frame.entries[1][1].get()),
-                        float(start_state_frame.entries[2][1].get()),
-                        float(start_state_frame.entries[0][1].get()),
-                        float(start_state_frame.additional_entries[1][1].get()))
-        p2, v2, T2, s2 = (float(end_state_frame.entries[1][1].get()),
-                        float(end_state_frame.entries[2][1].get()),
-                        float(end_state_frame.entries[0][1].get()),
-                        float(end_state_frame.additional_entries[1][1].get()))
-
-        if "isentrop" in process_frame.label.cget("text").lower():
-            # Überprüfe, ob es der erste Durchgang ist
-            if i == 0:   # Wenn ja, setze den Startwert der Entropie auf 0
-                s1 = 0
-            else:
-                s1 = float(start_state_frame.additional_entries[1][1].get())
-                s2 = s1
-            ax.plot([s1, s2], [T1, T2], linestyle='-', label=process_frame.label.cget("text"))
-            list_delta_S.append(s2)
-            ax.plot(s2, T2, 'o', label='')  # Zeichne den Endpunkt
-            ax.annotate(str(step_number), (s1, T1), textcoords="offset points", xytext=(10, 0), ha='right')
-        elif "isochor" in process_frame.label.cget("text").lower():
-            if process_combobox.get() == "Stirling":
-                start_delta_S = list_delta_S[-1]
-                temperatures = np.linspace(T1, T2, 100)  # Erzeuge 100 Zwischentemperaturen
-                delta_S = start_delta_S + cv * np.log(temperatures / T1) if T1 < T2 else\
-                    cv * np.log(temperatures / T2)   # Berechnung der Entropieänderung für jede Zwischentemperatur
-                s2 = delta_S[-1]
-                list_delta_S.append(s2)  # Nur den letzten Wert aus dem Array speichern
-                ax.plot(delta_S, temperatures, linestyle='-', label=process_frame.label.cget("text"))
-            else:
-                temperatures = np.linspace(T1, T2, 100)  # Erzeuge 100 Zwischentemperaturen
-                delta_S = cv * np.log(temperatures / T1) if T1 < T2 else\
-                    cv * np.log(temperatures / T2)   # Berechnung der Entropieänderung für jede Zwischentemperatur
-                ax.plot(delta_S, temperatures, linestyle='-', label=process_frame.label.cget("text"))
-                s2 = delta_S[-1]
-                list_delta_S.append(s2)
-            if i == 3:
-                s2 = 0
-                s1 = list_delta_S[-2]
-                ax.plot(s2, T2, 'o', label='')  # Zeichne den Endpunkt
-            else:
-                ax.plot(s2, T2, 'o', label='')  # Zeichne den Endpunkt
-            ax.annotate(str(step_number), (s1, T1), textcoords="offset points", xytext=(10, 0), ha='right')
-        elif "isobar" in process_frame.label.cget("text").lower():
-            temperatures = np.linspace(T1, T2, 100)  # Erzeuge 100 Zwischentemperaturen
-            delta_S = cp * np.log(temperatures / T1) if T1 < T2 else cp * np.log(temperatures / T2)
-            ax.plot(delta_S, temperatures, linestyle='-', label=process_frame.label.cget("text"))
-            if i == 3:
-                ax.plot(0, T2, 'o', label='')  # Zeichne den Endpunkt
-                s1 = list_delta_S[-1]
-            else:
-                ax.plot(s2, T2, 'o', label='')  # Zeichne den Endpunkt
-            ax.annotate(str(step_number), (s1, T1), textcoords="offset points", xytext=(10, 0), ha='right')
-        elif "isotherm" in process_frame.label.cget("text").lower():
-            if i == 0:  # Setze den ersten Punkt der Entropie auf 0 nur für den ersten Durchgang
-                temperatures = T1  # Temperatur bleibt konstant
-                pressures = np.linspace(p1, p2, 100)  # Erzeuge 100 Zwischenwerte für den Druck
-                volumes = p1 * v1 / pressures  # Berechnung der Zwischenvolumen basierend auf dem idealen Gasgesetz
-                delta_S = R * np.log(volumes / v1)  # Berechnung der Entropieänderung
-                s2 = delta_S[-1]
-                s1 = list_delta_S[-1]   # Anfangsentropie auf 0 setzen
-                list_delta_S.append(s2)
-                delta_S -= delta_S[0]
-            else:
-                start_delta_S = list_delta_S[-1]
-                temperatures = T1  # Temperatur bleibt konstant
-                pressures = np.linspace(p1, p2, 100)  # Erzeuge 100 Zwischenwerte für den Druck
-                volumes = p1 * v1 / pressures  # Berechnung der Zwischenvolumen basierend auf dem idealen Gasgesetz
-                delta_S = start_delta_S + R * np.log(volumes / v1)  # Berechnung der Entropieänderung
-                s2 = delta_S[-1]
-                s1 = abs(list_delta_S[-1])
-                list_delta_S.append(s2)
-
-            ax.plot(delta_S, [temperatures] * 100, linestyle='-', label=process_frame.label.cget("text"))
-            ax.plot(s2, T2, 'o', label='')  # Zeichne den Endpunkt
-            ax.annotate(str(step_number), (s1, T1), textcoords="offset points", xytext=(10, 0), ha='right')
-
-        step_number += 1
-
-    ax.set_title('T-s Diagram')
-    ax.set_xlabel('Entropy [J/kg]')
-    ax.set_ylabel('Temperature [K]')
-    ax.legend()
-    ax.text(0.5, 0.95, "Assumed state: 0°C, 1 atm", transform=ax.transAxes,
-            horizontalalignment='center', verticalalignment='center',
-            fontsize=10, color='gray', alpha=0.8)
-
-
-def show_diagrams():
-    diagram_window = tk.Toplevel(root)
-    diagram_window.title("Thermodynamic Diagrams")
-    diagram_window.geometry('600x800')
-
-    diagram_width = 600
-    diagram_height = 800
-    screen_width = diagram_window.winfo_screenwidth()
-    screen_height = diagram_window.winfo_screenheight()
-    x_offset = (screen_width - diagram_width) // 2
-    y_offset = (screen_height - diagram_height) // 2
-
-    # Fensterposition und Größe festlegen
-    diagram_window.geometry(f'{diagram_width}x{diagram_height}+{x_offset+300}+{y_offset}')
-
-    # Die Größe und Auflösung der Figur werden angepasst
-    fig = Figure(figsize=(6, 10), dpi=100)
-
-    # P-v Diagramm in der oberen Hälfte
-    ax_pv = fig.add_subplot(2, 1, 1)
-    create_pv_diagram(ax_pv)
-
-    # T-s Diagramm in der unteren Hälfte
-    ax_ts = fig.add_subplot(2, 1, 2)
-    create_ts_diagram(ax_ts)
-
-    # Anwendung von tight_layout zur Vermeidung von Überlappungen
-    fig.tight_layout()
-
-    # Das Diagramm im neuen Fenster anzeigen
-    canvas = FigureCanvasTkAgg(fig, master=diagram_window)
-    canvas.draw()
-    canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
-
-
-def clamp_color(value):
-    return max(0, min(1, value))
-
-
-def otto_animation():
-    # Parameter
-    kolben_breite = 0.7
-    kolben_hoehe = 0.2
-    kolben_min = 0.3
-    kolben_max = 1.5
-    zylinder_breite = 0.7
-    zylinder_hoehe = 2.0
-
-    # Bewegungserzeugung
-    auf_bewegung_frames = np.linspace(0, np.pi, 50)  # Isentropische Kompression
-    pause_oben_frames = np.ones(40) * np.pi  # Isochore Wärmezufuhr
-    ab_bewegung_frames = np.linspace(np.pi, 2 * np.pi, 40)  # Isentropische Expansion
-    pause_unten_frames = np.ones(40) * 0  # Isochore Wärmeabfuhr
-
-    # Ändere die Reihenfolge, damit die Kompression zuerst startet
-    gesamte_frames = np.concatenate([auf_bewegung_frames, pause_oben_frames, ab_bewegung_frames, pause_unten_frames,
-                                     pause_unten_frames])
-
-    fig, ax = plt.subplots()
-    ax.set_xlim(0, 2)
-    ax.set_ylim(0, 3)
-    ax.axis('off')
-
-    zylinder = plt.Rectangle((1 - zylinder_breite / 2, 0), zylinder_breite, zylinder_hoehe, fill=None,
-                             edgecolor='black')
-    ax.add_patch(zylinder)
-
-    kolben = plt.Rectangle((1 - kolben_breite / 2, kolben_min), kolben_breite, kolben_hoehe, fc='black')
-    ax.add_patch(kolben)
-
-    raum = plt.Rectangle((1 - zylinder_breite / 2, kolben_max), zylinder_breite, zylinder_hoehe - kolben_max,
-                         color='blue')
-    ax.add_patch(raum)
-
-    # Text für die Phase hinzufügen
-    phase_text = ax.text(1, 2.5, '', ha='center', va='center', fontsize=12, color='black')
-
-    start_color = to_rgb('blue')
-    combustion_color = to_rgb('red')
-    orange = to_rgb('orange')
-
-    def init():
-        global stiel
-        stiel_start = (1, kolben_min + kolben_hoehe / 2)
-        stiel_ende = (1, 0)
-        stiel = plt.Line2D((stiel_start[0], stiel_ende[0]), (stiel_start[1], stiel_ende[1]), lw=2,
-                           color='black')
-        ax.add_line(stiel)
-        return kolben, raum, stiel, phase_text
-
-    def update(frame):
-        y_pos = kolben_min + (kolben_max - kolben_min) * (0.5 * (1 - np.cos(gesamte_frames[frame])))
-        kolben.set_y(y_pos)
-
-        # Phasen-Management und Farbübergänge
-        if frame < len(auf_bewegung_frames):
-            phase_text.set_text('Isentropic Compression 1 → 2')
-            progress = frame / len(auf_bewegung_frames)
-            current_color = [clamp_color(start_color[i] + progress * (orange[i] - start_color[i])) for i in range(3)]
-        elif frame < len(auf_bewegung_frames) + len(pause_oben_frames):
-            phase_text.set_text('Isochoric Heat Input 2 → 3')
-            index = frame - len(auf_bewegung_frames)
-            progress = index / len(pause_oben_frames)
-            current_color = [clamp_color(orange[i] + progress * (combustion_color[i] - orange[i])) for i in range(3)]
-        elif frame < len(auf_bewegung_frames) + len(pause_oben_frames) + len(ab_bewegung_frames):
-            phase_text.set_text('Isentropic Expansion 3 → 4')
-            index = frame - len(auf_bewegung_frames) - len(pause_oben_frames)
-            progress = index / len(ab_bewegung_frames)
-            current_color = [clamp_color(combustion_color[i] + progress * (orange[i] - combustion_color[i]))
-                             for i in range(3)]
-        else:
-            phase_text.set_text('Isochoric Heat Output 4 → 1')
-            index = frame - len(auf_bewegung_frames) - len(pause_oben_frames) - len(ab_bewegung_frames)
-            progress = index / len(pause_unten_frames)
-            current_color = [clamp_color(orange[i] + progress * (start_color[i] - orange[i])) for i in range(3)]
-
-        raum.set_color(to_hex(current_color))
-
-        raum.set_height(zylinder_hoehe - y_pos - kolben_hoehe)
-        raum.set_y(y_pos + kolben_hoehe)
-
-        stiel_start_y = y_pos + kolben_hoehe / 2
-        stiel.set_ydata([stiel_start_y, 0])
-        return kolben, raum, stiel, phase_text
-
-    ani = FuncAnimation(fig, update, frames=len(gesamte_frames), init_func=init, blit=True, interval=20)
-    plt.show()
-
-
-def diesel_animation():
-    # Parameter
-    kolben_breite = 0.7
-    kolben_hoehe = 0.2
-    kolben_min = 0.3
-    kolben_max = 1.5
-    zylinder_breite = 0.7
-    zylinder_hoehe = 2.0
-
-    # Bewegungserzeugung
-    auf_bewegung_frames = np.linspace(0, np.pi, 50)
-    isobar_frames = np.linspace(np.pi, 1.5 * np.pi, 50)
-    ab_bewegung_frames = np.linspace(1.5 * np.pi, 2 * np.pi, 60)
-    pause_unten_frames = np.ones(50) * 0
-
-    gesamte_frames = np.concatenate([auf_bewegung_frames, isobar_frames, ab_bewegung_frames, pause_unten_frames])
-
-    fig, ax = plt.subplots()
-    ax.set_xlim(0, 2)
-    ax.set_ylim(0, 3)
-    ax.axis('off')
-
-    zylinder = plt.Rectangle((1 - zylinder_breite / 2, 0), zylinder_breite, zylinder_hoehe, fill=None,
-                             edgecolor='black')
-    ax.add_patch(zylinder)
-
-    kolben = plt.Rectangle((1 - kolben_breite / 2, kolben_min), kolben_breite, kolben_hoehe, fc='black')
-    ax.add_patch(kolben)
-
-    raum = plt.Rectangle((1 - zylinder_breite / 2, kolben_max), zylinder_breite, zylinder_hoehe - kolben_max,
-                         color='blue')
-    ax.add_patch(raum)
-
-    # Text für die Phase hinzufügen
-    phase_text = ax.text(1, 2.5, '', ha='center', va='center', fontsize=12, color='black')
-
-    start_color = to_rgb('blue')
-    combustion_color = to_rgb('red')
-    orange = to_rgb('orange')
-
-    def init():
-        global stiel
-        stiel_start = (1, kolben_min + kolben_hoehe / 2)
-        stiel_ende = (1, 0)
-        stiel = plt.Line2D((stiel_start[0], stiel_ende[0]), (stiel_start[1], stiel_ende[1]), lw=2,
-                           color='black')
-        ax.add_line(stiel)
-        return kolben, raum, stiel, phase_text
-
-    def update(frame):
-        y_pos = kolben_min + (kolben_max - kolben_min) * (0.5 * (1 - np.cos(gesamte_frames[frame])))
-        kolben.set_y(y_pos)
-        raum.set_height(zylinder_hoehe - y_pos - kolben_hoehe)
-        raum.set_y(y_pos + kolben_hoehe)
-
-        # Berechnen des aktuellen Frames innerhalb jeder Phase
-        if frame < len(auf_bewegung_frames):
-            phase_text.set_text('Isentropic Compression 1 → 2')
-            progress = frame / len(auf_bewegung_frames)
-            current_color = tuple([clamp_color(start_color[i] + progress * (combustion_color[i] - start_color[i]))
-                                   for i in range(3)])
-        elif frame < len(auf_bewegung_frames) + len(isobar_frames):
-            phase_text.set_text('Isobaric Heat Input 2 → 3')
-            index = frame - len(auf_bewegung_frames)
-            progress = index / len(isobar_frames)
-            current_color = tuple([clamp_color(combustion_color[i] + progress * (orange[i] - combustion_color[i]))
-                                   for i in range(3)])
-        elif frame < len(auf_bewegung_frames) + len(isobar_frames) + len(ab_bewegung_frames):
-            phase_text.set_text('Isentropic Expansion 3 → 4')
-            index = frame - len(auf_bewegung_frames) - len(isobar_frames)
-            progress = index / len(ab_bewegung_frames)
-            current_color = orange
-        else:
-            phase_text.set_text('Isochoric Heat Output 4 → 1')
-            progress = ((frame - len(auf_bewegung_frames) - len(isobar_frames) - len(ab_bewegung_frames)) /
-                        len(pause_unten_frames))
-            current_color = tuple([clamp_color(orange[i] + progress * (start_color[i] - orange[i])) for i in range(3)])
-
-        raum.set_color(to_hex(current_color))
-
-        stiel_start_y = y_pos + kolben_hoehe / 2
-        stiel.set_ydata([stiel_start_y, 0])
-        return kolben, raum, stiel, phase_text
-
-    ani = FuncAnimation(fig, update, frames=len(gesamte_frames), init_func=init, blit=True, interval=20)
-    plt.show()
-
-
-def stirling_animation():
-    # Parameter
-    kolben_breite = 0.7
-    kolben_hoehe = 0.2
-    kolben_min = 0.3
-    kolben_max = 0.7
-    verdr_kolben_hoehe = 0.5
-    verdr_kolben_start = 1.4  # Startposition des Verdrängerkolbens
-    verdr_kolben_end = 1.0    # Endposition des Verdrängerkolbens während der isochoren Phase
-    zylinder_breite = 0.7
-    zylinder_hoehe = 2.0
-
-    # Bewegungserzeugung
-    kompression_frames = np.linspace(0, np.pi, 50)
-    heat_input_frames = np.linspace(0, np.pi, 50)
-    expansion_frames = np.linspace(np.pi, 2 * np.pi, 50)
-    heat_output_frames = np.linspace(0, np.pi, 80)
-
-    # Gesamte Bewegung kombinieren
-    gesamte_frames = np.concatenate([kompression_frames, heat_input_frames, expansion_frames, heat_output_frames])
-
-    # Figure und Axes
-    fig, ax = plt.subplots()
-    ax.set_xlim(0, 2)
-    ax.set_ylim(0, 3)
-    ax.axis('off')
-
-    # Zylinderzeichnung
-    zylinder = plt.Rectangle((1 - zylinder_breite / 2, 0), zylinder_breite, zylinder_hoehe, fill=None,
-                             edgecolor='black')
-    ax.add_patch(zylinder)
-
-    # Arbeitskolbenzeichnung
-    kolben = plt.Rectangle((1 - kolben_breite / 2, kolben_min), kolben_breite, kolben_hoehe, fc='black')
-    ax.add_patch(kolben)
-
-    # Verdrängerkolbenzeichnung
-    verdr_kolben = plt.Rectangle((1 - kolben_breite / 2, verdr_kolben_start), kolben_breite, verdr_kolben_hoehe,
-                                 fc='red')
-    ax.add_patch(verdr_kolben)
-
-    # Text für die Phase hinzufügen
-    phase_text = ax.text(1, 2.5, '', ha='center', va='center', fontsize=12, color='black')
-
-    def init():
-        global stiel
-        stiel_start = (1, kolben_min + kolben_hoehe / 2)
-        stiel_ende = (1, 0)
-        stiel = plt.Line2D((stiel_start[0], stiel_ende[0]), (stiel_start[1], stiel_ende[1]), lw=2,
-                           color='black')
-        ax.add_line(stiel)
-        return kolben, verdr_kolben, stiel, phase_text
-
-    def update(frame):
-        phase_len = len(kompression_frames)
-        if frame < phase_len:  # Isothermal Compression
-            y_pos = kolben_min + (kolben_max - kolben_min) * (0.5 * (1 - np.cos(gesamte_frames[frame])))
-            kolben.set_y(y_pos)
-            phase_text.set_text('Isothermal Compression 1 → 2')
-        elif phase_len <= frame < 2 * phase_len:  # Isochoric Heat Addition
-            verdr_y_pos = (verdr_kolben_start - (verdr_kolben_start - verdr_kolben_end) *
-                           (0.5 * (1 - np.cos(gesamte_frames[frame]))))
-            verdr_kolben.set_y(verdr_y_pos)
-            phase_text.set_text('Isochoric Heat Input 2 → 3')
-        elif 2 * phase_len <= frame < 3 * phase_len:  # Isothermal Expansion
-            y_pos = kolben_max - (kolben_max - kolben_min) * (0.5 * (1 + np.cos(gesamte_frames[frame])))
-            kolben.set_y(y_pos)
-            verdr_y_pos = y_pos + kolben_hoehe + 0.1
-            verdr_kolben.set_y(verdr_y_pos)
-            phase_text.set_text('Isothermal Expansion 3 → 4')
-        elif 3 * phase_len <= frame < 4 * phase_len:  # Isochoric Heat Removal
-            verdr_y_pos = (verdr_kolben.get_y() - (verdr_kolben.get_y() - verdr_kolben_start) *
-                           (0.5 * (1 - np.cos(gesamte_frames[frame - 3 * phase_len]))))
-            verdr_kolben.set_y(verdr_y_pos)
-            phase_text.set_text('Isochoric Heat Output 4 → 1')
-
-        stiel_start_y = kolben.get_y() + kolben_hoehe / 2
-        stiel.set_ydata([stiel_start_y, 0])
-
-        return kolben, verdr_kolben, stiel, phase_text
-
-    ani = FuncAnimation(fig, update, frames=len(gesamte_frames), init_func=init, blit=True, interval=20)
-
-    plt.show()
-
-
-def joule_animation():
-    # Basisparameter für das Rechteck
-    left, right = 1, 4.5
-    bottom, top = 1, 3
-    diagonal_point = 1.75
-
-    x = [left, left, right - 0.5, right - 0.5, right, right]
-    y = [bottom, top, top, diagonal_point + 0.5, diagonal_point, bottom]
-
-    # Parameter für das Trapez
-    x1, x2 = 4, 4.5
-    y1, y2, y3, y4 = 2.25, 2.3, 1.7, 1.8
-
-    # Punkte, für Trapez
-    x_trapez = [x1, x2, x2, x1, x1]
-    y_trapez = [y1, y2, y3, y4, y1]
-
-    # Initialisierung des Plots
-    fig, ax = plt.subplots()
-    ax.set_xlim(0, 5)
-    ax.set_ylim(0, 4)
-    ax.axis('off')
-
-    # Rechteck zeichnen
-    rect = plt.Polygon(np.column_stack([x, y]), closed=False, edgecolor='black', fill=None)
-    ax.add_patch(rect)
-
-    # Trapez zeichnen
-    trapez = plt.Polygon(np.column_stack([x_trapez, y_trapez]), closed=True, edgecolor='black', facecolor='green')
-    ax.add_patch(trapez)
-    ax.text(x1 - 0.1, (y1 + y4) / 2, 'Turbine', verticalalignment='center', horizontalalignment='right')
-
-    # Koordinaten des Kreises (mittig auf der linken Seite des Rechtecks)
-    circle_x = left
-    circle_y = (top + bottom) / 2
-    circle_radius = 0.2
-
-    # Kreis für Verdichter zeichnen
-    circle = plt.Circle((circle_x, circle_y), circle_radius, edgecolor='black', facecolor='blue')
-    ax.add_patch(circle)
-    ax.text(circle_x + 0.25, circle_y, 'Compressor', verticalalignment='center')
-
-    # Koordinaten des Rechtecks für die Brennkammer
-    combustion_width = 0.5
-    combustion_height = 0.3
-    combustion_x = left + (right - left) / 2 - combustion_width / 2  # Anpassung der Position
-    combustion_y = top - combustion_height / 2
-
-    # Rechteck für die Brennkammer zeichnen
-    combustion_rect = plt.Rectangle((combustion_x, combustion_y), combustion_width, combustion_height,
-                                    edgecolor='black', facecolor='red')
-    ax.add_patch(combustion_rect)
-    ax.text(combustion_x + combustion_width / 2, combustion_y - 0.1, 'Combustion',
-            verticalalignment='top', horizontalalignment='center')
-
-    # Definition von zwei schrägen Linien, für den Verdichter
-    line1_start = (0.85, 1.87)
-    line1_end = (0.9, 2.17)
-    line2_start = (1.15, 1.87)
-    line2_end = (1.10, 2.17)
-
-    # Zeichnen der schrägen Linien
-    plt.plot([line1_start[0], line1_end[0]], [line1_start[1], line1_end[1]], 'k-')
-    plt.plot([line2_start[0], line2_end[0]], [line2_start[1], line2_end[1]], 'k-')
-
-    # Initialisierung des Punkts
-    point, = plt.plot([], [], 'ro')
-
-    # Erzeugung der Pfade für die Animation
-    path_x, path_y = [], []
-    num_points = 100  # Anzahl der Zwischenpunkte zwischen den Eckpunkten
-
-    # Generiere Pfad entlang der Kanten des Rechtecks im Uhrzeigersinn
-    for i in range(len(x) - 1):
-        temp_x = np.linspace(x[i], x[i + 1], num_points, endpoint=False)
-        temp_y = np.linspace(y[i], y[i + 1], num_points, endpoint=False)
-        path_x.extend(temp_x)
-        path_y.extend(temp_y)
-
-    # Zusätzliche Punkte am Ende hinzu
-    extend_x = np.linspace(right, right + 0.5, num_points)
-    extend_y = np.full(num_points, bottom)
-    path_x.extend(extend_x)
-    path_y.extend(extend_y)
+    if not are_fields_filled():
+        return
+    try:
+        result, _ = cycle_model.update(process_combobox.get(), *get_cycle_inputs(),
+                                       property_model=get_property_model())
+    except (ValueError, ZeroDivisionError) as e:
+        messagebox.showerror("Error", "Error calculating cycle: " + str(e))
+        return
+
+    show_result(result, range(len(process_frames)))
+    update_open_diagrams(result)
+
+
+def read_live_inputs():
+    # Wie are_fields_filled, aber ohne Meldungen: halb getippte Zahlen werden beim Live-Update einfach übergangen
+    fields = [entry for _, entry in state1_frame.entries] + entries + [compression_ratio_entry,
+                                                                       heat_or_injection_entry]
+    try:
+        values = [float(field.get()) for field in fields]
+    except ValueError:
+        return None
+    if any(value == 0 for value in values[:3] + values[-2:]):
+        return None
+    return values
+
+
+live_update_job = None
 
-    def update(frame):
-        point.set_data([path_x[frame % len(path_x)]], [path_y[frame % len(path_y)]])
-        return point,
 
-    # Animation erstellen
-    ani = FuncAnimation(fig, update, frames=len(path_x), interval=20, blit=True)
+def schedule_live_update(event=None):
+    # Entprellt: erst wenn LIVE_UPDATE_DELAY ms nichts mehr getippt wurde, wird gerechnet
+    global live_update_job
+    if live_update_job is not None:
+        root.after_cancel(live_update_job)
+    live_update_job = root.after(LIVE_UPDATE_DELAY, live_update)
 
-    plt.show()
+
+def live_update():
+    global live_update_job
+    live_update_job = None
+    inputs = read_live_inputs()
+    if inputs is None:
+        return
+    try:
+        result, steps = cycle_model.update(process_combobox.get(), *inputs, property_model=get_property_model())
+    except (ValueError, ZeroDivisionError, OverflowError):
+        return
+    if not steps:
+        return
+    # Nur die Zustände und Prozessgrößen hinter dem ersten betroffenen Schritt ändern sich
+    show_result(result, steps, skip_inputs=True)
+    update_open_diagrams(result)
+
+
+def update_open_diagrams(result):
+    # Nur das Diagrammfenster folgt den Ergebnissen, die Kopien bleiben als Vergleich stehen
+    if diagram_panel.visible():
+        from cycle_animation import animation_cursor
+        from cycle_curves import pv_curves, ts_curves
+        diagram_panel.refresh({'pv': pv_curves(result), 'ts': ts_curves(result)}, result['process'],
+                              animation_cursor(result))
+
+
+# Offene Animationen, höchstens eine pro Prozess
+animation_players = {}
+
+
+def show_animation(process):
+    from cycle_animation import FRAME_INTERVAL
+
+    if process in animation_players:
+        animation_players[process].window.lift()
+        return
+    global animation_timer
+    if animation_timer is None:
+        animation_timer = AnimationTimer(root, FRAME_INTERVAL)
+    animation_players[process] = AnimationPlayer(root, animation_timer, process,
+                                                 on_close=lambda player: animation_players.pop(player.process),
+                                                 x_shift=40 * len(animation_players),
+                                                 on_frame=diagram_panel.move_cursor)
+
+
+# Gemeinsamer Takt der Animationen, wird mit der ersten Animation angelegt
+animation_timer = None
 
 
 def show_diagrams_and_animation():
+    from cycle_animation import animation_cursor
+    from cycle_curves import cycle_curves
+    from cycle_solver import solve_cycle_cached
+
     if not are_fields_filled():
         return
-    show_diagrams()  # Zeige Pv- und Ts-Diagramme
-    selection = process_combobox.get()
-    if selection == "Otto":
-        otto_animation()  # Zeige Animation in einem neuen Fenster
-    elif selection == "Diesel":
-        diesel_animation()
-    elif selection == "Stirling":
-        stirling_animation()
-    elif selection == "Joule":
-        joule_animation()
+    try:
+        # Lösung und Kurven kommen aus dem Cache, solange sich die Eingaben nicht geändert haben
+        inputs = get_cycle_inputs()
+        curves = cycle_curves(process_combobox.get(), *inputs, property_model=get_property_model())
+        solution = solve_cycle_cached(process_combobox.get(), *inputs, property_model=get_property_model())
+    except (ValueError, ZeroDivisionError) as e:
+        messagebox.showerror("Error", "Error calculating cycle: " + str(e))
+        return
+    # Zeige Pv- und Ts-Diagramme, der Punkt darin folgt der Animation
+    diagram_panel.show(curves, process_combobox.get(), animation_cursor(solution))
+    show_animation(process_combobox.get())  # Zeige Animation in einem neuen Fenster
 
 
 # Prozessgrößen ein- und ausblenden
 process_frames_visible = False
 
 
+def cycle_layout(count):
+    # Zustände und Zustandsänderungen im Uhrzeigersinn auf einem Ring: die erste Hälfte der Zustände oben von
+    # links nach rechts, die übrigen unten von rechts nach links, dazwischen die Zustandsänderungen. Bei vier
+    # Schritten sind das die Ecken und Kantenmitten eines 3x3-Gitters.
+    top = (count + 1) // 2
+    last = 2 * top - 2
+    states = [(0, 2 * i) for i in range(top)] + [(2, last - 2 * i) for i in range(count - top)]
+    processes = ([(0, 2 * i + 1) for i in range(top - 1)] + [(1, last)] +
+                 [(2, last - 2 * i - 1) for i in range(count - top - 1)] + [(1, 0)])
+    return states, processes, last + 1
+
+
+def build_cycle_frames(count):
+    # Ein Zustands- und ein Prozessframe pro Schritt des gewählten Kreisprozesses. Zustand 1 mit den Eingaben
+    # bleibt stehen, alle anderen Frames werden neu angelegt.
+    for frame in state_frames[1:] + process_frames:
+        frame.destroy()
+    states, processes, columns = cycle_layout(count)
+    state_frames[1:] = [StateFrame(root, f"State {i + 1}", *position) for i, position in enumerate(states) if i]
+    process_frames[:] = [ProcessFrame(root, "", *position) for position in processes]
+    if process_frames_visible:
+        for frame in process_frames:
+            frame.toggle_content()
+
+    # Gitterspalten des Rings, rechts daneben die Auswahl, das Medium und die Buttons
+    for i in range(max(columns + 1, root.grid_size()[0])):
+        root.grid_columnconfigure(i, weight=1 if i < columns else 0)
+    process_combobox_frame.grid(column=columns)
+    medium_frame.grid(column=columns)
+    button_frame.grid(column=columns)
+    for widget in (efficiency_frame, arrow1, arrow2, arrow3, arrow4):
+        widget.grid(column=columns // 2)
+
+
 def clear_all_fields():
-    for frame in [state1_frame, state2_frame, state3_frame, state4_frame] + process_frames:
+    # Nach dem Leeren muss die nächste Rechnung wieder alle Felder füllen
+    cycle_model.reset()
+    for frame in state_frames + process_frames:
         frame.clear_fields()
     compression_ratio_entry.delete(0, tk.END)
     heat_or_injection_entry.delete(0, tk.END)
@@ -1041,7 +673,6 @@ def clear_all_fields():
     efficiency_entry.config(state='normal')
     efficiency_entry.delete(0, tk.END)
     efficiency_entry.config(state='readonly')
-    state_history.clear()
 
 
 def toggle_process_frames():
@@ -1059,17 +690,25 @@ def show_instructions():
         "- Select the thermodynamic cycle and the working medium.\n"
         "- Enter the required data into the fields.\n"
         "- Use the 'Calculate' button to perform the calculations.\n"
+        "- Edited inputs are recalculated automatically, open diagrams follow.\n"
         "- Use the 'Clear Fields' button to reset the input fields.\n"
-        "- 'Show Diagrams and Animation' displays the resulting diagrams and animations.\n\n"
+        "- 'Show Diagrams and Animation' displays the resulting diagrams and animations; a dot on the curves\n"
+        "  follows the running animation.\n\n"
         "Enjoy and successful calculations!"
     )
     messagebox.showinfo("Instructions", instructions)
 
 
+# Zuletzt gerechneter Kreisprozess, Grundlage für die schrittweise Neuberechnung
+cycle_model = CycleModel()
+
 # Hauptfenster erstellen
 root = tk.Tk()
 root.title("Calculation Tool for Thermodynamic Cycles")
 
+# Wiederverwendetes Diagrammfenster, wird erst beim ersten Öffnen aufgebaut
+diagram_panel = DiagramPanel(root, DIAGRAM_COPIES)
+
 # Bildschirmgröße abrufen
 screen_width = root.winfo_screenwidth()
 screen_height = root.winfo_screenheight()
@@ -1085,23 +724,15 @@ y_position = (screen_height - window_height) // 2
 # Fensterposition setzen
 root.geometry(f"{window_width}x{window_height}+{x_position}+{y_position}")
 
-# Grid-Konfiguration im Hauptfenster für 3x3-Layout
+# Drei Zeilen für den Ring der Zustände, die Spalten richtet build_cycle_frames nach der Zahl der Schritte ein
 for i in range(3):
     root.grid_rowconfigure(i, weight=1)
-    root.grid_columnconfigure(i, weight=1)
-
-# Frames für jeden Zustand erstellen
-state1_frame = StateFrame(root, "State 1", 0, 0, first_state=True)  # Oben links
-state2_frame = StateFrame(root, "State 2", 0, 2)  # Oben rechts
-state3_frame = StateFrame(root, "State 3", 2, 2)  # Unten rechts
-state4_frame = StateFrame(root, "State 4", 2, 0)  # Unten links
 
-process_frames = [
-    ProcessFrame(root, "", 0, 1),
-    ProcessFrame(root, "", 1, 2),
-    ProcessFrame(root, "", 2, 1),
-    ProcessFrame(root, "", 1, 0)
-]
+# Frame für Zustand 1 mit den Eingaben, oben links. Die übrigen Zustände und die Zustandsänderungen legt
+# build_cycle_frames passend zur Zahl der Schritte des gewählten Kreisprozesses an.
+state1_frame = StateFrame(root, "State 1", 0, 0, first_state=True)
+state_frames = [state1_frame]
+process_frames = []
 
 # Button-Frame erstellen
 button_frame = tk.Frame(root)
@@ -1131,8 +762,7 @@ process_selection_label.pack(side="top", fill="x")
 
 
 # Combobox im Frame hinzufügen
-process_combobox = ttk.Combobox(process_combobox_frame, values=['Otto', 'Diesel', 'Stirling', 'Joule'],
-                                state='readonly')
+process_combobox = ttk.Combobox(process_combobox_frame, values=list(PROCESS_CHANGES), state='readonly')
 process_combobox.pack(side="top", fill="x")
 process_combobox.set('Otto')  # Setzt "Otto" als Standardauswahl
 # Zusätzliche Entry-Felder erstellen
@@ -1190,6 +820,12 @@ for prop in properties:
     prop_entry.pack(side="left", fill="x", expand=True)
     entries.append(prop_entry)
 
+# Checkbox für temperaturabhängige Stoffwerte (NASA-Polynome) statt konstanter cp, cv und k
+temperature_dependent_var = tk.BooleanVar(value=False)
+temperature_dependent_check = tk.Checkbutton(medium_frame, text="Temperature-dependent cp(T)",
+                                             variable=temperature_dependent_var, command=schedule_live_update)
+temperature_dependent_check.pack(side="top", anchor="w")
+
 # Pfeile zwischen den Zuständen hinzufügen
 # Hinweis: Die Implementierung der Pfeile kann variieren (z.B. als Bilder oder gezeichnete Linien)
 arrow1 = tk.Label(root, text="→", font=("Arial", 30))
@@ -1207,15 +843,12 @@ arrow4.grid(row=1, column=1, sticky="w")
 
 # Funktion zum Aktualisieren der Zustandsänderungs-Labels
 def update_process_labels(event):
-    process_changes = {
-        'Otto': ["Isentropic Compression", "Isochoric Heat Input", "Isentropic Expansion", "Isochoric Heat Output"],
-        'Diesel': ["Isentropic Compression", "Isobaric Heat Input", "Isentropic Expansion", "Isochoric Heat Output"],
-        'Stirling': ["Isothermal Compression", "Isochoric Heat Input", "Isothermal Expansion", "Isochoric Heat Output"],
-        'Joule': ["Isentropic Compression", "Isobaric Heat Input", "Isentropic Expansion", "Isobaric Heat Output"]
-    }
     process = process_combobox.get()
-    if process in process_changes:
-        for frame, title in zip(process_frames, process_changes[process]):
+    if process in PROCESS_CHANGES:
+        cycle = compiled_cycle(process)
+        if len(state_frames) != len(cycle.steps):
+            build_cycle_frames(len(cycle.steps))
+        for frame, title in zip(process_frames, cycle.labels):
             frame.update_title(title)
 
     selection = process_combobox.get()
@@ -1240,16 +873,8 @@ process_combobox.bind('<<ComboboxSelected>>', update_process_labels)
 
 # Aktualisierung der spezifischen Konstanten bei Auswahl
 def update_properties(initial=False):
-    media_properties = {
-        'Air': {'cp': 1005, 'cv': 718, 'k': 1.4},
-        'Hydrogen': {'cp': 14304, 'cv': 10153, 'k': 1.41},
-        'Nitrogen': {'cp': 1040, 'cv': 743, 'k': 1.4},
-        'Helium': {'cp': 5193, 'cv': 3116, 'k': 1.66},
-        'Custom': {'cp': '', 'cv': '', 'k': ''}
-    }
-
     selected_medium = medium_combobox.get()
-    properties = media_properties.get(selected_medium, {'cp': '', 'cv': '', 'k': ''})
+    properties = MEDIA_PROPERTIES.get(selected_medium, {'cp': '', 'cv': '', 'k': ''})
 
     for i, key in enumerate(['cp', 'cv', 'k']):
         entries[i].config(state='normal')
@@ -1266,9 +891,14 @@ update_properties(initial=True)
 
 
 # Event-Bindung für die Combobox
-medium_combobox.bind('<<ComboboxSelected>>', lambda event: update_properties())
+medium_combobox.bind('<<ComboboxSelected>>', lambda event: (update_properties(), schedule_live_update()))
 
-root.after(100, show_instructions)  # 100 ms nach Fensteraktivierung
+# Live-Update: jede Eingabe rechnet nach kurzer Pause die betroffenen Schritte neu
+for live_entry in [entry for _, entry in state1_frame.entries] + entries + [compression_ratio_entry,
+                                                                            heat_or_injection_entry]:
+    live_entry.bind('<KeyRelease>', schedule_live_update)
 
-root.mainloop()
+if __name__ == "__main__":
+    root.after(100, show_instructions)  # 100 ms nach Fensteraktivierung
+    root.mainloop()
 
@@ -10,7 +10,8 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # Von matplotlib nur optional genutzt, verlängert sonst den Start der onefile-Exe
+    excludes=['pyarrow', 'pandas', 'scipy', 'IPython', 'PyQt5', 'PyQt6', 'PySide2', 'PySide6', 'wx', 'gi'],
     noarchive=False,
     optimize=0,
 )
@@ -0,0 +1,486 @@
+import argparse
+import csv
+import itertools
+import os
+import sys
+
+import numpy as np
+
+from cycle_batch import result_columns, solve_batch
+from cycle_definitions import CYCLE_DEFINITIONS
+from cycle_graph import graph_columns, solve_graph
+from cycle_solver import MEDIA_PROPERTIES, PROCESS_CHANGES
+
+
+# Zeilen, die pro Block gelesen, gerechnet und geschrieben werden
+CHUNK_SIZE = 100_000
+
+INPUT_COLUMNS = ('t1', 'p1', 'v1', 'cp', 'cv', 'k', 'z', 'q')
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise SystemExit("Reading or writing Parquet files requires pyarrow (pip install pyarrow).")
+    return pyarrow
+
+
+def read_csv_chunks(path, chunk_size):
+    with open(path, newline='') as file:
+        reader = csv.DictReader(file)
+        reader.fieldnames = [name.strip().lower() for name in reader.fieldnames]
+        while True:
+            rows = list(itertools.islice(reader, chunk_size))
+            if not rows:
+                break
+            yield {name: [row[name] for row in rows] for name in reader.fieldnames}
+
+
+def read_parquet_chunks(path, chunk_size):
+    pyarrow = _require_pyarrow()
+    for batch in pyarrow.parquet.ParquetFile(path).iter_batches(batch_size=chunk_size):
+        yield {name.strip().lower(): column.to_numpy(zero_copy_only=False)
+               for name, column in zip(batch.schema.names, batch.columns)}
+
+
+def chunk_property_model(chunk):
+    # Temperaturabhängige Stoffwerte brauchen den Mediennamen pro Zeile
+    if 'medium' not in chunk:
+        raise ValueError("--temperature-dependent needs a 'medium' column in the input.")
+    return np.asarray([str(name).strip() for name in chunk['medium']])
+
+
+def chunk_inputs(chunk, process=None, parameters=('z', 'q')):
+    # Medium über den Namen ersetzt cp, cv und k; v1 darf fehlen und folgt dann aus dem idealen Gasgesetz.
+    # parameters sind die Spalten nach t1 … k, für N-Schritt-Kreisprozesse die Parameter aus CYCLE_DEFINITIONS.
+    columns = dict(chunk)
+    if 'medium' in columns and 'cp' not in columns:
+        try:
+            table = [MEDIA_PROPERTIES[str(name).strip()] for name in columns['medium']]
+        except KeyError as e:
+            raise ValueError(f"Unknown medium: {e.args[0]}")
+        for key in ('cp', 'cv', 'k'):
+            columns[key] = [properties[key] for properties in table]
+
+    names = INPUT_COLUMNS[:6] + tuple(parameters)
+    missing = [name for name in names if name not in columns and name != 'v1']
+    if missing:
+        raise ValueError(f"Missing input columns: {', '.join(missing)}")
+    values = {name: np.asarray(columns[name], dtype=float) for name in names if name in columns}
+    if 'v1' not in values:
+        values['v1'] = (values['cp'] - values['cv']) * values['t1'] / (values['p1'] * 1e5)
+
+    if process is None:
+        if 'process' not in columns:
+            raise ValueError("No --process given and no 'process' column in the input.")
+        process = np.asarray([str(name).strip() for name in columns['process']])
+    return process, [values[name] for name in names]
+
+
+class CsvResultWriter:
+    def __init__(self, path):
+        self.file = open(path, 'w', newline='')
+        self.writer = csv.writer(self.file)
+        self.header_written = False
+
+    def write(self, columns):
+        if not self.header_written:
+            self.writer.writerow(columns)
+            self.header_written = True
+        self.writer.writerows(zip(*(column.tolist() for column in columns.values())))
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetResultWriter:
+    def __init__(self, path):
+        self.pyarrow = _require_pyarrow()
+        self.path = path
+        self.writer = None
+
+    def write(self, columns):
+        table = self.pyarrow.table(columns)
+        if self.writer is None:
+            self.writer = self.pyarrow.parquet.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def _is_parquet(path):
+    return os.path.splitext(path)[1].lower() in ('.parquet', '.pq')
+
+
+def solve_file(in_path, out_path, process=None, chunk_size=CHUNK_SIZE, temperature_dependent=False,
+               sensitivities=False):
+    chunks = read_parquet_chunks(in_path, chunk_size) if _is_parquet(in_path) else read_csv_chunks(in_path, chunk_size)
+    writer = ParquetResultWriter(out_path) if _is_parquet(out_path) else CsvResultWriter(out_path)
+    rows = 0
+    if sensitivities and (temperature_dependent or (process is not None and process not in PROCESS_CHANGES)):
+        raise ValueError("--sensitivities needs constant cp, cv, k and one of Otto, Diesel, Stirling or Joule.")
+    if sensitivities:
+        from cycle_sensitivity import cycle_sensitivities, sensitivity_columns
+    try:
+        for chunk in chunks:
+            property_model = chunk_property_model(chunk) if temperature_dependent else None
+            if process is not None and process not in PROCESS_CHANGES:
+                # Kreisprozesse mit beliebig vielen Schritten laufen über den kompilierten Graphen
+                parameters = tuple(CYCLE_DEFINITIONS[process]['parameters'])
+                _, values = chunk_inputs(chunk, process, parameters)
+                if property_model is not None and len(np.unique(property_model)) > 1:
+                    raise ValueError(f"{process} supports only one medium per file with --temperature-dependent.")
+                property_model = None if property_model is None else str(property_model[0])
+                result = solve_graph(process, *values[:6], property_model=property_model,
+                                     **dict(zip(parameters, values[6:])))
+                columns = graph_columns(process, result)
+            else:
+                chunk_process, values = chunk_inputs(chunk, process)
+                columns = result_columns(solve_batch(chunk_process, *values, property_model=property_model))
+                if sensitivities:
+                    t1, p1, _, cp, cv, k, z, q = values
+                    columns.update(sensitivity_columns(cycle_sensitivities(chunk_process, t1, p1, cp, cv, k, z, q)[1]))
+            writer.write(columns)
+            rows += len(columns['efficiency'])
+    finally:
+        writer.close()
+    return rows
+
+
+def parse_range(text):
+    # "4:16:200" ergibt 200 Werte von 4 bis 16, "1,1.2,1.5" eine Liste, "8" einen einzelnen Wert
+    if ':' in text:
+        start, stop, num = text.split(':')
+        return np.linspace(float(start), float(stop), int(num))
+    return np.asarray([float(value) for value in text.split(',')])
+
+
+def run_sweep_command(args):
+    from cycle_sweep import run_sweep, save_sweep_maps, sweep_maps
+
+    result, axes = run_sweep(args.process, args.out, parse_range(args.z), parse_range(args.q),
+                             t1=parse_range(args.t1), p1=parse_range(args.p1), medium=args.medium.split(','),
+                             workers=args.workers)
+    print(f"{result.size} cycles written to {args.out}")
+    if args.maps:
+        save_sweep_maps(args.maps, sweep_maps(result), axes)
+        print(f"Efficiency and net work maps written to {args.maps}")
+
+
+def run_overlay_command(args):
+    from cycle_plot import save_overlay
+    from cycle_sweep import load_sweep, sweep_medium_properties
+
+    result, axes = load_sweep(args.sweep)
+    cp, cv, k = (np.ravel(values) for values in sweep_medium_properties(result, axes))
+    index = np.arange(result.size)
+    if result.size > args.max_cycles:
+        # Zufällige Auswahl, damit große Gitter gleichmäßig vertreten sind
+        index = np.sort(np.random.default_rng(0).choice(result.size, args.max_cycles, replace=False))
+    save_overlay(args.out, result.reshape(-1)[index], cp[index], cv[index], k[index], mode=args.mode)
+    print(f"{len(index)} cycles drawn to {args.out}")
+
+
+def run_animate_command(args):
+    from cycle_animation import export_animation
+
+    # Mehrere Prozesse brauchen einen Platzhalter im Dateinamen, sonst würden sie sich überschreiben
+    if len(args.process) > 1 and '{process}' not in args.out:
+        raise ValueError("--out needs a {process} placeholder when several processes are given.")
+    for process in args.process:
+        path = args.out.replace('{process}', process.lower())
+        frames = export_animation(process, path, fps=args.fps, dpi=args.dpi, workers=args.workers)
+        print(f"{frames} frames of the {process} animation written to {path}")
+
+
+def run_fit_command(args):
+    from cycle_indicator import fit_polytropic, open_trace
+    from cycle_solver import solve_cycle
+
+    v, p = open_trace(args.trace)
+    v_range = (args.v_min if args.v_min is not None else -np.inf, args.v_max if args.v_max is not None else np.inf)
+    fit = fit_polytropic(v, p, phase=args.phase, v_range=v_range, p_min=args.p_min, chunk_size=args.chunk_size)
+    print(f"n = {fit['n']:.4f}  (R² = {fit['r_squared']:.5f}, {fit['samples']} samples)")
+    if args.process:
+        # Vergleich mit dem idealen Kreisprozess bei gleichen Eingaben, nur mit der gemessenen Polytrope
+        properties = MEDIA_PROPERTIES[args.medium]
+        cp, cv, k = properties['cp'], properties['cv'], properties['k']
+        v1 = (cp - cv) * args.t1 / (args.p1 * 1e5)
+        inputs = (args.process, args.t1, args.p1, v1, cp, cv, k, args.z, args.q)
+        ideal = solve_cycle(*inputs)['efficiency']
+        measured = solve_cycle(*inputs, n=fit['n'])['efficiency']
+        print(f"{args.process} efficiency: {ideal:.2f} % isentropic, {measured:.2f} % with n = {fit['n']:.4f}")
+
+
+def run_indicator_command(args):
+    from cycle_indicator import SliderCrank, read_indicator
+
+    crank = SliderCrank(args.bore, args.stroke, args.conrod, args.compression_ratio)
+    columns = [int(column) if column.isdigit() else column for column in args.columns.split(',')]
+    summary = read_indicator(args.log, crank, args.cycle_degrees, args.bins, args.pressure_unit, args.chunk_size,
+                             columns, args.dtype)
+    work, imep = summary['work'], summary['imep']
+    print(f"{summary['samples']} samples, {len(work)} complete cycles")
+    if len(work):
+        print(f"Indicated work: {work.mean():.2f} J ± {work.std():.2f} J, IMEP {imep.mean():.3f} bar")
+    if args.work_out:
+        np.savetxt(args.work_out, np.column_stack([work, imep]), delimiter=',', header='work_J,imep_bar',
+                   comments='')
+    if args.out:
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from cycle_curves import cycle_curves
+        from cycle_plot import create_pv_diagram, overlay_indicator
+
+        properties = MEDIA_PROPERTIES[args.medium]
+        cp, cv, k = properties['cp'], properties['cv'], properties['k']
+        v1 = (cp - cv) * args.t1 / (args.p1 * 1e5)
+        z = args.z if args.z is not None else args.compression_ratio
+        fig = Figure(figsize=(6, 5), dpi=100)
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot(1, 1, 1)
+        create_pv_diagram(ax, cycle_curves(args.process, args.t1, args.p1, v1, cp, cv, k, z, args.q))
+        # Ohne angegebene Masse wird das Volumen am unteren Totpunkt auf v1 des idealen Prozesses gelegt
+        mass = args.mass if args.mass is not None else (crank.clearance + crank.displacement) / v1
+        overlay_indicator(ax, summary, mass)
+        fig.tight_layout()
+        fig.savefig(args.out)
+        print(f"p-v overlay written to {args.out}")
+
+
+def run_inverse_command(args):
+    from cycle_inverse import solve_inverse_cycles
+
+    properties = MEDIA_PROPERTIES[args.medium]
+    cp, cv, k = properties['cp'], properties['cv'], properties['k']
+    value = parse_range(args.value)
+    t1, p1 = parse_range(args.t1), parse_range(args.p1)
+    t1, p1, value = np.broadcast_arrays(t1[:, None, None], p1[None, :, None], value[None, None, :])
+    v1 = (cp - cv) * t1 / (p1 * 1e5)
+    fixed = {'z': args.z, 'q': args.q}
+    fixed[args.solve_for] = None
+    bounds = None
+    if args.lower is not None or args.upper is not None:
+        from cycle_inverse import default_bounds
+        lower, upper = default_bounds(args.process, args.solve_for)
+        bounds = (args.lower if args.lower is not None else lower, args.upper if args.upper is not None else upper)
+    x, result = solve_inverse_cycles(args.process, args.target, value.ravel(), args.solve_for, t1.ravel(), p1.ravel(),
+                                     v1.ravel(), cp, cv, k, z=fixed['z'], q=fixed['q'], bounds=bounds)
+    if args.out:
+        writer = ParquetResultWriter(args.out) if _is_parquet(args.out) else CsvResultWriter(args.out)
+        try:
+            writer.write({f'target_{args.target}': value.ravel(), **result_columns(result)})
+        finally:
+            writer.close()
+        print(f"{len(x)} cycles written to {args.out}")
+        return
+    net_work = -result['processes']['w'].sum(axis=-1)
+    print(f"{args.target:>12} {args.solve_for:>12} {'efficiency':>12} {'net_work':>12} {'t_max':>12} {'p_max':>12}")
+    for row in zip(value.ravel(), x, result['efficiency'], net_work, result['states']['t'].max(axis=-1),
+                   result['states']['p'].max(axis=-1)):
+        print(' '.join(f"{number:12.4f}" for number in row))
+    if np.isnan(x).any():
+        print(f"{np.count_nonzero(np.isnan(x))} targets cannot be reached within the search interval.")
+
+
+def run_montecarlo_command(args):
+    from cycle_montecarlo import (MC_INPUTS, MC_OUTPUTS, confidence_bands, parse_distribution, run_monte_carlo,
+                                  save_monte_carlo)
+
+    distributions = {name: parse_distribution(getattr(args, name)) for name in MC_INPUTS
+                     if getattr(args, name) is not None}
+    summary = run_monte_carlo(args.process, distributions, args.samples, args.medium, args.workers,
+                              args.chunk_size, args.seed)
+    levels = list(summary['efficiency']['percentiles'])
+    print(f"{args.samples} samples of the {args.process} cycle")
+    print(f"{'':>12} {'mean':>12} {'std':>12} " + ' '.join(f"{f'p{level:g}':>12}" for level in levels))
+    for name in MC_OUTPUTS:
+        values = summary[name]
+        print(f"{name:>12} {values['mean']:12.4f} {values['std']:12.4f} "
+              + ' '.join(f"{values['percentiles'][level]:12.4f}" for level in levels))
+        if values['valid'] < summary['samples']:
+            print(f"{'':>12} {summary['samples'] - values['valid']} samples without a valid result")
+    if args.out:
+        bands = confidence_bands(args.process, distributions, args.medium, seed=args.seed)
+        save_monte_carlo(args.out, summary, bands, args.process)
+        if bands is None:
+            print(f"Histograms written to {args.out}, no sample gave valid states for the bands")
+        else:
+            print(f"Histograms and 5-95 % bands written to {args.out}")
+
+
+def run_serve_command(args):
+    import asyncio
+    from cycle_service import serve
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, max_batch=args.max_batch, max_pending=args.max_pending,
+                          batch_window=args.batch_window / 1000))
+    except KeyboardInterrupt:
+        pass
+
+
+def run_solve_command(args):
+    rows = solve_file(args.in_path, args.out, args.process, args.chunk_size, args.temperature_dependent,
+                      args.sensitivities)
+    print(f"{rows} cycles written to {args.out}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='thermocycle',
+                                     description="Calculation Tool for Thermodynamic Cycles without the GUI.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    processes = ['Otto', 'Diesel', 'Stirling', 'Joule']
+
+    solve = commands.add_parser('solve', help="Solve every row of a CSV or Parquet file.")
+    solve.add_argument('--process', choices=processes + [name for name in CYCLE_DEFINITIONS if name not in processes],
+                       help="Cycle for all rows. Without it the input needs a 'process' column.")
+    solve.add_argument('--in', dest='in_path', required=True,
+                       help="Input with columns t1, p1, [v1], z, q (or the parameters of the chosen cycle) "
+                            "and either cp, cv, k or medium.")
+    solve.add_argument('--out', required=True, help="Output file, .parquet for Parquet, otherwise CSV.")
+    solve.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    solve.add_argument('--temperature-dependent', action='store_true',
+                       help="Use cp(T) from NASA polynomials for the medium column instead of constant cp, cv, k.")
+    solve.add_argument('--sensitivities', action='store_true',
+                       help="Add the derivatives of efficiency, net work, T_max and p_max with respect to z, q, k, "
+                            "t1 and p1 (columns d_<output>_d_<input>).")
+    solve.set_defaults(func=run_solve_command)
+
+    sweep = commands.add_parser('sweep', help="Solve a grid of inputs on all cores.")
+    sweep.add_argument('--process', choices=processes, required=True)
+    sweep.add_argument('--z', required=True, help="start:stop:num or comma separated values")
+    sweep.add_argument('--q', required=True, help="start:stop:num or comma separated values")
+    sweep.add_argument('--t1', default='300')
+    sweep.add_argument('--p1', default='1')
+    sweep.add_argument('--medium', default='Air', help="Comma separated media, e.g. Air,Helium")
+    sweep.add_argument('--workers', type=int)
+    sweep.add_argument('--out', required=True, help="Result file (.npy)")
+    sweep.add_argument('--maps', help="Optional image with efficiency and net work maps")
+    sweep.set_defaults(func=run_sweep_command)
+
+    overlay = commands.add_parser('overlay', help="Draw all cycles of a sweep into one p-v and T-s figure.")
+    overlay.add_argument('--sweep', required=True, help="Result file of the sweep command (.npy)")
+    overlay.add_argument('--out', required=True, help="Image file")
+    overlay.add_argument('--mode', choices=['lines', 'density'],
+                         help="Default: lines up to 1000 cycles, density image above")
+    overlay.add_argument('--max-cycles', type=int, default=100_000)
+    overlay.set_defaults(func=run_overlay_command)
+
+    animate = commands.add_parser('animate', help="Render the cycle animations to MP4, GIF or PNG frames.")
+    animate.add_argument('--process', choices=processes, nargs='+', default=processes)
+    animate.add_argument('--out', required=True,
+                         help="Output file (.mp4, .gif or .png for numbered frames), e.g. anim/{process}.gif")
+    animate.add_argument('--fps', type=float, default=50)
+    animate.add_argument('--dpi', type=int, default=100)
+    animate.add_argument('--workers', type=int)
+    animate.set_defaults(func=run_animate_command)
+
+    fit = commands.add_parser('fit-n', help="Fit the polytropic exponent of a measured p-v trace.")
+    fit.add_argument('--trace', required=True,
+                     help="(N, 2) .npy with columns v, p (or fields 'v', 'p'), or raw float64 pairs v, p")
+    fit.add_argument('--phase', choices=['compression', 'expansion'],
+                     help="Use only samples with falling (compression) or rising (expansion) volume")
+    fit.add_argument('--v-min', type=float)
+    fit.add_argument('--v-max', type=float)
+    fit.add_argument('--p-min', type=float, help="Ignore samples below this pressure")
+    fit.add_argument('--chunk-size', type=int, default=1_000_000)
+    fit.add_argument('--process', choices=['Otto', 'Diesel', 'Joule'],
+                     help="Also compare the ideal cycle with one using the fitted exponent")
+    fit.add_argument('--z', type=float, default=8)
+    fit.add_argument('--q', type=float, default=1500)
+    fit.add_argument('--t1', type=float, default=300)
+    fit.add_argument('--p1', type=float, default=1)
+    fit.add_argument('--medium', choices=[name for name in MEDIA_PROPERTIES if name != 'Custom'], default='Air')
+    fit.set_defaults(func=run_fit_command)
+
+    indicator = commands.add_parser('indicator', help="Read a measured pressure/crank angle log and overlay it "
+                                                      "on the ideal p-v diagram.")
+    indicator.add_argument('--log', required=True,
+                           help=".csv/.txt, .npy or raw binary with (crank angle in degrees, pressure) per sample")
+    indicator.add_argument('--bore', type=float, required=True, help="Bore in m")
+    indicator.add_argument('--stroke', type=float, required=True, help="Stroke in m")
+    indicator.add_argument('--conrod', type=float, required=True, help="Connecting rod length in m")
+    indicator.add_argument('--compression-ratio', type=float, required=True)
+    indicator.add_argument('--cycle-degrees', type=float, default=720, help="720 for four-stroke, 360 for two-stroke")
+    indicator.add_argument('--pressure-unit', choices=['bar', 'pa', 'kpa', 'mpa'], default='bar')
+    indicator.add_argument('--columns', default='0,1', help="Angle and pressure columns, numbers or header names")
+    indicator.add_argument('--dtype', default='f8', help="Sample type of raw binary logs, e.g. f4 or f8")
+    indicator.add_argument('--bins', type=int, default=1000, help="Crank angle classes for the min/max display")
+    indicator.add_argument('--chunk-size', type=int, default=1_000_000)
+    indicator.add_argument('--work-out', help="CSV with the indicated work and IMEP of every cycle")
+    indicator.add_argument('--out', help="Image with the measured loop over the ideal cycle")
+    indicator.add_argument('--process', choices=['Otto', 'Diesel'], default='Otto')
+    indicator.add_argument('--z', type=float, help="Compression ratio of the ideal cycle, default: --compression-ratio")
+    indicator.add_argument('--q', type=float, default=1500)
+    indicator.add_argument('--t1', type=float, default=300)
+    indicator.add_argument('--p1', type=float, default=1)
+    indicator.add_argument('--medium', choices=[name for name in MEDIA_PROPERTIES if name != 'Custom'],
+                           default='Air')
+    indicator.add_argument('--mass', type=float, help="Trapped mass in kg to convert the cylinder volume to m3/kg")
+    indicator.set_defaults(func=run_indicator_command)
+
+    inverse = commands.add_parser('inverse', help="Find z or q so that the cycle reaches a target efficiency, net "
+                                                  "work, peak temperature or peak pressure.")
+    inverse.add_argument('--process', choices=processes, required=True)
+    inverse.add_argument('--target', choices=['efficiency', 'net_work', 't_max', 'p_max'], required=True,
+                         help="efficiency in %%, net_work in kJ/kg, t_max in K, p_max in bar")
+    inverse.add_argument('--value', required=True, help="Target value(s), start:stop:num or comma separated")
+    inverse.add_argument('--solve-for', choices=['z', 'q'], default='z')
+    inverse.add_argument('--z', type=float, default=8, help="Fixed compression/pressure ratio when solving for q")
+    inverse.add_argument('--q', type=float, default=1500, help="Fixed heat input (Diesel: cut-off ratio) when "
+                                                                 "solving for z")
+    inverse.add_argument('--t1', default='300')
+    inverse.add_argument('--p1', default='1')
+    inverse.add_argument('--medium', choices=[name for name in MEDIA_PROPERTIES if name != 'Custom'], default='Air')
+    inverse.add_argument('--lower', type=float, help="Lower end of the search interval")
+    inverse.add_argument('--upper', type=float, help="Upper end of the search interval")
+    inverse.add_argument('--out', help="Write all solved cycles to CSV or Parquet instead of printing them")
+    inverse.set_defaults(func=run_inverse_command)
+
+    montecarlo = commands.add_parser('montecarlo', help="Propagate input distributions through the cycle on all "
+                                                        "cores.")
+    montecarlo.add_argument('--process', choices=processes, required=True)
+    for name, default in (('t1', '300'), ('p1', '1'), ('z', '8'), ('q', '1500')):
+        montecarlo.add_argument(f'--{name}', default=default,
+                                help="Fixed value or normal:mean:std, uniform:min:max, triangular:min:mode:max")
+    for name in ('cp', 'cv', 'k'):
+        montecarlo.add_argument(f'--{name}', help="Distribution of the medium property, default: fixed from --medium")
+    montecarlo.add_argument('--medium', choices=[name for name in MEDIA_PROPERTIES if name != 'Custom'],
+                            default='Air')
+    montecarlo.add_argument('--samples', type=int, default=1_000_000)
+    montecarlo.add_argument('--chunk-size', type=int, default=250_000)
+    montecarlo.add_argument('--workers', type=int)
+    montecarlo.add_argument('--seed', type=int, default=0)
+    montecarlo.add_argument('--out', help="Image with histograms and confidence bands on the p-v and T-s diagrams")
+    montecarlo.set_defaults(func=run_montecarlo_command)
+
+    serve = commands.add_parser('serve', help="Answer HTTP/JSON requests, solving concurrent requests as one batch.")
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8765)
+    serve.add_argument('--unix', help="Listen on this Unix socket instead of TCP")
+    serve.add_argument('--max-batch', type=int, default=4096)
+    serve.add_argument('--max-pending', type=int, default=20_000,
+                       help="Pending cycles before new requests are rejected with 503")
+    serve.add_argument('--batch-window', type=float, default=0.0,
+                       help="Milliseconds to wait for more requests before solving a batch")
+    serve.set_defaults(func=run_serve_command)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        args.func(args)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())